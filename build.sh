@@ -5,3 +5,5 @@ cd projectsite
 pip install -r requirements.txt
 python manage.py collectstatic --noinput
 python manage.py migrate
+python manage.py createcachetable
+python manage.py load_local_foods
@@ -0,0 +1,36 @@
+#!/usr/bin/env bash
+# Load-test add_food_log offline: CalorieNinjas stub + gunicorn + concurrent client.
+# Extra arguments go to the stub, e.g. ./load_test.sh --latency-ms 150 --distribution lognormal --jitter-ms 100 --rate-429 0.05
+# SERVER=asgi runs the async add_food_log under uvicorn workers instead of sync gunicorn.
+set -o errexit
+
+STUB_PORT=${STUB_PORT:-8001}
+WEB_PORT=${WEB_PORT:-8000}
+WORKERS=${WEB_CONCURRENCY:-4}
+CONCURRENCY=${CONCURRENCY:-16}
+REQUESTS=${REQUESTS:-500}
+
+export CALORIENINJAS_BASE_URL="http://127.0.0.1:${STUB_PORT}/v1/nutrition"
+export CALORIENINJAS_API_KEY=${CALORIENINJAS_API_KEY:-loadtest}
+
+python manage.py migrate --noinput > /dev/null
+python manage.py calorieninjas_stub --port "$STUB_PORT" "$@" &
+STUB_PID=$!
+if [ "${SERVER:-wsgi}" = "asgi" ]; then
+    export TRACKER_ASYNC_VIEWS=True
+    gunicorn projectsite.asgi:application -k uvicorn_worker.UvicornWorker \
+        --bind "127.0.0.1:${WEB_PORT}" --workers "$WORKERS" --log-level warning &
+else
+    gunicorn projectsite.wsgi --bind "127.0.0.1:${WEB_PORT}" --workers "$WORKERS" --threads 4 --log-level warning &
+fi
+WEB_PID=$!
+trap 'kill $STUB_PID $WEB_PID 2> /dev/null' EXIT
+
+sleep 3
+python manage.py load_test_add_food_log \
+    --target "http://127.0.0.1:${WEB_PORT}" \
+    --stub-url "http://127.0.0.1:${STUB_PORT}" \
+    --create-user \
+    --concurrency "$CONCURRENCY" \
+    --requests "$REQUESTS" \
+    --output load_test_results.json
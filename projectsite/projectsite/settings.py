@@ -15,6 +15,8 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 SECRET_KEY = os.getenv('SECRET_KEY')
 DEBUG = os.getenv('DEBUG', 'False').lower() == 'true'
 CALORIENINJAS_API_KEY = os.getenv('CALORIENINJAS_API_KEY')
+# Point at `manage.py calorieninjas_stub` for offline load testing
+CALORIENINJAS_BASE_URL = os.getenv('CALORIENINJAS_BASE_URL', 'https://api.calorieninjas.com/v1/nutrition')
 
 
 
@@ -69,6 +71,14 @@ MIDDLEWARE = [
     "whitenoise.middleware.WhiteNoiseMiddleware",
 ]
 
+# Per-request query/timing instrumentation (Server-Timing header + JSON log line)
+TRACKER_REQUEST_TIMING = os.getenv('TRACKER_REQUEST_TIMING', 'False').lower() == 'true'
+# Warn above this many queries per request; unset, each tracker view is held
+# to its own budget in tracker.instrumentation.QUERY_BUDGETS
+TRACKER_QUERY_BUDGET = int(os.getenv('TRACKER_QUERY_BUDGET', 0)) or None
+if TRACKER_REQUEST_TIMING:
+    MIDDLEWARE.insert(0, 'tracker.middleware.RequestTimingMiddleware')
+
 ROOT_URLCONF = 'projectsite.urls'
 
 TEMPLATES = [
@@ -204,6 +214,116 @@ FOOD_TRACKER_SETTINGS = {
 }
 
 
+# CalorieNinjas lookup cache (in-process LRU in front of a database table)
+CALORIENINJAS_CACHE = {
+    'MEMORY_MAX_ENTRIES': int(os.getenv('CALORIENINJAS_CACHE_MEMORY_MAX_ENTRIES', 512)),
+    'DB_MAX_ENTRIES': int(os.getenv('CALORIENINJAS_CACHE_DB_MAX_ENTRIES', 50000)),
+    'TTL_SECONDS': int(os.getenv('CALORIENINJAS_CACHE_TTL_SECONDS', 60 * 60 * 24 * 30)),
+    'DB_EVICTION_INTERVAL': 100,
+    'LOCK_TTL_SECONDS': float(os.getenv('CALORIENINJAS_CACHE_LOCK_TTL_SECONDS', 15)),
+    'LOCK_POLL_SECONDS': float(os.getenv('CALORIENINJAS_CACHE_LOCK_POLL_SECONDS', 0.1)),
+}
+
+
+# CalorieNinjas HTTP client (pooled session, retries and circuit breaker)
+CALORIENINJAS_HTTP = {
+    'CONNECT_TIMEOUT': float(os.getenv('CALORIENINJAS_CONNECT_TIMEOUT', 3.05)),
+    'READ_TIMEOUT': float(os.getenv('CALORIENINJAS_READ_TIMEOUT', 10)),
+    'MAX_RETRIES': int(os.getenv('CALORIENINJAS_MAX_RETRIES', 2)),
+    'BACKOFF_FACTOR': 0.3,
+    'BACKOFF_JITTER': 0.3,
+    'BACKOFF_MAX': 4,
+    'POOL_CONNECTIONS': 4,
+    'POOL_MAXSIZE': int(os.getenv('CALORIENINJAS_POOL_MAXSIZE', 10)),
+    # Concurrent lookups per ASGI worker (see TRACKER_ASYNC_VIEWS)
+    'ASYNC_MAX_CONNECTIONS': int(os.getenv('CALORIENINJAS_ASYNC_MAX_CONNECTIONS', 100)),
+    'BREAKER_FAILURE_THRESHOLD': int(os.getenv('CALORIENINJAS_BREAKER_THRESHOLD', 5)),
+    'BREAKER_RESET_SECONDS': int(os.getenv('CALORIENINJAS_BREAKER_RESET_SECONDS', 30)),
+}
+
+
+# Offline food table (manage.py load_local_foods) consulted before CalorieNinjas
+LOCAL_FOODS = {
+    'ENABLED': os.getenv('LOCAL_FOODS_ENABLED', 'True').lower() == 'true',
+    'MIN_SIMILARITY': float(os.getenv('LOCAL_FOODS_MIN_SIMILARITY', 0.8)),
+    'RELOAD_SECONDS': 300,
+}
+
+
+# Optional shared cache, e.g. CACHE_BACKEND=django.core.cache.backends.db.DatabaseCache
+# with CACHE_LOCATION=tracker_cache (created by `manage.py createcachetable`).
+# Unset, Django's default per-process cache is used.
+CACHE_BACKEND = os.getenv('CACHE_BACKEND')
+if CACHE_BACKEND:
+    CACHES = {
+        'default': {
+            'BACKEND': CACHE_BACKEND,
+            'LOCATION': os.getenv('CACHE_LOCATION', ''),
+        },
+    }
+    if os.getenv('CACHE_MAX_ENTRIES'):
+        CACHES['default']['OPTIONS'] = {'MAX_ENTRIES': int(os.environ['CACHE_MAX_ENTRIES'])}
+
+
+# Per-user cache of the home and dashboard contexts (tracker.page_cache)
+TRACKER_PAGE_CACHE = {
+    # Bumps from the enrichment and import workers only reach the web
+    # processes through a shared cache, so it is off without one
+    'ENABLED': os.getenv('TRACKER_PAGE_CACHE_ENABLED', str(bool(CACHE_BACKEND))).lower() == 'true',
+    'TTL_SECONDS': int(os.getenv('TRACKER_PAGE_CACHE_TTL_SECONDS', 60 * 60 * 6)),
+    'WARM_ACTIVE_DAYS': int(os.getenv('TRACKER_PAGE_CACHE_WARM_ACTIVE_DAYS', 7)),
+}
+
+
+# Type-ahead suggestions for the add form (tracker.autocomplete)
+TRACKER_AUTOCOMPLETE = {
+    'MAX_USERS': int(os.getenv('TRACKER_AUTOCOMPLETE_MAX_USERS', 1000)),
+    'COMMON_MIN_USERS': int(os.getenv('TRACKER_AUTOCOMPLETE_COMMON_MIN_USERS', 3)),
+}
+
+
+# Serve add_food_log from an async view that awaits CalorieNinjas on a shared
+# httpx client. Only worth it under ASGI:
+#   gunicorn projectsite.asgi:application -k uvicorn_worker.UvicornWorker
+TRACKER_ASYNC_VIEWS = os.getenv('TRACKER_ASYNC_VIEWS', 'False').lower() == 'true'
+
+
+# Save food logs immediately and look up nutrition in `manage.py process_enrichment_jobs`
+FOOD_LOG_ASYNC_ENRICHMENT = os.getenv('FOOD_LOG_ASYNC_ENRICHMENT', 'False').lower() == 'true'
+FOOD_LOG_ENRICHMENT = {
+    'MAX_ATTEMPTS': 5,
+    'RETRY_BASE_SECONDS': 10,
+    'LOCK_TIMEOUT_SECONDS': 300,
+}
+
+# CSV imports (manage.py import_food_logs)
+FOOD_LOG_IMPORT = {
+    'BATCH_SIZE': int(os.getenv('FOOD_LOG_IMPORT_BATCH_SIZE', 500)),
+    'ENRICH_WORKERS': int(os.getenv('FOOD_LOG_IMPORT_ENRICH_WORKERS', 4)),
+    'ENRICH_RATE_PER_SECOND': float(os.getenv('FOOD_LOG_IMPORT_ENRICH_RATE', 5)),
+    'MAX_UPLOAD_MB': int(os.getenv('FOOD_LOG_IMPORT_MAX_UPLOAD_MB', 20)),
+    'LOCK_TIMEOUT_SECONDS': 600,
+}
+
+
+# Logging: tracker.* loggers (including tracker.timing) log INFO to the console
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'tracker': {
+            'handlers': ['console'],
+            'level': os.getenv('TRACKER_LOG_LEVEL', 'INFO'),
+        },
+    },
+}
+
+
 # Email Configuration (for password reset, notifications, etc.)
 # For development, use console backend
 EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
@@ -1,10 +1,13 @@
 from django.contrib import admin
-from .models import FoodLog
+from .models import (
+    DailyNutritionSummary, EnrichmentJob, FoodItem, FoodLog, FrequentFood, ImportJob, LocalFood,
+    LookupLock, NutritionLookupCache, Recipe, RecipeIngredient,
+)
 
 @admin.register(FoodLog)
 class FoodLogAdmin(admin.ModelAdmin):
-    list_display = ['food_name', 'meal_type', 'date', 'calories', 'created_at']
-    list_filter = ['meal_type', 'date']
+    list_display = ['food_name', 'meal_type', 'date', 'calories', 'status', 'created_at']
+    list_filter = ['meal_type', 'status', 'date']
     search_fields = ['food_name', 'description']
     date_hierarchy = 'date'
     readonly_fields = ['created_at', 'updated_at']
@@ -21,4 +24,83 @@ class FoodLogAdmin(admin.ModelAdmin):
             'fields': ['created_at', 'updated_at'],
             'classes': ['collapse']
         }),
-    ]
\ No newline at end of file
+    ]
+
+@admin.register(NutritionLookupCache)
+class NutritionLookupCacheAdmin(admin.ModelAdmin):
+    list_display = ['normalized_query', 'hit_count', 'last_accessed_at', 'expires_at']
+    search_fields = ['normalized_query']
+    readonly_fields = ['query_hash', 'normalized_query', 'response_data', 'hit_count',
+                       'created_at', 'last_accessed_at', 'expires_at']
+
+
+@admin.register(LookupLock)
+class LookupLockAdmin(admin.ModelAdmin):
+    list_display = ['key', 'owner', 'created_at', 'expires_at']
+    readonly_fields = ['key', 'owner', 'created_at', 'expires_at']
+
+
+@admin.register(FoodItem)
+class FoodItemAdmin(admin.ModelAdmin):
+    list_display = ['name', 'serving_size_g', 'hit_count', 'updated_at']
+    search_fields = ['name', 'aliases__phrase']
+    readonly_fields = ['created_at', 'updated_at']
+
+
+@admin.register(LocalFood)
+class LocalFoodAdmin(admin.ModelAdmin):
+    list_display = ['name', 'serving_size_g', 'bundled', 'updated_at']
+    list_filter = ['bundled']
+    search_fields = ['name']
+    readonly_fields = ['updated_at']
+
+
+class RecipeIngredientInline(admin.TabularInline):
+    # Read-only: changing ingredients goes through tracker.recipes to keep the totals right
+    model = RecipeIngredient
+    fields = ['position', 'text', 'weight_g']
+    readonly_fields = ['position', 'text', 'weight_g']
+    extra = 0
+    can_delete = False
+    
+    def has_add_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(Recipe)
+class RecipeAdmin(admin.ModelAdmin):
+    list_display = ['name', 'user', 'servings', 'serving_calories', 'updated_at']
+    search_fields = ['name', 'user__username']
+    readonly_fields = ['total_nutrition', 'serving_nutrition', 'total_weight_g', 'created_at', 'updated_at']
+    inlines = [RecipeIngredientInline]
+
+
+@admin.register(EnrichmentJob)
+class EnrichmentJobAdmin(admin.ModelAdmin):
+    list_display = ['food_log', 'status', 'attempts', 'run_after', 'updated_at']
+    list_filter = ['status']
+    readonly_fields = ['created_at', 'updated_at', 'locked_at']
+
+
+@admin.register(ImportJob)
+class ImportJobAdmin(admin.ModelAdmin):
+    list_display = ['user', 'original_filename', 'status', 'rows_processed', 'rows_imported',
+                    'rows_rejected', 'updated_at']
+    list_filter = ['status']
+    readonly_fields = ['created_at', 'updated_at', 'locked_at']
+
+
+@admin.register(DailyNutritionSummary)
+class DailyNutritionSummaryAdmin(admin.ModelAdmin):
+    list_display = ['user', 'date', 'calories', 'protein', 'carbs', 'fat', 'log_count']
+    list_filter = ['date']
+    date_hierarchy = 'date'
+    readonly_fields = ['updated_at']
+
+
+@admin.register(FrequentFood)
+class FrequentFoodAdmin(admin.ModelAdmin):
+    # Maintained by the FoodLog signals; rebuild with `manage.py rebuild_frequent_foods`
+    list_display = ['user', 'food_name', 'log_count', 'calories', 'last_logged_at']
+    search_fields = ['food_name', 'lookup_key']
+    readonly_fields = ['lookup_key', 'log_count', 'last_logged_at']
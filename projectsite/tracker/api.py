@@ -0,0 +1,234 @@
+"""
+Read-only JSON API (v1) over a user's food logs and daily summaries.
+
+Every endpoint answers conditional GETs: the ETag changes whenever the
+user's logs do, so a client polling with If-None-Match gets a bodiless 304
+for the price of one aggregate query.
+"""
+import base64
+import binascii
+from datetime import datetime, timedelta
+
+from django.contrib.auth.decorators import login_required
+from django.db.models import Count, Max, Q, Sum
+from django.http import JsonResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition, require_GET
+
+from .models import DailyNutritionSummary, FoodLog
+from .summaries import MAX_CHART_DAYS
+from .trends import DEFAULT_TREND_DAYS, TREND_WINDOWS, build_trends
+
+API_VERSION = 'v1'
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+DEFAULT_RANGE_DAYS = 30
+
+LOG_FIELDS = [
+    'id', 'food_name', 'description', 'meal_type', 'date', 'calories',
+    *FoodLog.NUTRIENT_KEYS, 'status', 'natural_query', 'created_at', 'updated_at',
+]
+
+
+class BadRequest(ValueError):
+    pass
+
+
+def logs_etag(request, *args, **kwargs):
+    """
+    ETag for everything the API can return for this user
+
+    The latest updated_at moves on every insert and edit; the count catches
+    deletes. Today's date is included because date ranges default to
+    ending today.
+    """
+    state = FoodLog.objects.filter(user=request.user).order_by().aggregate(
+        latest=Max('updated_at'),
+        count=Count('id'),
+    )
+    latest = state['latest'].timestamp() if state['latest'] else 0
+    return f"{API_VERSION}-{state['count']}-{latest:.6f}-{timezone.now().date().isoformat()}"
+
+
+def api_view(view):
+    """
+    Login, GET only, ETag/304 handling and private caching for an API view
+    """
+    view = condition(etag_func=logs_etag)(view)
+    view = cache_control(private=True, no_cache=True)(view)
+    view = require_GET(view)
+    return login_required(view)
+
+
+def _error(message, status=400):
+    return JsonResponse({'success': False, 'error': 'Bad request', 'message': message}, status=status)
+
+
+def _parse_date(value, name):
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    except ValueError:
+        raise BadRequest(f"{name} must be a date in YYYY-MM-DD format")
+
+
+def parse_date_range(params, today):
+    """
+    Read ?start=YYYY-MM-DD&end=YYYY-MM-DD, defaulting to the last 30 days
+
+    Returns:
+        tuple: (start_date, end_date)
+    """
+    end = _parse_date(params['end'], 'end') if params.get('end') else today
+    start = (
+        _parse_date(params['start'], 'start') if params.get('start')
+        else end - timedelta(days=DEFAULT_RANGE_DAYS - 1)
+    )
+    if start > end:
+        raise BadRequest("start must not be after end")
+    if (end - start).days >= MAX_CHART_DAYS:
+        raise BadRequest(f"Date ranges are limited to {MAX_CHART_DAYS} days")
+    return start, end
+
+
+def encode_cursor(log):
+    raw = f"{log['date'].isoformat()}|{log['created_at'].isoformat()}|{log['id']}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """
+    Returns:
+        tuple: (date, created_at, id) of the last log on the previous page
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        day, created_at, pk = raw.split('|')
+        created_at = parse_datetime(created_at)
+        if created_at is None:
+            raise ValueError
+        return datetime.strptime(day, '%Y-%m-%d').date(), created_at, int(pk)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise BadRequest("Invalid cursor")
+
+
+def serialize_log(log):
+    data = dict(log)
+    data['date'] = log['date'].isoformat()
+    data['created_at'] = log['created_at'].isoformat()
+    data['updated_at'] = log['updated_at'].isoformat()
+    return data
+
+
+@api_view
+def food_logs(request):
+    """
+    A user's food logs, newest first, keyset-paginated on (date, created_at, id)
+
+    Query parameters:
+        limit: Page size (default 50, at most 200)
+        cursor: next_cursor from the previous page
+        start, end: Optional YYYY-MM-DD bounds on the log date
+        meal_type: Optional meal type filter
+    """
+    params = request.GET
+    try:
+        limit = min(max(int(params.get('limit', DEFAULT_PAGE_SIZE)), 1), MAX_PAGE_SIZE)
+    except ValueError:
+        return _error("limit must be a number")
+
+    logs = FoodLog.objects.filter(user=request.user)
+    try:
+        if params.get('start'):
+            logs = logs.filter(date__gte=_parse_date(params['start'], 'start'))
+        if params.get('end'):
+            logs = logs.filter(date__lte=_parse_date(params['end'], 'end'))
+        if params.get('cursor'):
+            day, created_at, pk = decode_cursor(params['cursor'])
+            logs = logs.filter(
+                Q(date__lt=day)
+                | Q(date=day, created_at__lt=created_at)
+                | Q(date=day, created_at=created_at, id__lt=pk)
+            )
+    except BadRequest as e:
+        return _error(str(e))
+    if params.get('meal_type'):
+        logs = logs.filter(meal_type=params['meal_type'])
+
+    # One extra row tells us whether there is another page
+    page = list(logs.order_by('-date', '-created_at', '-id').values(*LOG_FIELDS)[:limit + 1])
+    has_more = len(page) > limit
+    page = page[:limit]
+
+    return JsonResponse({
+        'results': [serialize_log(log) for log in page],
+        'next_cursor': encode_cursor(page[-1]) if has_more else None,
+    })
+
+
+@api_view
+def daily_totals(request):
+    """
+    Nutrition totals per day between start and end (default: the last 30
+    days). Days without logs are omitted.
+    """
+    try:
+        start, end = parse_date_range(request.GET, timezone.now().date())
+    except BadRequest as e:
+        return _error(str(e))
+
+    days = (
+        DailyNutritionSummary.objects
+        .filter(user=request.user, date__range=(start, end))
+        .order_by('date')
+        .values('date', *DailyNutritionSummary.NUTRIENT_FIELDS, 'log_count')
+    )
+    return JsonResponse({
+        'start': start.isoformat(),
+        'end': end.isoformat(),
+        'days': [dict(day, date=day['date'].isoformat()) for day in days],
+    })
+
+
+@api_view
+def meal_counts(request):
+    """
+    Number of logs per meal type between start and end (default: the last
+    30 days)
+    """
+    try:
+        start, end = parse_date_range(request.GET, timezone.now().date())
+    except BadRequest as e:
+        return _error(str(e))
+
+    meal_types = [meal_type for meal_type, _ in FoodLog.MEAL_TYPE_CHOICES]
+    totals = (
+        DailyNutritionSummary.objects
+        .filter(user=request.user, date__range=(start, end))
+        .order_by()
+        .aggregate(**{meal_type: Sum(f'{meal_type}_count') for meal_type in meal_types})
+    )
+    return JsonResponse({
+        'start': start.isoformat(),
+        'end': end.isoformat(),
+        'meal_counts': {meal_type: totals[meal_type] or 0 for meal_type in meal_types},
+    })
+
+
+@api_view
+def trends(request):
+    """
+    Rolling 7/30/90-day averages, week-over-week deltas and goal streaks
+    for the `days` days (default 90) ending on `end` (default today)
+    """
+    try:
+        end = _parse_date(request.GET['end'], 'end') if request.GET.get('end') else timezone.now().date()
+        days = request.GET.get('days', str(DEFAULT_TREND_DAYS))
+        if not days.isdigit() or not min(TREND_WINDOWS) <= int(days) <= MAX_CHART_DAYS:
+            raise BadRequest(f"days must be a number from {min(TREND_WINDOWS)} to {MAX_CHART_DAYS}")
+    except BadRequest as e:
+        return _error(str(e))
+
+    return JsonResponse(build_trends(request.user, end, int(days)))
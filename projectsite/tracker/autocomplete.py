@@ -0,0 +1,262 @@
+"""
+Type-ahead suggestions for the "Describe what you ate" box.
+
+Each process keeps a PrefixIndex (a sorted array searched with bisect) per
+active user over the meals they logged before, plus one shared index of
+foods that are common across users and the bundled local foods. Indexes
+are built on the first keystroke, kept in an LRU, and updated in place
+from the FoodLog signals as logs are added.
+
+A suggestion from the user's own history carries the id of the log it
+came from; posting it back with the form lets add_food_log copy that log's
+nutrition instead of looking the meal up again.
+"""
+import threading
+import time
+from bisect import bisect_left, insort
+
+from django.conf import settings
+from django.db.models import Count
+
+from .cache import LRUCache, normalize_query
+
+DEFAULT_AUTOCOMPLETE_SETTINGS = {
+    'MAX_USERS': 1000,  # Per-user indexes kept in memory
+    'TTL_SECONDS': 600,  # Rebuild a user's index after this long
+    'MAX_HISTORY': 2000,  # Most recent logs indexed per user
+    'COMMON_FOODS': 200,
+    'COMMON_MIN_USERS': 3,  # Other users' meals are only shared once this many people logged them
+    'COMMON_TTL_SECONDS': 3600,
+    'LIMIT': 8,
+}
+
+# Sorted entries scanned per search before ranking; bounds the cost of short prefixes
+MAX_SCAN = 200
+
+
+def get_autocomplete_settings():
+    """
+    Merge TRACKER_AUTOCOMPLETE from settings with the defaults
+    """
+    config = dict(DEFAULT_AUTOCOMPLETE_SETTINGS)
+    config.update(getattr(settings, 'TRACKER_AUTOCOMPLETE', {}) or {})
+    return config
+
+
+class PrefixIndex:
+    """
+    Suggestions in a sorted array of (search key, suggestion key) pairs.
+
+    A suggestion can be reached from several search keys: a logged meal is
+    found both by what the user typed ("2 eggs and toast") and by its food
+    name ("egg + toast").
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._keys = []
+        self._entries = {}
+
+    def add(self, text, search_texts=(), weight=1, log_id=None, calories=None):
+        """
+        Add a suggestion, or bump its weight if it is already indexed
+
+        Args:
+            text (str): Text to fill the box with
+            search_texts (iterable): Extra texts the suggestion should be found by
+            weight (int): Added to the ranking weight
+            log_id (int): Log whose nutrition the suggestion can reuse
+            calories (float): Calories shown next to the suggestion
+        """
+        key = normalize_query(text)
+        if not key:
+            return
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = self._entries[key] = {
+                    'text': text.strip(),
+                    'weight': 0,
+                    'log_id': log_id,
+                    'calories': calories,
+                }
+                insort(self._keys, (key, key))
+            elif log_id is not None and (entry['log_id'] is None or log_id > entry['log_id']):
+                # Reuse the most recent log of the same meal
+                entry['log_id'], entry['calories'] = log_id, calories
+            entry['weight'] += weight
+            for search_text in search_texts:
+                search_key = normalize_query(search_text)
+                if search_key and search_key != key:
+                    position = bisect_left(self._keys, (search_key, key))
+                    if position == len(self._keys) or self._keys[position] != (search_key, key):
+                        self._keys.insert(position, (search_key, key))
+
+    def search(self, prefix, limit):
+        """
+        Suggestions whose text starts with prefix, heaviest first
+
+        Returns:
+            list: Suggestion dicts (text, weight, log_id, calories)
+        """
+        prefix = normalize_query(prefix)
+        if not prefix:
+            return []
+        with self._lock:
+            found = {}
+            position = bisect_left(self._keys, (prefix,))
+            end = min(len(self._keys), position + MAX_SCAN)
+            while position < end:
+                search_key, key = self._keys[position]
+                if not search_key.startswith(prefix):
+                    break
+                found[key] = dict(self._entries[key])
+                position += 1
+        return sorted(found.values(), key=lambda entry: (-entry['weight'], entry['text']))[:limit]
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class SuggestionIndex:
+    """
+    Per-user history indexes plus the shared common-foods index
+    """
+
+    def __init__(self):
+        config = get_autocomplete_settings()
+        self._users = LRUCache(config['MAX_USERS'], config['TTL_SECONDS'])
+        self._common = None
+        self._common_built_at = None
+        self._lock = threading.Lock()
+
+    def clear(self):
+        self._users.clear()
+        with self._lock:
+            self._common = None
+            self._common_built_at = None
+
+    def suggest(self, user, prefix, limit=None):
+        """
+        Suggestions for a prefix: the user's own meals first, then common foods
+
+        Returns:
+            list: Dicts with text, calories, log_id and source ('history' or 'common')
+        """
+        config = get_autocomplete_settings()
+        limit = limit or config['LIMIT']
+        suggestions = []
+        seen = set()
+        for source, index in (('history', self.for_user(user.pk, config)), ('common', self.common(config))):
+            for entry in index.search(prefix, limit):
+                key = normalize_query(entry['text'])
+                if key in seen:
+                    continue
+                seen.add(key)
+                suggestions.append({
+                    'text': entry['text'],
+                    'calories': entry['calories'],
+                    'log_id': entry['log_id'] if source == 'history' else None,
+                    'source': source,
+                })
+        return suggestions[:limit]
+
+    def for_user(self, user_id, config=None):
+        index = self._users.get(user_id)
+        if index is None:
+            index = self._build_user_index(user_id, config or get_autocomplete_settings())
+            self._users.set(user_id, index)
+        return index
+
+    def _build_user_index(self, user_id, config):
+        from .models import FoodLog
+
+        index = PrefixIndex()
+        logs = FoodLog.objects.filter(
+            user_id=user_id, status=FoodLog.STATUS_READY,
+        ).order_by('-created_at').values_list('id', 'natural_query', 'food_name', 'calories')
+        # Newest first, so each suggestion keeps the id of its latest log
+        for log_id, natural_query, food_name, calories in logs[:config['MAX_HISTORY']]:
+            index.add(natural_query or food_name, [food_name], log_id=log_id, calories=calories)
+        return index
+
+    def common(self, config=None):
+        config = config or get_autocomplete_settings()
+        built_at = self._common_built_at
+        if self._common is None or time.monotonic() - built_at > config['COMMON_TTL_SECONDS']:
+            index = self._build_common_index(config)
+            with self._lock:
+                self._common = index
+                self._common_built_at = time.monotonic()
+        return self._common
+
+    def _build_common_index(self, config):
+        from .models import FoodLog, LocalFood
+
+        index = PrefixIndex()
+        popular = (
+            FoodLog.objects.filter(status=FoodLog.STATUS_READY, natural_query__isnull=False)
+            .exclude(natural_query='')
+            .values('natural_query')
+            .annotate(logs=Count('id'), users=Count('user', distinct=True))
+            .filter(users__gte=config['COMMON_MIN_USERS'])
+            .order_by('-logs')
+            .values_list('natural_query', 'logs')[:config['COMMON_FOODS']]
+        )
+        for natural_query, logs in popular:
+            index.add(natural_query, weight=logs)
+        # Bundled foods resolve offline, so they are always safe to suggest
+        for name, aliases in LocalFood.objects.values_list('name', 'aliases'):
+            index.add(name, aliases or [], weight=0)
+        return index
+
+    def record(self, food_log):
+        """
+        Add a new log to its user's index, if that index is loaded
+        """
+        index = self._users.get(food_log.user_id)
+        if index is not None and food_log.status == food_log.STATUS_READY:
+            index.add(
+                food_log.natural_query or food_log.food_name,
+                [food_log.food_name],
+                log_id=food_log.pk,
+                calories=food_log.calories,
+            )
+
+    def forget(self, user_id):
+        """
+        Drop a user's index after an edit or delete; it is rebuilt on the next keystroke
+        """
+        self._users.delete(user_id)
+
+    def stats(self):
+        return {'users': self._users.stats(), 'common': len(self._common or ())}
+
+
+def reuse_suggestion(user, natural_query, log_id):
+    """
+    Nutrition from the user's earlier log when they picked it as a suggestion
+    and submitted its text unchanged
+
+    Returns:
+        dict or None: Data in the format_for_food_log shape, or None to look the meal up
+    """
+    from .models import FoodLog
+
+    if not str(log_id or '').isdigit():
+        return None
+    log = FoodLog.objects.filter(pk=int(log_id), user=user, status=FoodLog.STATUS_READY).only(
+        'food_name', 'description', 'calories', 'nutrition_data', 'natural_query',
+    ).first()
+    if log is None or normalize_query(log.natural_query or log.food_name) != normalize_query(natural_query):
+        return None
+    return {
+        'food_name': log.food_name,
+        'description': log.description,
+        'calories': log.calories,
+        'nutrition': dict(log.nutrition_data or {}),
+    }
+
+
+# Process-wide index shared by every request
+suggestion_index = SuggestionIndex()
@@ -0,0 +1,193 @@
+import itertools
+import math
+import platform
+import time
+import tracemalloc
+from datetime import timedelta
+
+import django
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from .testing import MEAL_QUERIES, FakeCalorieNinjas, seed_food_history
+
+DASHBOARD_RANGES = [7, 30, 90, 365]
+
+
+def percentile(values, pct):
+    """
+    Nearest-rank percentile of a list of numbers (0 for an empty list)
+    """
+    if not values:
+        return 0
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered), math.ceil(pct / 100 * len(ordered))) - 1)
+    return ordered[rank]
+
+
+def summarize_latencies(latencies_ms):
+    """
+    Mean, min, max and p50/p90/p95/p99 of request latencies in milliseconds
+    """
+    if not latencies_ms:
+        return {}
+    summary = {
+        'count': len(latencies_ms),
+        'mean_ms': round(sum(latencies_ms) / len(latencies_ms), 2),
+        'min_ms': round(min(latencies_ms), 2),
+        'max_ms': round(max(latencies_ms), 2),
+    }
+    for pct in (50, 90, 95, 99):
+        summary[f'p{pct}_ms'] = round(percentile(latencies_ms, pct), 2)
+    return summary
+
+
+def seed_users(users, days, logs_per_day, stdout=None):
+    """
+    Create `users` benchmark users, each with days x logs_per_day food logs
+
+    Returns:
+        list: The created users
+    """
+    created = []
+    for index in range(users):
+        user = User.objects.create_user(f'bench{index}', f'bench{index}@example.com', 'bench')
+        count = seed_food_history(user, days=days, logs_per_day=logs_per_day, seed=index)
+        if stdout:
+            stdout.write(f'Seeded {user.username} with {count} logs')
+        created.append(user)
+    return created
+
+
+def build_scenarios():
+    """
+    (name, method, url, data factory) for every benchmarked request
+    """
+    today = timezone.now().date()
+    queries = itertools.cycle(
+        (meal, query) for meal, options in MEAL_QUERIES.items() for query in options
+    )
+
+    def add_data():
+        meal_type, query = next(queries)
+        return {'natural_query': query, 'meal_type': meal_type, 'date': today.isoformat()}
+
+    scenarios = [('home', 'get', reverse('tracker:home'), None)]
+    for days in DASHBOARD_RANGES:
+        url = reverse('tracker:dashboard') + f'?range={days}'
+        scenarios.append((f'dashboard_{days}d', 'get', url, None))
+    # An explicit past window exercises the custom start/end path
+    start = today - timedelta(days=59)
+    scenarios.append((
+        'dashboard_custom',
+        'get',
+        reverse('tracker:dashboard') + f'?range=custom&start={start.isoformat()}&end={today.isoformat()}',
+        None,
+    ))
+    # Five years of daily rollups through the vectorized trends module
+    scenarios.append(('trends_5y', 'get', reverse('tracker:trends') + '?days=1825', None))
+    scenarios.append(('profile', 'get', reverse('tracker:profile'), None))
+    scenarios.append(('add_food_log', 'post', reverse('tracker:add_food_log'), add_data))
+    return scenarios
+
+
+def _run_request(client, method, url, data_factory):
+    data = data_factory() if data_factory else None
+    if method == 'post':
+        return client.post(url, data)
+    return client.get(url)
+
+
+def benchmark_scenario(clients, method, url, data_factory, requests, warmup):
+    """
+    Time one scenario, rotating through the logged-in clients
+
+    Latency and query counts come from plain runs; peak memory from one
+    extra run under tracemalloc, so tracing does not skew the timings.
+    """
+    rotation = itertools.cycle(clients)
+    for _ in range(warmup):
+        _run_request(next(rotation), method, url, data_factory)
+
+    latencies = []
+    query_counts = []
+    statuses = set()
+    for _ in range(requests):
+        client = next(rotation)
+        with CaptureQueriesContext(connection) as captured:
+            start = time.perf_counter()
+            response = _run_request(client, method, url, data_factory)
+            latencies.append((time.perf_counter() - start) * 1000)
+        query_counts.append(len(captured))
+        statuses.add(response.status_code)
+
+    tracemalloc.start()
+    try:
+        tracemalloc.reset_peak()
+        _run_request(next(rotation), method, url, data_factory)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    result = summarize_latencies(latencies)
+    result.update({
+        'queries_min': min(query_counts),
+        'queries_max': max(query_counts),
+        'queries_mean': round(sum(query_counts) / len(query_counts), 2),
+        'peak_memory_kb': round(peak / 1024, 1),
+        'status_codes': sorted(statuses),
+    })
+    return result
+
+
+def run_benchmark(users=5, days=90, logs_per_day=4, requests=50, warmup=5, stdout=None):
+    """
+    Seed synthetic data and profile the hot views against a fake CalorieNinjas.
+
+    Must run against a throwaway database: it creates users and food logs.
+
+    Returns:
+        dict: {'config', 'environment', 'results': {scenario: metrics}}
+    """
+    started_at = timezone.now().isoformat()
+    seed_start = time.perf_counter()
+    seeded = seed_users(users, days, logs_per_day, stdout=stdout)
+    seed_seconds = time.perf_counter() - seed_start
+
+    clients = []
+    for user in seeded:
+        client = Client()
+        client.force_login(user)
+        clients.append(client)
+
+    results = {}
+    with FakeCalorieNinjas() as api:
+        for name, method, url, data_factory in build_scenarios():
+            if stdout:
+                stdout.write(f'Benchmarking {name}...')
+            results[name] = benchmark_scenario(clients, method, url, data_factory, requests, warmup)
+        api_calls = api.calls
+
+    return {
+        'config': {
+            'users': users,
+            'days': days,
+            'logs_per_day': logs_per_day,
+            'requests': requests,
+            'warmup': warmup,
+        },
+        'environment': {
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'database': connection.vendor,
+            'platform': platform.platform(),
+        },
+        'started_at': started_at,
+        'seed_seconds': round(seed_seconds, 2),
+        'fake_api_calls': api_calls,
+        'results': results,
+    }
@@ -0,0 +1,542 @@
+import hashlib
+import logging
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import DatabaseError
+from django.db.models import F
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_SETTINGS = {
+    'MEMORY_MAX_ENTRIES': 512,
+    'DB_MAX_ENTRIES': 50000,
+    'TTL_SECONDS': 60 * 60 * 24 * 30,  # 30 days
+    'DB_EVICTION_INTERVAL': 100,  # Check the DB size every N writes
+    'LOCK_TTL_SECONDS': 15,  # Longest a worker waits on another worker's lookup
+    'LOCK_POLL_SECONDS': 0.1,
+}
+
+_NUMBER_RE = re.compile(r'\d+(?:[.,]\d+)*(?:/\d+)?')
+_THOUSANDS_RE = re.compile(r'^\d{1,3}(?:,\d{3})+$')
+
+
+def get_cache_settings():
+    """
+    Merge CALORIENINJAS_CACHE from settings with the defaults
+    """
+    config = dict(DEFAULT_CACHE_SETTINGS)
+    config.update(getattr(settings, 'CALORIENINJAS_CACHE', {}) or {})
+    return config
+
+
+def _format_number(value):
+    text = f"{value:.4f}".rstrip('0').rstrip('.')
+    return text or '0'
+
+
+def _normalize_number(match):
+    text = match.group(0)
+    try:
+        if '/' in text:
+            numerator, denominator = text.split('/', 1)
+            numerator = float(numerator.replace(',', '.'))
+            denominator = float(denominator)
+            if not denominator:
+                return text
+            return _format_number(numerator / denominator)
+        if _THOUSANDS_RE.match(text):
+            return _format_number(float(text.replace(',', '')))
+        return _format_number(float(text.replace(',', '.')))
+    except ValueError:
+        return text
+
+
+def canonical_numbers(text):
+    """
+    Canonical number formatting ("2.50" -> "2.5", "1,000" -> "1000",
+    "1,5" -> "1.5", "1/2" -> "0.5"), so a comma left in the text is never
+    part of a number
+    """
+    text = unicodedata.normalize('NFKC', text or '').replace('⁄', '/')
+    return _NUMBER_RE.sub(_normalize_number, text)
+
+
+def normalize_query(query):
+    """
+    Normalize a natural language food query so that trivially different
+    phrasings share a cache entry.
+
+    "2 Eggs and Toast!", "2.0 eggs  and toast" and "02 eggs and toast"
+    all normalize to "2 eggs and toast".
+
+    Args:
+        query (str): Raw query typed by the user
+
+    Returns:
+        str: Normalized query
+    """
+    text = canonical_numbers(query).lower()
+    text = text.replace('&', ' and ')
+
+    # Separate quantities from units ("14oz" -> "14 oz")
+    text = re.sub(r'(\d)([^\W\d_])', r'\1 \2', text)
+
+    # Drop punctuation, keeping decimal points inside numbers
+    text = re.sub(r'(?<!\d)\.|\.(?!\d)', ' ', text)
+    text = re.sub(r'[^\w\s.]', ' ', text)
+
+    return ' '.join(text.split())
+
+
+# Narrative words users put in front of the actual food ("last night we ordered ...")
+_LEADING_FILLER = {
+    'i', 'we', 'he', 'she', 'they', 'just', 'had', 'have', 'ate', 'eaten', 'eat',
+    'ordered', 'order', 'drank', 'drink', 'got', 'for', 'breakfast', 'lunch',
+    'dinner', 'snack', 'last', 'night', 'today', 'tonight', 'yesterday', 'this',
+    'morning', 'afternoon', 'evening',
+}
+# Words that start the food once the narrative is over ("... ordered a steak")
+_FOOD_START_WORDS = {
+    'a', 'an', 'the', 'some', 'my', 'our', 'one', 'two', 'three', 'four', 'five',
+    'six', 'seven', 'eight', 'nine', 'ten', 'twelve', 'half', 'dozen', 'couple',
+}
+# Only explicit separators split a query; "and" may be part of a dish
+_SEGMENT_SPLIT_RE = re.compile(r'[,;\n]+')
+_CONJUNCTION_RE = re.compile(r'\b(?:and|with|plus|then)\b')
+
+
+def strip_leading_filler(text):
+    """
+    Drop narrative words before the food in a normalized phrase
+    ("last night we ordered a steak" -> "a steak"). They are only dropped
+    when a quantity or article follows, so "breakfast burrito" and "lunch
+    meat sandwich" keep their first word.
+    """
+    words = text.split()
+    count = 0
+    while count < len(words) and words[count] in _LEADING_FILLER:
+        count += 1
+    if count < len(words) and (words[count] in _FOOD_START_WORDS or words[count][0].isdigit()):
+        words = words[count:]
+    return ' '.join(words)
+
+
+def split_food_query(query):
+    """
+    Split a natural language query into normalized segments on commas,
+    semicolons and new lines.
+
+    "Last night we ordered a 14oz prime rib; mashed potatoes" becomes
+    ["a 14 oz prime rib", "mashed potatoes"]. Numbers are made canonical
+    first, so "1,5 kg rice" stays one segment. "and", "with" and "plus" are
+    left inside the segment (see split_conjunctions). Repeated segments
+    are kept, so "1 banana, 1 banana" is two bananas.
+
+    Args:
+        query (str): Raw query typed by the user
+
+    Returns:
+        list: Normalized segments in query order
+    """
+    segments = []
+    for part in _SEGMENT_SPLIT_RE.split(canonical_numbers(query).replace('+', ' plus ')):
+        segment = strip_leading_filler(normalize_query(part))
+        if segment:
+            segments.append(segment)
+    return segments
+
+
+def split_conjunctions(segment):
+    """
+    Pieces of a segment around and/with/plus/then ("2 eggs and toast" ->
+    ["2 eggs", "toast"]). A segment is only treated as several foods when
+    something confirms it: the API returned one item per piece, or every
+    piece is a local food. "mac and cheese" stays one dish.
+    """
+    pieces = (strip_leading_filler(piece) for piece in _CONJUNCTION_RE.split(segment))
+    return [piece for piece in pieces if piece]
+
+
+def query_hash(normalized_query):
+    return hashlib.sha256(normalized_query.encode('utf-8')).hexdigest()
+
+
+class LRUCache:
+    """
+    Thread-safe, size-bounded in-process LRU cache with a per-entry TTL
+    """
+
+    def __init__(self, max_entries, ttl_seconds):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            value, expires_at = entry
+            if expires_at <= time.monotonic():
+                del self._data[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value, ttl_seconds=None):
+        ttl = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self):
+        return {
+            'entries': len(self._data),
+            'max_entries': self.max_entries,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'expirations': self.expirations,
+        }
+
+
+class NutritionQueryCache:
+    """
+    Two-tier cache for CalorieNinjas responses.
+
+    Tier 1 is an in-process LRU, tier 2 is the NutritionLookupCache table
+    shared by every worker. Entries are keyed on the normalized query and
+    only successful API responses are stored.
+    """
+
+    def __init__(self, config=None):
+        self.config = config or get_cache_settings()
+        self.memory = LRUCache(
+            self.config['MEMORY_MAX_ENTRIES'],
+            self.config['TTL_SECONDS'],
+        )
+        self._lock = threading.Lock()
+        self._writes = 0
+        self.db_hits = 0
+        self.db_misses = 0
+        self.db_evictions = 0
+
+    def get(self, query):
+        """
+        Look up the raw API response for a query
+
+        Returns:
+            dict or None: Raw CalorieNinjas response data on a hit
+        """
+        normalized = normalize_query(query)
+        if not normalized:
+            return None
+
+        key = query_hash(normalized)
+        data = self.memory.get(key)
+        if data is not None:
+            return data
+
+        data = self._db_get(key)
+        if data is None:
+            with self._lock:
+                self.db_misses += 1
+            return None
+
+        with self._lock:
+            self.db_hits += 1
+        self.memory.set(key, data)
+        return data
+
+    def set(self, query, data):
+        """
+        Store a raw API response for a query in both tiers
+        """
+        normalized = normalize_query(query)
+        if not normalized:
+            return
+
+        key = query_hash(normalized)
+        self.memory.set(key, data)
+        self._db_set(key, normalized, data)
+
+    def delete(self, query):
+        from .models import NutritionLookupCache
+
+        key = query_hash(normalize_query(query))
+        self.memory.delete(key)
+        NutritionLookupCache.objects.filter(query_hash=key).delete()
+
+    def clear(self):
+        from .models import NutritionLookupCache
+
+        self.memory.clear()
+        NutritionLookupCache.objects.all().delete()
+
+    def purge_expired(self):
+        """
+        Delete expired rows from the database tier
+
+        Returns:
+            int: Number of rows removed
+        """
+        from .models import NutritionLookupCache
+
+        deleted, _ = NutritionLookupCache.objects.filter(
+            expires_at__lte=timezone.now()
+        ).delete()
+        with self._lock:
+            self.db_evictions += deleted
+        return deleted
+
+    def stats(self):
+        """
+        Hit, miss and eviction counters for this process
+        """
+        memory = self.memory.stats()
+        lookups = memory['hits'] + memory['misses']
+        hits = memory['hits'] + self.db_hits
+        return {
+            'memory': memory,
+            'database': {
+                'hits': self.db_hits,
+                'misses': self.db_misses,
+                'evictions': self.db_evictions,
+                'max_entries': self.config['DB_MAX_ENTRIES'],
+            },
+            'lookups': lookups,
+            'hits': hits,
+            'misses': self.db_misses,
+            'hit_rate': round(hits / lookups, 3) if lookups else 0,
+        }
+
+    def _db_get(self, key):
+        from .models import NutritionLookupCache
+
+        now = timezone.now()
+        try:
+            entry = NutritionLookupCache.objects.filter(
+                query_hash=key,
+                expires_at__gt=now,
+            ).values('pk', 'response_data').first()
+            if entry is None:
+                return None
+
+            NutritionLookupCache.objects.filter(pk=entry['pk']).update(
+                hit_count=F('hit_count') + 1,
+                last_accessed_at=now,
+            )
+            return entry['response_data']
+        except DatabaseError as e:
+            logger.warning(f"Nutrition cache read failed: {str(e)}")
+            return None
+
+    def _db_set(self, key, normalized, data):
+        from .models import NutritionLookupCache
+
+        now = timezone.now()
+        try:
+            NutritionLookupCache.objects.update_or_create(
+                query_hash=key,
+                defaults={
+                    'normalized_query': normalized,
+                    'response_data': data,
+                    'last_accessed_at': now,
+                    'expires_at': now + timedelta(seconds=self.config['TTL_SECONDS']),
+                },
+            )
+        except DatabaseError as e:
+            logger.warning(f"Nutrition cache write failed: {str(e)}")
+            return
+
+        with self._lock:
+            self._writes += 1
+            check_size = self._writes % self.config['DB_EVICTION_INTERVAL'] == 0
+        if check_size:
+            self.evict()
+
+    def evict(self):
+        """
+        Drop expired rows, then the least recently used rows over DB_MAX_ENTRIES
+
+        Returns:
+            int: Number of rows removed
+        """
+        from .models import NutritionLookupCache
+
+        try:
+            removed = self.purge_expired()
+            overflow = NutritionLookupCache.objects.count() - self.config['DB_MAX_ENTRIES']
+            if overflow > 0:
+                stale_ids = list(
+                    NutritionLookupCache.objects.order_by('last_accessed_at')
+                    .values_list('pk', flat=True)[:overflow]
+                )
+                deleted, _ = NutritionLookupCache.objects.filter(pk__in=stale_ids).delete()
+                with self._lock:
+                    self.db_evictions += deleted
+                removed += deleted
+            return removed
+        except DatabaseError as e:
+            logger.warning(f"Nutrition cache eviction failed: {str(e)}")
+            return 0
+
+
+class FoodItemStore:
+    """
+    Per-food-item nutrition store.
+
+    Items returned by CalorieNinjas are kept in the FoodItem table keyed by
+    canonical name and serving size, and the query segment that produced
+    each item is remembered as a FoodItemAlias. A new query can then be
+    split into the foods we already know plus a remainder for the API.
+    """
+
+    MAX_PHRASE_LENGTH = 255
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def canonical_name(name):
+        return ' '.join(str(name or '').lower().split())
+
+    def lookup(self, segments):
+        """
+        Find known items for query segments
+
+        Args:
+            segments (list): Normalized segments from split_food_query
+
+        Returns:
+            dict: Segment -> raw CalorieNinjas item for every known segment
+        """
+        from .models import FoodItem, FoodItemAlias
+
+        phrases = [s for s in segments if len(s) <= self.MAX_PHRASE_LENGTH]
+        known = {}
+        if phrases:
+            try:
+                aliases = FoodItemAlias.objects.filter(
+                    phrase__in=phrases
+                ).select_related('item')
+                known = {alias.phrase: alias.item for alias in aliases}
+                if known:
+                    FoodItem.objects.filter(
+                        pk__in=[item.pk for item in known.values()]
+                    ).update(hit_count=F('hit_count') + 1)
+            except DatabaseError as e:
+                logger.warning(f"Food item lookup failed: {str(e)}")
+                known = {}
+
+        with self._lock:
+            self.hits += sum(1 for segment in segments if segment in known)
+            self.misses += sum(1 for segment in segments if segment not in known)
+        return {phrase: item.item_data for phrase, item in known.items()}
+
+    def remember(self, segments, items):
+        """
+        Store API items and link them to the segments that produced them.
+
+        A segment is linked only when it can be attributed to exactly one
+        item: either it was the only segment sent, or exactly one returned
+        item name appears in it. When the API returned more items than
+        segments, the and/with pieces of each segment are linked instead.
+
+        Args:
+            segments (list): Normalized segments that were sent to the API
+            items (list): Raw items from the CalorieNinjas response
+        """
+        from .models import FoodItem, FoodItemAlias
+
+        try:
+            stored = []
+            for item in items:
+                name = self.canonical_name(item.get('name'))
+                if not name:
+                    stored.append(None)
+                    continue
+                food_item, _ = FoodItem.objects.update_or_create(
+                    name=name,
+                    serving_size_g=round(float(item.get('serving_size_g') or 0), 1),
+                    defaults={'item_data': item},
+                )
+                stored.append(food_item)
+
+            for segment, index in self._attribute(segments, items).items():
+                if stored[index] is None or len(segment) > self.MAX_PHRASE_LENGTH:
+                    continue
+                FoodItemAlias.objects.update_or_create(
+                    phrase=segment,
+                    defaults={'item': stored[index]},
+                )
+        except DatabaseError as e:
+            logger.warning(f"Food item store write failed: {str(e)}")
+
+    def _attribute(self, segments, items):
+        # More items than segments means the API split some of them, which
+        # is what makes "x and y" two foods; the pieces are linked instead
+        phrases = []
+        for segment in segments:
+            pieces = split_conjunctions(segment) if len(items) > len(segments) else []
+            phrases.extend(pieces if len(pieces) > 1 else [segment])
+
+        if len(phrases) == 1 and len(items) == 1:
+            return {phrases[0]: 0}
+
+        attributed = {}
+        claimed = set()
+        for phrase in phrases:
+            matches = [
+                index for index, item in enumerate(items)
+                if index not in claimed and re.search(
+                    r'\b' + re.escape(self.canonical_name(item.get('name'))) + r'(?:e?s)?\b',
+                    phrase,
+                )
+            ]
+            if len(matches) == 1:
+                attributed[phrase] = matches[0]
+                claimed.add(matches[0])
+        return attributed
+
+    def stats(self):
+        return {'hits': self.hits, 'misses': self.misses}
+
+
+# Process-wide caches shared by every CalorieNinjasService instance
+nutrition_cache = NutritionQueryCache()
+food_item_store = FoodItemStore()
@@ -0,0 +1,244 @@
+import logging
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import EnrichmentJob, FoodLog
+from .page_cache import bump_page_version
+from .services import CalorieNinjasService
+from .summaries import refresh_daily_summary
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_ENRICHMENT_SETTINGS = {
+    'MAX_ATTEMPTS': 5,
+    'RETRY_BASE_SECONDS': 10,
+    'LOCK_TIMEOUT_SECONDS': 300,
+}
+
+
+def get_enrichment_settings():
+    """
+    Merge FOOD_LOG_ENRICHMENT from settings with the defaults
+    """
+    config = dict(DEFAULT_ENRICHMENT_SETTINGS)
+    config.update(getattr(settings, 'FOOD_LOG_ENRICHMENT', {}) or {})
+    return config
+
+
+def async_enrichment_enabled():
+    return getattr(settings, 'FOOD_LOG_ASYNC_ENRICHMENT', False)
+
+
+# FoodLog fields apply_nutrition sets; the nutrient columns follow nutrition_data.
+# Saving only these keeps a user's concurrent edit of the meal type or date.
+ENRICHED_FIELDS = ['food_name', 'description', 'calories', 'nutrition_data', 'status', 'updated_at']
+
+
+def apply_nutrition(food_log, formatted_data):
+    """
+    Copy the output of CalorieNinjasService.format_for_food_log onto a FoodLog
+
+    Args:
+        food_log (FoodLog): Log to update (not saved)
+        formatted_data (dict): Data from format_for_food_log
+    """
+    food_log.food_name = formatted_data['food_name']
+    food_log.description = formatted_data['description']
+    food_log.calories = formatted_data['calories']
+    food_log.nutrition_data = formatted_data.get('nutrition', {})
+    food_log.status = FoodLog.STATUS_READY
+
+
+def enqueue(food_log):
+    """
+    Queue a saved, pending FoodLog for the background worker
+
+    Returns:
+        EnrichmentJob: The queued job
+    """
+    job, _ = EnrichmentJob.objects.update_or_create(
+        food_log=food_log,
+        defaults={
+            'status': EnrichmentJob.STATUS_QUEUED,
+            'run_after': timezone.now(),
+            'locked_at': None,
+        },
+    )
+    return job
+
+
+def requeue_stale_jobs():
+    """
+    Put jobs back in the queue whose worker died while running them
+
+    Returns:
+        int: Number of jobs requeued
+    """
+    config = get_enrichment_settings()
+    cutoff = timezone.now() - timedelta(seconds=config['LOCK_TIMEOUT_SECONDS'])
+    return EnrichmentJob.objects.filter(
+        status=EnrichmentJob.STATUS_RUNNING,
+        locked_at__lt=cutoff,
+    ).update(status=EnrichmentJob.STATUS_QUEUED, locked_at=None)
+
+
+def claim_jobs(limit=10):
+    """
+    Atomically claim up to `limit` due jobs for this worker.
+
+    Claiming is a conditional UPDATE on the queued status, so several
+    workers can poll the same table without an external broker.
+
+    Returns:
+        list: Claimed EnrichmentJob objects with their food logs loaded
+    """
+    now = timezone.now()
+    candidate_ids = list(
+        EnrichmentJob.objects.filter(
+            status=EnrichmentJob.STATUS_QUEUED,
+            run_after__lte=now,
+        ).order_by('run_after').values_list('pk', flat=True)[:limit]
+    )
+
+    claimed_ids = [
+        pk for pk in candidate_ids
+        if EnrichmentJob.objects.filter(pk=pk, status=EnrichmentJob.STATUS_QUEUED).update(
+            status=EnrichmentJob.STATUS_RUNNING,
+            locked_at=now,
+            attempts=F('attempts') + 1,
+        )
+    ]
+    return list(
+        EnrichmentJob.objects.filter(pk__in=claimed_ids).select_related('food_log')
+    )
+
+
+def process_job(job, service=None):
+    """
+    Look up nutrition for a claimed job and update its FoodLog
+
+    Returns:
+        bool: True if the log was enriched
+    """
+    config = get_enrichment_settings()
+    service = service or CalorieNinjasService()
+    food_log = job.food_log
+    query = food_log.natural_query or food_log.food_name
+
+    api_response = service.parse_food_query(query)
+
+    if api_response.get('success'):
+        formatted_data = service.format_for_food_log(query, api_response)
+        claimed_key = (food_log.user_id, food_log.date)
+        with transaction.atomic():
+            # The log may have been edited, or moved to another day, during the lookup
+            food_log = FoodLog.objects.select_for_update().filter(pk=job.food_log_id).first()
+            if food_log is None:
+                # Deleted meanwhile, and its job with it
+                return False
+            apply_nutrition(food_log, formatted_data)
+            # The save signal refreshes the day the log is on now
+            food_log.save(update_fields=ENRICHED_FIELDS)
+            if (food_log.user_id, food_log.date) != claimed_key:
+                refresh_daily_summary(*claimed_key)
+            job.food_log = food_log
+            job.status = EnrichmentJob.STATUS_DONE
+            job.last_error = ''
+            job.locked_at = None
+            job.save(update_fields=['status', 'last_error', 'locked_at', 'updated_at'])
+        return True
+
+    job.last_error = api_response.get('message') or api_response.get('error', 'Unknown error')
+    job.locked_at = None
+    if job.attempts >= config['MAX_ATTEMPTS']:
+        give_up(job)
+    else:
+        # Exponential backoff: 10s, 20s, 40s, ...
+        delay = config['RETRY_BASE_SECONDS'] * 2 ** (job.attempts - 1)
+        job.status = EnrichmentJob.STATUS_QUEUED
+        job.run_after = timezone.now() + timedelta(seconds=delay)
+        job.save(update_fields=['status', 'last_error', 'locked_at', 'run_after', 'updated_at'])
+    return False
+
+
+def give_up(job):
+    """
+    Mark a job that ran out of attempts, and its FoodLog, as failed
+    """
+    logger.error(f"Enrichment of FoodLog {job.food_log_id} failed permanently: {job.last_error}")
+    job.status = EnrichmentJob.STATUS_FAILED
+    job.locked_at = None
+    with transaction.atomic():
+        job.save(update_fields=['status', 'last_error', 'locked_at', 'updated_at'])
+        FoodLog.objects.filter(pk=job.food_log_id).update(
+            status=FoodLog.STATUS_FAILED,
+            description='Could not fetch nutrition data',
+            updated_at=timezone.now(),  # update() skips auto_now; page ETags key off it
+        )
+        # update() skips the signals that invalidate the owner's cached pages
+        bump_page_version(job.food_log.user_id)
+
+
+def run_worker(batch_size=10, poll_interval=2.0, once=False, stdout=None):
+    """
+    Process enrichment jobs until interrupted (or until the queue is empty with once=True)
+
+    Returns:
+        int: Number of jobs processed
+    """
+    config = get_enrichment_settings()
+    service = CalorieNinjasService()
+    processed = 0
+
+    while True:
+        requeue_stale_jobs()
+        jobs = claim_jobs(batch_size)
+
+        for job in jobs:
+            try:
+                enriched = process_job(job, service)
+            except Exception as e:
+                logger.exception(f"Enrichment job {job.pk} crashed")
+                if job.attempts >= config['MAX_ATTEMPTS']:
+                    job.last_error = f"Worker crashed: {e}"
+                    give_up(job)
+                else:
+                    EnrichmentJob.objects.filter(pk=job.pk).update(
+                        status=EnrichmentJob.STATUS_QUEUED,
+                        locked_at=None,
+                        run_after=timezone.now() + timedelta(seconds=poll_interval),
+                    )
+                enriched = False
+            processed += 1
+            if stdout:
+                stdout.write(f"{'Enriched' if enriched else 'Retrying'} FoodLog {job.food_log_id}")
+
+        if not jobs:
+            if once:
+                return processed
+            time.sleep(poll_interval)
+
+
+def pending_status(user, ids):
+    """
+    Current status of the given food logs for the polling endpoint
+
+    Returns:
+        dict: id -> {'status', 'food_name', 'calories'}
+    """
+    logs = FoodLog.objects.filter(user=user, pk__in=ids).values(
+        'pk', 'status', 'food_name', 'calories'
+    )
+    return {
+        log['pk']: {
+            'status': log['status'],
+            'food_name': log['food_name'],
+            'calories': log['calories'],
+        }
+        for log in logs
+    }
@@ -0,0 +1,128 @@
+"""
+Streaming export of food logs as CSV or JSON lines.
+
+Rows are read with QuerySet.iterator(), which uses a server-side cursor on
+PostgreSQL and bounded fetchmany() batches elsewhere, and are encoded into
+chunks as they arrive. Memory use does not depend on how many logs are
+exported. Shared by the export view and `manage.py export_food_logs`.
+"""
+import csv
+import json
+import zlib
+from datetime import date, datetime
+
+from .models import FoodLog
+
+FORMATS = {
+    'csv': 'text/csv',
+    'jsonl': 'application/x-ndjson',
+}
+
+# Rows fetched from the database per round trip
+EXPORT_CHUNK_SIZE = 2000
+
+# Encoded bytes gathered before a chunk is handed to the response/file
+OUTPUT_CHUNK_BYTES = 64 * 1024
+
+# The nutrient columns are nutrition_data flattened (see FoodLog.sync_nutrition_columns)
+EXPORT_FIELDS = [
+    'id', 'user_id', 'date', 'meal_type', 'food_name', 'description', 'natural_query',
+    'status', 'calories', *FoodLog.NUTRIENT_KEYS, 'created_at', 'updated_at',
+]
+
+
+class _Echo:
+    """
+    File-like object whose write() returns the line, so csv.writer can
+    encode one row at a time without buffering
+    """
+
+    def write(self, value):
+        return value
+
+
+def export_queryset(user=None, start_date=None, end_date=None):
+    """
+    Logs to export, oldest first, optionally for one user and a date range
+    """
+    logs = FoodLog.objects.all()
+    if user is not None:
+        logs = logs.filter(user=user)
+    if start_date:
+        logs = logs.filter(date__gte=start_date)
+    if end_date:
+        logs = logs.filter(date__lte=end_date)
+    return logs.order_by('date', 'created_at', 'id').values_list(*EXPORT_FIELDS)
+
+
+def _json_default(value):
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    raise TypeError(f"Cannot serialize {type(value).__name__}")
+
+
+def iter_lines(rows, fmt):
+    """
+    Encode rows as CSV (with a header line) or JSON lines
+
+    Yields:
+        str: One line per row
+    """
+    if fmt == 'csv':
+        writer = csv.writer(_Echo())
+        yield writer.writerow(EXPORT_FIELDS)
+        for row in rows:
+            yield writer.writerow(row)
+    else:
+        for row in rows:
+            yield json.dumps(dict(zip(EXPORT_FIELDS, row)), default=_json_default) + '\n'
+
+
+def iter_export(user=None, fmt='csv', start_date=None, end_date=None, compress=False):
+    """
+    Stream an export as encoded chunks of about OUTPUT_CHUNK_BYTES
+
+    Args:
+        user: Only export this user's logs (everyone's when None)
+        fmt (str): 'csv' or 'jsonl'
+        start_date, end_date (date): Optional inclusive date bounds
+        compress (bool): gzip the output
+
+    Yields:
+        bytes: Export data, gzip-compressed when compress is set
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown export format: {fmt}")
+
+    rows = export_queryset(user, start_date, end_date).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    # wbits=31 writes a gzip header and trailer
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31) if compress else None
+
+    buffer = []
+    size = 0
+    for line in iter_lines(rows, fmt):
+        data = line.encode('utf-8')
+        buffer.append(data)
+        size += len(data)
+        if size >= OUTPUT_CHUNK_BYTES:
+            chunk = b''.join(buffer)
+            buffer, size = [], 0
+            if compressor:
+                chunk = compressor.compress(chunk)
+            if chunk:
+                yield chunk
+
+    chunk = b''.join(buffer)
+    if compressor:
+        chunk = compressor.compress(chunk) + compressor.flush()
+    if chunk:
+        yield chunk
+
+
+def export_filename(fmt, start_date=None, end_date=None, compress=False):
+    parts = ['food-logs']
+    if start_date:
+        parts.append(start_date.isoformat())
+    if end_date:
+        parts.append(end_date.isoformat())
+    return '_'.join(parts) + f'.{fmt}' + ('.gz' if compress else '')
@@ -1,5 +1,5 @@
 from django import forms
-from .models import FoodLog
+from .models import FoodLog, Recipe
 from django.contrib.auth.models import User
 
 class FoodLogForm(forms.ModelForm):
@@ -140,4 +140,119 @@ class UserSettingsForm(forms.ModelForm):
         
         labels = {
             'email': 'Email Address',
-        }
\ No newline at end of file
+        }
+
+class FoodLogImportForm(forms.Form):
+    """Form for uploading a CSV of past meals"""
+    
+    csv_file = forms.FileField(
+        widget=forms.ClearableFileInput(attrs={
+            'class': 'form-control',
+            'accept': '.csv,text/csv',
+        }),
+        label='CSV File',
+        help_text='Columns: date, meal_type, food_name or natural_query, and optionally calories and nutrients'
+    )
+    
+    def clean_csv_file(self):
+        from .imports import get_import_settings
+        
+        csv_file = self.cleaned_data['csv_file']
+        max_mb = get_import_settings()['MAX_UPLOAD_MB']
+        if csv_file.size > max_mb * 1024 * 1024:
+            raise forms.ValidationError(f"The file is larger than {max_mb} MB.")
+        if not csv_file.name.lower().endswith('.csv'):
+            raise forms.ValidationError("Please upload a .csv file.")
+        return csv_file
+
+
+class RecipeForm(forms.ModelForm):
+    """Form for saving a recipe from a list of ingredient lines"""
+    
+    ingredients = forms.CharField(
+        widget=forms.Textarea(attrs={
+            'class': 'form-control',
+            'placeholder': '1 lb chicken thighs\n2 tbsp soy sauce\n3 cloves garlic\n2 cups rice',
+            'rows': 6,
+        }),
+        label='Ingredients',
+        help_text='One ingredient per line, with amounts'
+    )
+    
+    class Meta:
+        model = Recipe
+        fields = ['name', 'servings']
+        
+        widgets = {
+            'name': forms.TextInput(attrs={
+                'class': 'form-control',
+                'placeholder': 'E.g., Adobo',
+            }),
+            'servings': forms.NumberInput(attrs={
+                'class': 'form-control',
+                'min': 0.5,
+                'step': 0.5,
+            }),
+        }
+        
+        labels = {
+            'name': 'Recipe Name',
+            'servings': 'Servings It Makes',
+        }
+    
+    def __init__(self, *args, user=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.user = user
+    
+    def clean_name(self):
+        from .cache import normalize_query
+        
+        name = self.cleaned_data['name'].strip()
+        if not normalize_query(name):
+            raise forms.ValidationError("Please give the recipe a name.")
+        if Recipe.objects.filter(user=self.user, lookup_name=normalize_query(name)[:100]).exists():
+            raise forms.ValidationError("You already have a recipe with this name.")
+        return name
+    
+    def clean_servings(self):
+        servings = self.cleaned_data['servings']
+        if servings is None or servings <= 0:
+            raise forms.ValidationError("Servings must be more than zero.")
+        return servings
+    
+    def clean_ingredients(self):
+        lines = [line.strip() for line in self.cleaned_data['ingredients'].splitlines() if line.strip()]
+        if not lines:
+            raise forms.ValidationError("Add at least one ingredient.")
+        if len(lines) > 50:
+            raise forms.ValidationError("A recipe can have at most 50 ingredients.")
+        if any(len(line) > 255 for line in lines):
+            raise forms.ValidationError("Each ingredient must be under 255 characters.")
+        return lines
+
+
+class RecipeIngredientForm(forms.Form):
+    """Form for adding or changing one ingredient of a recipe"""
+    
+    text = forms.CharField(
+        max_length=255,
+        widget=forms.TextInput(attrs={
+            'class': 'form-control',
+            'placeholder': 'E.g., 2 tbsp vinegar',
+        }),
+        label='Ingredient',
+    )
+
+
+class LogAgainForm(forms.Form):
+    """Date and meal for logging an earlier meal again; both optional"""
+    
+    meal_type = forms.ChoiceField(choices=FoodLog.MEAL_TYPE_CHOICES, required=False)
+    date = forms.DateField(required=False)
+    
+    def clean_date(self):
+        from django.utils import timezone
+        date = self.cleaned_data.get('date')
+        if date and date > timezone.now().date():
+            raise forms.ValidationError("Date cannot be in the future.")
+        return date
@@ -0,0 +1,193 @@
+"""
+Recent and frequent foods for one-tap "log again".
+
+FrequentFood holds one row per distinct meal a user has logged (keyed by
+the normalized query), with a count, the last time it was logged and a
+copy of the latest log's nutrition. The FoodLog signals bump or drop the
+count as logs are saved and deleted, so the home page reads two short
+indexed lists instead of grouping FoodLog on every load.
+
+Logging a meal again copies the stored nutrition onto a new FoodLog; no
+lookup is made.
+"""
+from django.db import IntegrityError, transaction
+from django.db.models import Case, F, Q, Value, When
+from django.db.models.functions import Greatest
+
+from .cache import normalize_query
+from .models import FoodLog, FrequentFood
+
+# Entries shown in each of the recent and frequent lists
+RELOG_LIMIT = 5
+
+# Fields copied from a log (or a FrequentFood) onto the new log
+CLONED_FIELDS = ['food_name', 'description', 'calories', 'nutrition_data', 'natural_query']
+
+
+def food_key(food_log):
+    return normalize_query(food_log.natural_query or food_log.food_name)[:255]
+
+
+def _snapshot(food_log):
+    return {
+        'natural_query': food_log.natural_query,
+        'food_name': food_log.food_name,
+        'description': food_log.description,
+        'calories': food_log.calories,
+        'nutrition_data': food_log.nutrition_data,
+        'meal_type': food_log.meal_type,
+    }
+
+
+def record_log(food_log):
+    """
+    Count a ready log towards its meal, creating the meal's row if needed
+    """
+    key = food_key(food_log)
+    if food_log.user_id is None or not key:
+        return
+    rows = FrequentFood.objects.filter(user_id=food_log.user_id, lookup_key=key)
+    changes = dict(
+        _snapshot(food_log),
+        log_count=F('log_count') + 1,
+        last_logged_at=Greatest(F('last_logged_at'), food_log.created_at),
+    )
+    if rows.update(**changes):
+        return
+    try:
+        with transaction.atomic():
+            FrequentFood.objects.create(
+                user_id=food_log.user_id,
+                lookup_key=key,
+                log_count=1,
+                last_logged_at=food_log.created_at,
+                **_snapshot(food_log),
+            )
+    except IntegrityError:
+        # Another request created the row first
+        rows.update(**changes)
+
+
+def forget_log(food_log):
+    """
+    Stop counting a deleted log; the meal's row goes when its count reaches
+    zero. If the log was the meal's latest, the row falls back to the
+    nutrition and time of the latest one left.
+    """
+    key = food_key(food_log)
+    if food_log.user_id is None or not key:
+        return
+    rows = FrequentFood.objects.filter(user_id=food_log.user_id, lookup_key=key)
+    changes = {'log_count': Greatest(F('log_count') - 1, 0)}
+    latest = latest_log(food_log.user_id, key)
+    if latest is not None and food_log.created_at is not None:
+        # Only a row still showing the deleted log moves back, in the same update
+        stale = Q(last_logged_at__lte=food_log.created_at)
+        fallback = dict(_snapshot(latest), last_logged_at=latest.created_at)
+        for field, value in fallback.items():
+            output_field = FrequentFood._meta.get_field(field)
+            changes[field] = Case(When(stale, then=Value(value, output_field=output_field)), default=F(field))
+    rows.update(**changes)
+    rows.filter(log_count=0).delete()
+
+
+def latest_log(user_id, key):
+    """
+    The user's most recent ready log of a meal, or None
+    """
+    logs = FoodLog.objects.filter(user_id=user_id, status=FoodLog.STATUS_READY)
+    words = [word for word in key.split() if word.isascii() and word.isalpha() and word != 'and']
+    if words:
+        # Each letter-only word of the key appears in the text it was built
+        # from, so this narrows the scan without missing a match
+        word = max(words, key=len)
+        logs = logs.filter(Q(natural_query__icontains=word) | Q(food_name__icontains=word))
+    candidates = logs.order_by('-created_at', '-id').only('created_at', 'meal_type', *CLONED_FIELDS)
+    # The newest candidate nearly always matches, so read a single row first
+    # and widen the page only while the candidates are other meals
+    start, size = 0, 1
+    while True:
+        page = list(candidates[start:start + size])
+        for candidate in page:
+            if food_key(candidate) == key:
+                return candidate
+        if len(page) < size:
+            return None
+        start, size = start + size, min(size * 10, 200)
+
+
+def rebuild_frequent_foods(user=None, batch_size=2000):
+    """
+    Rebuild FrequentFood rows from scratch, for one user or everyone. Needed
+    after bulk_create, which skips the signals.
+
+    Returns:
+        int: Number of rows written
+    """
+    logs = FoodLog.objects.filter(user__isnull=False, status=FoodLog.STATUS_READY)
+    existing = FrequentFood.objects.all()
+    if user is not None:
+        logs = logs.filter(user=user)
+        existing = existing.filter(user=user)
+
+    foods = {}
+    # Oldest first, so each row ends up with its latest log's nutrition
+    for food_log in logs.order_by('created_at', 'id').only(
+        'user_id', 'created_at', 'meal_type', *CLONED_FIELDS,
+    ).iterator(chunk_size=batch_size):
+        key = food_key(food_log)
+        if not key:
+            continue
+        food = foods.get((food_log.user_id, key))
+        if food is None:
+            food = foods[(food_log.user_id, key)] = FrequentFood(
+                user_id=food_log.user_id, lookup_key=key, log_count=0,
+            )
+        for field, value in _snapshot(food_log).items():
+            setattr(food, field, value)
+        food.log_count += 1
+        food.last_logged_at = food_log.created_at
+
+    with transaction.atomic():
+        existing.delete()
+        FrequentFood.objects.bulk_create(foods.values(), batch_size=batch_size)
+    return len(foods)
+
+
+def relog_choices(user, limit=RELOG_LIMIT):
+    """
+    The user's most recently logged meals, and their most logged ones not
+    already among the recent
+
+    Returns:
+        dict: {'recent': [FrequentFood], 'frequent': [FrequentFood]}
+    """
+    foods = FrequentFood.objects.filter(user=user).only(
+        'food_name', 'calories', 'meal_type', 'log_count', 'last_logged_at',
+    )
+    recent = list(foods.order_by('-last_logged_at')[:limit])
+    recent_ids = {food.pk for food in recent}
+    frequent = [
+        food for food in foods.filter(log_count__gt=1).order_by('-log_count', '-last_logged_at')[:limit * 2]
+        if food.pk not in recent_ids
+    ][:limit]
+    return {'recent': recent, 'frequent': frequent}
+
+
+def clone_food_log(source, user, day, meal_type=None):
+    """
+    Log a meal again from an earlier FoodLog or a FrequentFood, copying its
+    nutrition
+
+    Returns:
+        FoodLog: The new log
+    """
+    food_log = FoodLog(
+        user=user,
+        date=day,
+        meal_type=meal_type or source.meal_type,
+        status=FoodLog.STATUS_READY,
+        **{field: getattr(source, field) for field in CLONED_FIELDS},
+    )
+    food_log.save()
+    return food_log
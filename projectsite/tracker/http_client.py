@@ -0,0 +1,232 @@
+import asyncio
+import logging
+import random
+import threading
+import time
+import weakref
+
+import httpx
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_HTTP_SETTINGS = {
+    'CONNECT_TIMEOUT': 3.05,
+    'READ_TIMEOUT': 10,
+    'MAX_RETRIES': 2,
+    'BACKOFF_FACTOR': 0.3,
+    'BACKOFF_JITTER': 0.3,
+    'BACKOFF_MAX': 4,
+    'POOL_CONNECTIONS': 4,
+    'POOL_MAXSIZE': 10,
+    'ASYNC_MAX_CONNECTIONS': 100,
+    'BREAKER_FAILURE_THRESHOLD': 5,
+    'BREAKER_RESET_SECONDS': 30,
+}
+
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+
+
+def get_http_settings():
+    """
+    Merge CALORIENINJAS_HTTP from settings with the defaults
+    """
+    config = dict(DEFAULT_HTTP_SETTINGS)
+    config.update(getattr(settings, 'CALORIENINJAS_HTTP', {}) or {})
+    return config
+
+
+def get_timeout():
+    """
+    (connect, read) timeout tuple for requests
+    """
+    config = get_http_settings()
+    return (config['CONNECT_TIMEOUT'], config['READ_TIMEOUT'])
+
+
+class CircuitBreaker:
+    """
+    Minimal thread-safe circuit breaker.
+
+    After `failure_threshold` consecutive failures the breaker opens and
+    every call fails fast for `reset_seconds`. It then lets a single trial
+    request through (half-open); success closes it again, failure re-opens it.
+    A trial that reports no outcome within `reset_seconds` is written off and
+    the next call becomes the new trial.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold, reset_seconds):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self._lock = threading.Lock()
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self._trial_started_at = 0.0
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._current_state()
+
+    def _current_state(self):
+        if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_seconds:
+            self._state = self.HALF_OPEN
+            self._trial_in_flight = False
+        return self._state
+
+    def allow_request(self):
+        """
+        Return True if a call may go out now
+        """
+        with self._lock:
+            state = self._current_state()
+            if state == self.CLOSED:
+                return True
+            if state != self.HALF_OPEN:
+                return False
+            now = time.monotonic()
+            if self._trial_in_flight and now - self._trial_started_at < self.reset_seconds:
+                return False
+            if self._trial_in_flight:
+                logger.warning("CalorieNinjas circuit breaker trial timed out, allowing another")
+            self._trial_in_flight = True
+            self._trial_started_at = now
+            return True
+
+    def record_success(self):
+        with self._lock:
+            if self._state != self.CLOSED:
+                logger.info("CalorieNinjas circuit breaker closed")
+            self._state = self.CLOSED
+            self._failures = 0
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                if self._state != self.OPEN:
+                    logger.warning(
+                        f"CalorieNinjas circuit breaker opened after {self._failures} failures"
+                    )
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+                self._trial_in_flight = False
+
+    def reset(self):
+        with self._lock:
+            self._state = self.CLOSED
+            self._failures = 0
+            self._trial_in_flight = False
+
+
+_session = None
+_breaker = None
+_lock = threading.Lock()
+
+
+def build_session(config=None):
+    """
+    Build a keep-alive session with bounded, jittered retries on 429/5xx
+    """
+    config = config or get_http_settings()
+    retry = Retry(
+        total=config['MAX_RETRIES'],
+        connect=config['MAX_RETRIES'],
+        # Never retry a read timeout: it would multiply the worst-case latency
+        read=0,
+        status=config['MAX_RETRIES'],
+        status_forcelist=RETRY_STATUS_CODES,
+        allowed_methods=frozenset(['GET']),
+        backoff_factor=config['BACKOFF_FACTOR'],
+        backoff_jitter=config['BACKOFF_JITTER'],
+        backoff_max=config['BACKOFF_MAX'],
+        # Retry-After can ask for minutes; keep the worker bounded by our own backoff
+        respect_retry_after_header=False,
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(
+        pool_connections=config['POOL_CONNECTIONS'],
+        pool_maxsize=config['POOL_MAXSIZE'],
+        max_retries=retry,
+    )
+    session = requests.Session()
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+def get_session():
+    """
+    Process-wide pooled session for CalorieNinjas calls
+    """
+    global _session
+    if _session is None:
+        with _lock:
+            if _session is None:
+                _session = build_session()
+    return _session
+
+
+def get_breaker():
+    """
+    Process-wide circuit breaker for CalorieNinjas calls
+    """
+    global _breaker
+    if _breaker is None:
+        with _lock:
+            if _breaker is None:
+                config = get_http_settings()
+                _breaker = CircuitBreaker(
+                    config['BREAKER_FAILURE_THRESHOLD'],
+                    config['BREAKER_RESET_SECONDS'],
+                )
+    return _breaker
+
+
+# httpx async clients are bound to the event loop that created them
+_async_clients = weakref.WeakKeyDictionary()
+
+
+def get_async_client():
+    """
+    Shared httpx.AsyncClient for the running event loop.
+
+    Under an ASGI server there is one loop per worker process, so every
+    async lookup in the worker shares one connection pool. Connection
+    errors are retried by the transport; 429/5xx retries are done by the
+    caller with retry_delay().
+    """
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None or client.is_closed:
+        config = get_http_settings()
+        client = httpx.AsyncClient(
+            timeout=httpx.Timeout(config['READ_TIMEOUT'], connect=config['CONNECT_TIMEOUT']),
+            limits=httpx.Limits(
+                max_connections=config['ASYNC_MAX_CONNECTIONS'],
+                max_keepalive_connections=config['POOL_MAXSIZE'],
+            ),
+            transport=httpx.AsyncHTTPTransport(retries=config['MAX_RETRIES']),
+        )
+        _async_clients[loop] = client
+    return client
+
+
+def retry_delay(retry_number, config=None):
+    """
+    Seconds to wait before retry number `retry_number` (1-based), using the
+    same jittered exponential backoff as the sync session
+    """
+    config = config or get_http_settings()
+    delay = config['BACKOFF_FACTOR'] * 2 ** (retry_number - 1)
+    return min(delay, config['BACKOFF_MAX']) + random.uniform(0, config['BACKOFF_JITTER'])
@@ -0,0 +1,352 @@
+"""
+CSV import of meal history.
+
+The file is read row by row with csv.DictReader and committed in batches:
+each batch is validated with FoodLogForm, enriched, inserted with one
+bulk_create and recorded on its ImportJob in the same transaction. After a
+crash the job resumes after its last committed batch.
+
+Rows that carry calories are imported as-is. Rows with only text (a food
+name or description) are looked up through CalorieNinjasService on a
+small thread pool, spaced by a shared rate limiter. Lookups that fail are
+saved as pending and handed to the background enrichment worker.
+"""
+import csv
+import io
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from itertools import islice
+
+from django.conf import settings
+from django.db import connections, transaction
+from django.utils import timezone
+
+from .autocomplete import suggestion_index
+from .enrichment import apply_nutrition
+from .forms import FoodLogForm
+from .frequent import rebuild_frequent_foods
+from .models import EnrichmentJob, FoodLog, ImportJob
+from .page_cache import bump_page_version
+from .services import CalorieNinjasService
+from .summaries import rebuild_daily_summaries
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_IMPORT_SETTINGS = {
+    'BATCH_SIZE': 500,
+    'ENRICH_WORKERS': 4,
+    'ENRICH_RATE_PER_SECOND': 5,
+    'MAX_UPLOAD_MB': 20,
+    'LOCK_TIMEOUT_SECONDS': 600,
+}
+
+# Row errors kept on the job for display; the rest are only counted
+MAX_STORED_ERRORS = 100
+
+TEXT_COLUMNS = ('natural_query', 'food_name', 'description')
+
+
+def get_import_settings():
+    """
+    Merge FOOD_LOG_IMPORT from settings with the defaults
+    """
+    config = dict(DEFAULT_IMPORT_SETTINGS)
+    config.update(getattr(settings, 'FOOD_LOG_IMPORT', {}) or {})
+    return config
+
+
+class RateLimiter:
+    """
+    Spaces calls at least 1/rate seconds apart across threads
+    """
+
+    def __init__(self, rate_per_second):
+        self.interval = 1.0 / rate_per_second if rate_per_second > 0 else 0
+        self._lock = threading.Lock()
+        self._next_slot = 0.0
+
+    def wait(self):
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+def queue_upload(user, upload):
+    """
+    Queue an uploaded CSV for the import worker. The contents are kept on
+    the job, so the worker does not need the web process's filesystem.
+
+    Returns:
+        ImportJob: The queued job
+    """
+    return ImportJob.objects.create(
+        user=user,
+        source_data=b''.join(upload.chunks()),
+        original_filename=upload.name[:255],
+    )
+
+
+def discard_upload(job):
+    """
+    Drop a finished or failed job's uploaded contents, and the file of an
+    upload stored under MEDIA_ROOT/imports/ before they were kept on the
+    job. Files imported from the command line are left alone.
+    """
+    job.source_data = None
+    uploads_dir = os.path.join(os.path.abspath(settings.MEDIA_ROOT), 'imports', '')
+    if job.source_path and os.path.abspath(job.source_path).startswith(uploads_dir):
+        try:
+            os.remove(job.source_path)
+        except OSError as e:
+            logger.warning(f"Could not delete upload of import #{job.pk}: {str(e)}")
+
+
+def check_header(fieldnames):
+    """
+    Raise ValueError unless the CSV has the columns an import needs
+    """
+    columns = {name.strip().lower() for name in fieldnames or [] if name}
+    if 'date' not in columns:
+        raise ValueError("The CSV needs a 'date' column")
+    if not columns & set(TEXT_COLUMNS):
+        raise ValueError("The CSV needs a 'food_name', 'natural_query' or 'description' column")
+
+
+def parse_row(row):
+    """
+    Validate one CSV row with the FoodLogForm rules and build its FoodLog
+
+    Rows without calories come back pending, with the text to look up in
+    natural_query.
+
+    Returns:
+        tuple: (unsaved FoodLog or None, dict of errors by column)
+    """
+    data = {key.strip().lower(): (value or '').strip() for key, value in row.items() if key}
+    text = next((data[column] for column in TEXT_COLUMNS if data.get(column)), '')
+
+    form = FoodLogForm({
+        'meal_type': data.get('meal_type', '').lower() or 'snack',
+        'date': data.get('date', ''),
+        'natural_query': text,
+    })
+    if not form.is_valid():
+        return None, {field: list(messages) for field, messages in form.errors.items()}
+    if not text:
+        return None, {'food_name': ['A food name or description is required.']}
+
+    food_log = form.save(commit=False)
+    food_log.natural_query = data.get('natural_query') or text
+
+    if not data.get('calories'):
+        food_log.food_name = text[:200]
+        food_log.status = FoodLog.STATUS_PENDING
+        return food_log, {}
+
+    nutrition = {}
+    errors = {}
+    for column in ['calories', *FoodLog.NUTRIENT_KEYS]:
+        if data.get(column):
+            try:
+                nutrition[column] = float(data[column])
+            except ValueError:
+                errors[column] = [f"'{data[column]}' is not a number."]
+    if errors:
+        return None, errors
+
+    food_log.food_name = (data.get('food_name') or text)[:200]
+    food_log.description = data.get('description') or None
+    food_log.calories = nutrition['calories']
+    food_log.nutrition_data = nutrition
+    food_log.status = FoodLog.STATUS_READY
+    return food_log, {}
+
+
+def enrich_logs(logs, config=None, service=None, limiter=None):
+    """
+    Look up nutrition for pending logs on a bounded thread pool
+
+    Logs whose lookup succeeds are filled in and marked ready; the others
+    stay pending.
+
+    Returns:
+        int: Number of logs enriched
+    """
+    if not logs:
+        return 0
+    config = config or get_import_settings()
+    service = service or CalorieNinjasService()
+    limiter = limiter or RateLimiter(config['ENRICH_RATE_PER_SECOND'])
+    workers = max(1, min(config['ENRICH_WORKERS'], len(logs)))
+
+    def lookup(food_log):
+        limiter.wait()
+        try:
+            return service.parse_food_query(food_log.natural_query)
+        except Exception as e:
+            logger.error(f"Import lookup failed for {food_log.natural_query!r}: {str(e)}")
+            return {'success': False, 'error': 'Lookup failed', 'message': str(e)}
+        finally:
+            if workers > 1:
+                # Pool threads get their own DB connections for the lookup cache
+                connections.close_all()
+
+    if workers == 1:
+        responses = [lookup(food_log) for food_log in logs]
+    else:
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='import-lookup') as pool:
+            responses = list(pool.map(lookup, logs))
+
+    enriched = 0
+    for food_log, api_response in zip(logs, responses):
+        if api_response.get('success'):
+            apply_nutrition(food_log, service.format_for_food_log(food_log.natural_query, api_response))
+            enriched += 1
+    return enriched
+
+
+def _read_batches(job, batch_size):
+    """
+    Yield (rows, first row number) batches after the job's checkpoint
+    """
+    if job.source_data is not None:
+        source = io.TextIOWrapper(io.BytesIO(job.source_data), newline='', encoding='utf-8-sig')
+    else:
+        source = open(job.source_path, newline='', encoding='utf-8-sig')
+    with source as f:
+        reader = csv.DictReader(f)
+        check_header(reader.fieldnames)
+        rows = islice(reader, job.rows_processed, None)
+        row_number = job.rows_processed + 1
+        while True:
+            batch = list(islice(rows, batch_size))
+            if not batch:
+                return
+            yield batch, row_number
+            row_number += len(batch)
+
+
+def run_import(job, stdout=None):
+    """
+    Import (or resume importing) the job's CSV file
+
+    Returns:
+        ImportJob: The finished job
+    """
+    config = get_import_settings()
+    service = CalorieNinjasService()
+    limiter = RateLimiter(config['ENRICH_RATE_PER_SECOND'])
+
+    job.status = ImportJob.STATUS_RUNNING
+    job.locked_at = timezone.now()
+    job.save(update_fields=['status', 'locked_at', 'updated_at'])
+
+    try:
+        for batch, first_row in _read_batches(job, config['BATCH_SIZE']):
+            logs, errors = [], []
+            for row_number, row in enumerate(batch, start=first_row):
+                food_log, row_errors = parse_row(row)
+                if row_errors:
+                    errors.append({'row': row_number, 'errors': row_errors})
+                else:
+                    food_log.user = job.user
+                    logs.append(food_log)
+
+            enriched = enrich_logs(
+                [food_log for food_log in logs if food_log.is_pending],
+                config, service, limiter,
+            )
+            for food_log in logs:
+                # bulk_create skips save(), which normally fills these columns
+                food_log.sync_nutrition_columns()
+
+            with transaction.atomic():
+                FoodLog.objects.bulk_create(logs)
+                EnrichmentJob.objects.bulk_create([
+                    EnrichmentJob(food_log=food_log) for food_log in logs if food_log.is_pending
+                ])
+                job.rows_processed += len(batch)
+                job.rows_imported += len(logs)
+                job.rows_enriched += enriched
+                job.rows_rejected += len(errors)
+                job.errors = (job.errors + errors)[:MAX_STORED_ERRORS]
+                job.locked_at = timezone.now()
+                job.save()
+
+            if stdout:
+                stdout.write(
+                    f"Import #{job.pk}: {job.rows_processed} rows read, {job.rows_imported} imported, "
+                    f"{job.rows_rejected} rejected"
+                )
+    except (OSError, UnicodeDecodeError, csv.Error, ValueError) as e:
+        logger.error(f"Import #{job.pk} failed: {str(e)}")
+        job.status = ImportJob.STATUS_FAILED
+        job.errors = (job.errors + [{'row': None, 'errors': {'file': [str(e)]}}])[:MAX_STORED_ERRORS + 1]
+        job.locked_at = None
+        discard_upload(job)
+        job.save(update_fields=['status', 'errors', 'locked_at', 'source_data', 'updated_at'])
+        return job
+
+    # bulk_create skips the FoodLog signals, so rebuild the user's rollups once
+    # and drop their autocomplete index for the next keystroke to rebuild
+    rebuild_daily_summaries(job.user)
+    rebuild_frequent_foods(job.user)
+    suggestion_index.forget(job.user_id)
+    bump_page_version(job.user_id)
+    job.status = ImportJob.STATUS_DONE
+    job.locked_at = None
+    discard_upload(job)
+    job.save(update_fields=['status', 'locked_at', 'source_data', 'updated_at'])
+    return job
+
+
+def claim_import_job():
+    """
+    Claim the oldest queued import, first requeueing any whose worker died
+
+    Returns:
+        ImportJob or None
+    """
+    config = get_import_settings()
+    cutoff = timezone.now() - timedelta(seconds=config['LOCK_TIMEOUT_SECONDS'])
+    ImportJob.objects.filter(status=ImportJob.STATUS_RUNNING, locked_at__lt=cutoff).update(
+        status=ImportJob.STATUS_QUEUED, locked_at=None,
+    )
+
+    for pk in ImportJob.objects.filter(status=ImportJob.STATUS_QUEUED).order_by('created_at').values_list('pk', flat=True)[:5]:
+        if ImportJob.objects.filter(pk=pk, status=ImportJob.STATUS_QUEUED).update(
+            status=ImportJob.STATUS_RUNNING, locked_at=timezone.now(),
+        ):
+            return ImportJob.objects.select_related('user').get(pk=pk)
+    return None
+
+
+def run_import_worker(poll_interval=5.0, once=False, stdout=None):
+    """
+    Run queued imports until interrupted (or until the queue is empty with once=True)
+
+    Returns:
+        int: Number of imports run
+    """
+    processed = 0
+    while True:
+        job = claim_import_job()
+        if job is None:
+            if once:
+                return processed
+            time.sleep(poll_interval)
+            continue
+
+        try:
+            run_import(job, stdout=stdout)
+        except Exception:
+            # Leave it running; it is requeued and resumed once its lock times out
+            logger.exception(f"Import job {job.pk} crashed")
+        processed += 1
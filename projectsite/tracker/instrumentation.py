@@ -0,0 +1,193 @@
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.template.backends.django import Template as DjangoTemplate
+
+_current_metrics = ContextVar('tracker_request_metrics', default=None)
+_templates_instrumented = False
+
+# Query budgets for every tracker URL: name -> {method: (max queries, max rows fetched)}.
+# QueryBudgetTests enforces both numbers. Rows are counted across all result
+# sets, so a view that starts scanning a user's whole history fails there
+# even when its query count stays flat. RequestTimingMiddleware warns when a
+# request runs more queries than its view's budget.
+# Every URL in tracker/urls.py must have an entry.
+QUERY_BUDGETS = {
+    # Session, user and the ETag query, then today's logs and the
+    # recent/frequent lists for log again. A 304 stops after the ETag query.
+    'home': {'GET': (6, 22)},
+    'dashboard': {'GET': (6, 38)},
+    # One read of the daily summaries: at most a row per day for the 90 days
+    # shown and the 89 before them that fill the first 90-day window
+    'trends': {'GET': (4, 184)},
+    # Cold lookup cache: the local food index is loaded, the lookup lock is
+    # taken, and the API items, their aliases and the cached query are stored
+    'add_food_log': {'POST': (46, 11)},
+    'edit_food_log': {'GET': (3, 3), 'POST': (14, 7)},
+    # Deleting a log also reads the meal's latest remaining log, which the
+    # frequent-food row falls back to when the deleted log was its newest
+    'delete_food_log': {'GET': (3, 3), 'POST': (13, 6)},
+    'food_log_status': {'GET': (3, 6)},
+    'log_again': {'POST': (10, 6)},
+    'log_frequent_food': {'POST': (10, 6)},
+    # Cold index: the user's last MAX_HISTORY logs and the common foods are
+    # read once; later keystrokes only touch the session
+    'suggest_foods': {'GET': (5, 500)},
+    # A week of logs, read through one streaming query
+    'export_food_logs': {'GET': (3, 30)},
+    # Creating or adding to a recipe looks its ingredients up like add_food_log
+    'recipes': {'GET': (3, 3), 'POST': (56, 13)},
+    'recipe_detail': {'GET': (4, 6), 'POST': (34, 10)},
+    'delete_recipe': {'POST': (5, 3)},
+    'profile': {'GET': (4, 7)},
+    'settings': {'GET': (2, 2)},
+    'import_food_logs': {'GET': (3, 2)},
+    # Session, user and the ETag aggregate come first; a page of 50 logs
+    # fetches one extra row to detect the next page
+    'api_food_logs': {'GET': (4, 54)},
+    'api_daily_totals': {'GET': (4, 33)},
+    'api_meal_counts': {'GET': (4, 4)},
+    'api_trends': {'GET': (4, 182)},
+}
+
+# Budget for views without their own entry (other apps, admin)
+DEFAULT_QUERY_BUDGET = max(
+    max_queries for methods in QUERY_BUDGETS.values() for max_queries, _ in methods.values()
+)
+
+
+def query_budget(url_name, method):
+    """
+    Most queries a request to the tracker view `url_name` should run
+    """
+    budget = QUERY_BUDGETS.get(url_name, {}).get(method)
+    return budget[0] if budget else DEFAULT_QUERY_BUDGET
+
+
+class RequestMetrics:
+    """
+    Timing counters for one request. All durations are in seconds.
+    """
+
+    __slots__ = ('started', 'db_queries', 'db_time', 'api_calls', 'api_time', 'template_time')
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.db_queries = 0
+        self.db_time = 0.0
+        self.api_calls = 0
+        self.api_time = 0.0
+        self.template_time = 0.0
+
+    def query_wrapper(self, execute, sql, params, many, context):
+        """
+        connection.execute_wrapper hook counting queries and their time
+        """
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_queries += 1
+            self.db_time += time.perf_counter() - start
+
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+
+def count_query(execute, sql, params, many, context):
+    """
+    Execute wrapper adding a query to the current request's metrics, if any
+    """
+    metrics = _current_metrics.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    return metrics.query_wrapper(execute, sql, params, many, context)
+
+
+def _instrument_connection(sender=None, connection=None, **kwargs):
+    if count_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(count_query)
+
+
+def instrument_queries():
+    """
+    Count queries on every database connection against the current request.
+
+    Connections are per thread, and async views run their ORM calls in
+    sync_to_async threads, so the wrapper is installed on each connection
+    as it opens rather than only on the request thread's. The metrics
+    context variable follows the request into those threads. Safe to call
+    more than once.
+    """
+    connection_created.connect(_instrument_connection, dispatch_uid='tracker_count_query')
+    for connection in connections.all(initialized_only=True):
+        _instrument_connection(connection=connection)
+
+
+def start_request():
+    """
+    Begin collecting metrics for the current request
+
+    Returns:
+        tuple: (RequestMetrics, token for end_request)
+    """
+    metrics = RequestMetrics()
+    return metrics, _current_metrics.set(metrics)
+
+
+def end_request(token):
+    _current_metrics.reset(token)
+
+
+def current_metrics():
+    """
+    Metrics for the request being handled, or None outside instrumented requests
+    """
+    return _current_metrics.get()
+
+
+@contextmanager
+def track_api_call():
+    """
+    Time an outbound CalorieNinjas call against the current request
+    """
+    metrics = _current_metrics.get()
+    if metrics is None:
+        yield
+        return
+
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics.api_calls += 1
+        metrics.api_time += time.perf_counter() - start
+
+
+def instrument_templates():
+    """
+    Wrap the Django template backend so render time is added to the current
+    request's metrics. Safe to call more than once.
+    """
+    global _templates_instrumented
+    if _templates_instrumented:
+        return
+
+    original_render = DjangoTemplate.render
+
+    def render(self, context=None, request=None):
+        metrics = _current_metrics.get()
+        if metrics is None:
+            return original_render(self, context, request)
+
+        start = time.perf_counter()
+        try:
+            return original_render(self, context, request)
+        finally:
+            metrics.template_time += time.perf_counter() - start
+
+    DjangoTemplate.render = render
+    _templates_instrumented = True
@@ -0,0 +1,151 @@
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+
+import requests
+
+from .benchmark import summarize_latencies
+from .testing import load_corpus
+
+MEAL_TYPES = ['breakfast', 'lunch', 'dinner', 'snack']
+
+
+def build_query_pool(size, seed=0):
+    """
+    `size` distinct natural-language queries built from the fixture corpus.
+    A small pool means mostly lookup-cache hits, a large one mostly misses.
+    """
+    rng = random.Random(seed)
+    foods = sorted(load_corpus())
+    pool = set()
+    attempts = 0
+    while len(pool) < size and attempts < size * 20:
+        attempts += 1
+        first, second = rng.sample(foods, 2)
+        pool.add(f'{rng.randint(1, 4)} {first} and {rng.randint(1, 3)} {second}')
+    return sorted(pool)
+
+
+class LoadTestClient:
+    """
+    One logged-in browser session against a running tracker site.
+
+    The session is minted directly in the database (see mint_sessions),
+    since the login page needs a configured Google app.
+    """
+
+    def __init__(self, base_url, session_cookie, cookie_name='sessionid', timeout=60):
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.session.cookies.set(cookie_name, session_cookie)
+        # The home page form sets the CSRF cookie used by every POST
+        response = self.session.get(self.base_url + '/', allow_redirects=False, timeout=timeout)
+        if response.status_code != 200 or 'csrftoken' not in self.session.cookies:
+            raise RuntimeError(
+                f"Session was not accepted by {self.base_url} (HTTP {response.status_code}); "
+                "does the site share this database?"
+            )
+
+    def add_food_log(self, query, meal_type):
+        """
+        POST one food log
+
+        Returns:
+            tuple: (status code or None on a client error, latency in ms)
+        """
+        start = time.perf_counter()
+        try:
+            response = self.session.post(
+                self.base_url + '/add/',
+                data={
+                    'natural_query': query,
+                    'meal_type': meal_type,
+                    'date': date.today().isoformat(),
+                    'csrfmiddlewaretoken': self.session.cookies.get('csrftoken', ''),
+                },
+                headers={'Referer': self.base_url + '/'},
+                allow_redirects=False,
+                timeout=self.timeout,
+            )
+            status = response.status_code
+        except requests.RequestException:
+            status = None
+        return status, (time.perf_counter() - start) * 1000
+
+
+def mint_sessions(user, count):
+    """
+    Log `user` in `count` times and return the session cookie values
+    """
+    from django.conf import settings
+    from django.test import Client
+
+    cookies = []
+    for _ in range(count):
+        client = Client()
+        client.force_login(user)
+        cookies.append(client.cookies[settings.SESSION_COOKIE_NAME].value)
+    return cookies
+
+
+def run_load_test(base_url, session_cookies, total_requests=200, distinct_queries=100,
+                  stub_url=None, seed=0, stdout=None):
+    """
+    Hammer add_food_log concurrently, one thread per logged-in session
+
+    Returns:
+        dict: Throughput, latency percentiles, status counts and, with
+        stub_url, the stub's response counters for the run
+    """
+    pool = build_query_pool(distinct_queries, seed)
+    rng = random.Random(seed)
+    plan = [(rng.choice(pool), rng.choice(MEAL_TYPES)) for _ in range(total_requests)]
+
+    if stub_url:
+        requests.delete(stub_url.rstrip('/') + '/stats', timeout=5)
+
+    concurrency = len(session_cookies)
+    if stdout:
+        stdout.write(f'Opening {concurrency} sessions...')
+    clients = [LoadTestClient(base_url, cookie) for cookie in session_cookies]
+
+    local = threading.local()
+    assigned = iter(clients)
+    assign_lock = threading.Lock()
+
+    def worker(item):
+        if not hasattr(local, 'client'):
+            with assign_lock:
+                local.client = next(assigned)
+        return local.client.add_food_log(*item)
+
+    if stdout:
+        stdout.write(f'Sending {total_requests} requests...')
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(worker, plan))
+    elapsed = time.perf_counter() - started
+
+    statuses = {}
+    for status, _ in results:
+        key = str(status) if status is not None else 'error'
+        statuses[key] = statuses.get(key, 0) + 1
+
+    report = {
+        'config': {
+            'base_url': base_url,
+            'concurrency': concurrency,
+            'requests': total_requests,
+            'distinct_queries': len(pool),
+        },
+        'elapsed_seconds': round(elapsed, 2),
+        'throughput_rps': round(total_requests / elapsed, 2) if elapsed else 0,
+        'latency': summarize_latencies([latency for _, latency in results]),
+        'status_codes': statuses,
+    }
+    if stub_url:
+        report['stub_responses'] = requests.get(stub_url.rstrip('/') + '/stats', timeout=5).json()
+    return report
@@ -0,0 +1,431 @@
+"""
+Offline nutrition lookup from the bundled local food table.
+
+`manage.py load_local_foods` copies tracker/data/local_foods.json into the
+LocalFood table. Each process loads the table once into a LocalFoodIndex:
+an exact name/alias dict, a sorted name list for prefix search (bisect)
+and a trigram posting list for fuzzy matching ("banan" -> banana). A query
+segment such as "2 cups rice" or "14 oz steak" is split into a quantity,
+a unit and a food phrase, matched against the index and scaled from the
+per-100 g values into a CalorieNinjas-shaped item, without any I/O.
+
+CalorieNinjasService asks this index first and only sends the segments it
+cannot match to the API.
+"""
+import json
+import logging
+import re
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter
+from pathlib import Path
+
+from django.conf import settings
+from django.db import DatabaseError, transaction
+
+logger = logging.getLogger(__name__)
+
+DATASET_PATH = Path(__file__).resolve().parent / 'data' / 'local_foods.json'
+
+DEFAULT_LOCAL_FOOD_SETTINGS = {
+    'ENABLED': True,
+    'MIN_SIMILARITY': 0.8,  # Trigram Dice score a fuzzy match needs
+    'RELOAD_SECONDS': 300,  # How often a process re-reads the table
+}
+
+# Weight and volume units with a fixed gram equivalent (ml taken as water)
+UNIT_GRAMS = {
+    'g': 1.0,
+    'kg': 1000.0,
+    'mg': 0.001,
+    'oz': 28.35,
+    'lb': 453.6,
+    'ml': 1.0,
+    'l': 1000.0,
+}
+
+UNIT_ALIASES = {
+    'g': 'g', 'gram': 'g', 'grams': 'g', 'gr': 'g',
+    'kg': 'kg', 'kilo': 'kg', 'kilos': 'kg', 'kilogram': 'kg', 'kilograms': 'kg',
+    'mg': 'mg',
+    'oz': 'oz', 'ounce': 'oz', 'ounces': 'oz',
+    'lb': 'lb', 'lbs': 'lb', 'pound': 'lb', 'pounds': 'lb',
+    'ml': 'ml', 'milliliter': 'ml', 'milliliters': 'ml',
+    'l': 'l', 'liter': 'l', 'liters': 'l', 'litre': 'l', 'litres': 'l',
+    'cup': 'cup', 'cups': 'cup',
+    'tbsp': 'tbsp', 'tablespoon': 'tbsp', 'tablespoons': 'tbsp',
+    'tsp': 'tsp', 'teaspoon': 'tsp', 'teaspoons': 'tsp',
+    'slice': 'slice', 'slices': 'slice',
+    'piece': 'piece', 'pieces': 'piece', 'pc': 'piece', 'pcs': 'piece',
+    'bowl': 'bowl', 'bowls': 'bowl',
+    'plate': 'plate', 'plates': 'plate',
+    'glass': 'glass', 'glasses': 'glass',
+    'mug': 'mug', 'mugs': 'mug',
+    'can': 'can', 'cans': 'can',
+    'bottle': 'bottle', 'bottles': 'bottle',
+    'bar': 'bar', 'bars': 'bar',
+    'scoop': 'scoop', 'scoops': 'scoop',
+    'serving': 'serving', 'servings': 'serving',
+}
+
+NUMBER_WORDS = {
+    'a': 1, 'an': 1, 'one': 1, 'two': 2, 'three': 3, 'four': 4, 'five': 5,
+    'six': 6, 'seven': 7, 'eight': 8, 'nine': 9, 'ten': 10, 'twelve': 12,
+    'half': 0.5, 'dozen': 12, 'couple': 2,
+}
+
+_NUMBER_RE = re.compile(r'^\d+(?:\.\d+)?$')
+
+_LOCAL_FOOD_FIELDS = ('aliases', 'nutrients', 'serving_size_g', 'unit_weights', 'bundled')
+
+
+def get_local_food_settings():
+    """
+    Merge LOCAL_FOODS from settings with the defaults
+    """
+    config = dict(DEFAULT_LOCAL_FOOD_SETTINGS)
+    config.update(getattr(settings, 'LOCAL_FOODS', {}) or {})
+    return config
+
+
+def parse_quantity(segment):
+    """
+    Split a normalized segment into quantity, unit and food phrase
+
+    "2 cups rice" -> (2.0, 'cup', 'rice'), "a 14 oz steak" -> (14.0, 'oz', 'steak'),
+    "half a cup of rice" -> (0.5, 'cup', 'rice'), "banana" -> (None, None, 'banana').
+
+    Args:
+        segment (str): Segment from split_food_query (numbers already canonical)
+
+    Returns:
+        tuple: (quantity or None, canonical unit or None, food phrase)
+    """
+    words = segment.split()
+    quantity = None
+    after_article = False
+
+    while words:
+        word = words[0]
+        if _NUMBER_RE.match(word):
+            value = float(word)
+        elif word in NUMBER_WORDS and len(words) > 1:
+            value = NUMBER_WORDS[word]
+        else:
+            break
+        words.pop(0)
+        is_article = word in ('a', 'an')
+        if is_article and quantity is not None:
+            # "half a cup": the article does not change the amount
+            continue
+        if quantity is None or after_article:
+            quantity = value
+        else:
+            # "2 dozen eggs"
+            quantity *= value
+        after_article = is_article
+
+    unit = None
+    if len(words) > 1 and words[0] in UNIT_ALIASES:
+        unit = UNIT_ALIASES[words.pop(0)]
+        if len(words) > 1 and words[0] == 'of':
+            words.pop(0)
+
+    return quantity, unit, ' '.join(words)
+
+
+def _trigrams(text):
+    padded = f'  {text} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _singular_forms(phrase):
+    forms = []
+    if phrase.endswith('ies') and len(phrase) > 4:
+        forms.append(phrase[:-3] + 'y')
+    if phrase.endswith('es') and len(phrase) > 3:
+        forms.append(phrase[:-2])
+    if phrase.endswith('s') and not phrase.endswith('ss') and len(phrase) > 2:
+        forms.append(phrase[:-1])
+    return forms
+
+
+class _IndexData:
+    """
+    One immutable build of the index, swapped in whole on reload so
+    readers never see half-rebuilt structures
+    """
+
+    def __init__(self, foods=(), exact=None, keys=(), postings=None):
+        self.foods = list(foods)
+        self.exact = exact or {}
+        self.keys = list(keys)
+        self.sorted_keys = sorted(self.keys)
+        self.postings = postings or {}
+
+
+class LocalFoodIndex:
+    """
+    In-memory index over the LocalFood table.
+
+    Built lazily on first use and rebuilt after RELOAD_SECONDS, so a process
+    pays one SELECT per reload and every lookup after that is a dict probe,
+    a bisect or a trigram scan of a few hundred names.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._loaded_at = None
+        self._data = _IndexData()
+        self.hits = 0
+        self.misses = 0
+
+    def clear(self):
+        with self._lock:
+            self._loaded_at = None
+            self._data = _IndexData()
+            self.hits = 0
+            self.misses = 0
+
+    def _ensure_loaded(self, config):
+        loaded_at = self._loaded_at
+        if loaded_at is not None and time.monotonic() - loaded_at < config['RELOAD_SECONDS']:
+            return
+        from .models import LocalFood
+
+        try:
+            rows = list(LocalFood.objects.values_list(
+                'name', 'aliases', 'nutrients', 'serving_size_g', 'unit_weights',
+            ))
+        except DatabaseError as e:
+            logger.warning(f"Local food index load failed: {str(e)}")
+            rows = []
+        self.build(rows)
+
+    def build(self, rows):
+        """
+        Replace the index contents
+
+        Args:
+            rows (iterable): (name, aliases, nutrients, serving_size_g, unit_weights) tuples
+        """
+        foods, exact, keys, postings = [], {}, [], {}
+        for name, aliases, nutrients, serving_size_g, unit_weights in rows:
+            index = len(foods)
+            foods.append({
+                'name': name,
+                'nutrients': nutrients or {},
+                'serving_size_g': serving_size_g,
+                'units': unit_weights or {},
+            })
+            for key in [name, *(aliases or [])]:
+                key = ' '.join(str(key).lower().split())
+                if not key or key in exact:
+                    continue
+                exact[key] = index
+                key_number = len(keys)
+                keys.append((key, index))
+                for trigram in _trigrams(key):
+                    postings.setdefault(trigram, []).append(key_number)
+
+        data = _IndexData(foods, exact, keys, postings)
+        with self._lock:
+            self._data = data
+            self._loaded_at = time.monotonic()
+
+    def prefix_search(self, prefix, limit=10):
+        """
+        Names and aliases starting with prefix, alphabetically
+
+        Returns:
+            list: (key, food name) pairs
+        """
+        data = self._data
+        prefix = ' '.join(prefix.lower().split())
+        results = []
+        position = bisect_left(data.sorted_keys, (prefix,))
+        while position < len(data.sorted_keys) and len(results) < limit:
+            key, index = data.sorted_keys[position]
+            if not key.startswith(prefix):
+                break
+            results.append((key, data.foods[index]['name']))
+            position += 1
+        return results
+
+    def match(self, phrase, min_similarity):
+        """
+        Best food for a phrase: exact name or alias, then singular forms,
+        then the closest trigram match, then a unique prefix match
+
+        Returns:
+            dict or None: Indexed food
+        """
+        data = self._data
+        for candidate in [phrase, *_singular_forms(phrase)]:
+            if candidate in data.exact:
+                return data.foods[data.exact[candidate]]
+
+        query_trigrams = _trigrams(phrase)
+        overlaps = Counter()
+        for trigram in query_trigrams:
+            overlaps.update(data.postings.get(trigram, ()))
+        best, best_score, best_length = None, min_similarity, None
+        for key_number, overlap in overlaps.items():
+            key, index = data.keys[key_number]
+            if abs(len(key) - len(phrase)) > max(2, len(key) // 4):
+                # Fuzzy matching is for typos, not for a word missing from "chicken breast"
+                continue
+            score = 2.0 * overlap / (len(query_trigrams) + len(_trigrams(key)))
+            # Ties go to the shorter (more generic) name
+            if score > best_score or (score == best_score and best is not None and len(key) < best_length):
+                best, best_score, best_length = index, score, len(key)
+        if best is not None:
+            return data.foods[best]
+
+        if len(phrase) >= 4:
+            sorted_keys = data.sorted_keys
+            position = bisect_left(sorted_keys, (phrase,))
+            indexes = set()
+            while position < len(sorted_keys) and sorted_keys[position][0].startswith(phrase):
+                indexes.add(sorted_keys[position][1])
+                if len(indexes) > 1:
+                    break
+                position += 1
+            if len(indexes) == 1:
+                return data.foods[indexes.pop()]
+        return None
+
+    def resolve(self, segment, config=None):
+        """
+        Nutrition for one query segment from the local table
+
+        Args:
+            segment (str): Normalized segment, e.g. "2 cups rice"
+            config (dict): LOCAL_FOODS settings (read when omitted)
+
+        Returns:
+            dict or None: Raw CalorieNinjas-shaped item, or None when the food
+            or its unit is not known locally
+        """
+        config = config or get_local_food_settings()
+        self._ensure_loaded(config)
+        if not self._data.foods:
+            return None
+
+        quantity, unit, phrase = parse_quantity(segment)
+        food = self.match(phrase, config['MIN_SIMILARITY']) if phrase else None
+        grams = serving_grams(food, quantity, unit) if food else None
+
+        with self._lock:
+            if grams is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        if grams is None:
+            return None
+        return scale_item(food, grams)
+
+    def resolve_segments(self, segments):
+        """
+        Resolve every segment that can be answered locally
+
+        Returns:
+            dict: Segment -> raw CalorieNinjas-shaped item
+        """
+        config = get_local_food_settings()
+        if not config['ENABLED'] or not segments:
+            return {}
+        resolved = {}
+        for segment in segments:
+            item = self.resolve(segment, config)
+            if item is not None:
+                resolved[segment] = item
+        return resolved
+
+    def stats(self):
+        return {'foods': len(self._data.foods), 'hits': self.hits, 'misses': self.misses}
+
+
+def serving_grams(food, quantity, unit):
+    """
+    Grams eaten for a quantity and unit of an indexed food
+
+    Returns:
+        float or None: None when the unit has no known weight for this food
+    """
+    units = food['units']
+    if quantity is None and unit is None:
+        return food['serving_size_g']
+    quantity = 1.0 if quantity is None else quantity
+    if unit in units:
+        return quantity * units[unit]
+    if unit in UNIT_GRAMS:
+        return quantity * UNIT_GRAMS[unit]
+    if unit is None and 'piece' in units:
+        # A bare count ("2 eggs") means pieces where the food has them
+        return quantity * units['piece']
+    if unit in (None, 'serving'):
+        return quantity * food['serving_size_g']
+    return None
+
+
+def scale_item(food, grams):
+    """
+    Scale a food's per-100 g nutrients to a CalorieNinjas item for grams
+    """
+    factor = grams / 100.0
+    item = {'name': food['name'], 'serving_size_g': round(grams, 1)}
+    for key, value in food['nutrients'].items():
+        item[key] = round(value * factor, 1)
+    return item
+
+
+def load_local_foods(path=None):
+    """
+    Copy the bundled dataset into the LocalFood table
+
+    Bundled rows are created or updated by name and removed when they drop
+    out of the dataset; foods added by hand (bundled=False) are left alone.
+
+    Returns:
+        dict: Counts of created, updated and deleted rows
+    """
+    from .models import LocalFood
+
+    with open(path or DATASET_PATH, encoding='utf-8') as f:
+        dataset = json.load(f)
+
+    entries = {}
+    for entry in dataset['foods']:
+        name = ' '.join(entry['name'].lower().split())
+        entries[name] = {
+            'aliases': entry.get('aliases', []),
+            'nutrients': entry['per_100g'],
+            'serving_size_g': entry.get('serving_size_g', 100),
+            'unit_weights': entry.get('units', {}),
+            'bundled': True,
+        }
+
+    with transaction.atomic():
+        existing = {food.name: food for food in LocalFood.objects.filter(name__in=entries)}
+        created, updated = [], []
+        for name, values in entries.items():
+            food = existing.get(name)
+            if food is None:
+                created.append(LocalFood(name=name, **values))
+                continue
+            if any(getattr(food, field) != value for field, value in values.items()):
+                for field, value in values.items():
+                    setattr(food, field, value)
+                updated.append(food)
+        LocalFood.objects.bulk_create(created)
+        LocalFood.objects.bulk_update(updated, list(_LOCAL_FOOD_FIELDS))
+        deleted, _ = LocalFood.objects.filter(bundled=True).exclude(name__in=entries).delete()
+
+    local_food_index.clear()
+    return {'created': len(created), 'updated': len(updated), 'deleted': deleted}
+
+
+# Process-wide index shared by every CalorieNinjasService instance
+local_food_index = LocalFoodIndex()
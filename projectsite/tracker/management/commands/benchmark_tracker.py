@@ -0,0 +1,81 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from tracker.benchmark import run_benchmark
+
+COLUMNS = ['p50_ms', 'p95_ms', 'p99_ms', 'queries_max', 'peak_memory_kb']
+
+
+class Command(BaseCommand):
+    help = (
+        'Seed synthetic users into a throwaway test database and profile the '
+        'hot tracker views against a fake CalorieNinjas API'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=5,
+                            help='Number of users to seed')
+        parser.add_argument('--days', type=int, default=90,
+                            help='Days of history per user')
+        parser.add_argument('--logs-per-day', type=int, default=4,
+                            help='Food logs per user per day')
+        parser.add_argument('--requests', type=int, default=50,
+                            help='Timed requests per view')
+        parser.add_argument('--warmup', type=int, default=5,
+                            help='Untimed requests per view before timing')
+        parser.add_argument('--output',
+                            help='Write the results as JSON to this path')
+        parser.add_argument('--compare',
+                            help='Print the change against a previous --output file')
+
+    def handle(self, *args, **options):
+        if options['requests'] < 1 or options['users'] < 1:
+            raise CommandError('--users and --requests must be at least 1')
+
+        baseline = None
+        if options['compare']:
+            try:
+                with open(options['compare'], encoding='utf-8') as f:
+                    baseline = json.load(f)
+            except (OSError, ValueError) as e:
+                raise CommandError(f"Could not read {options['compare']}: {e}")
+
+        # Never touch the real database: seed into a fresh test database
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            report = run_benchmark(
+                users=options['users'],
+                days=options['days'],
+                logs_per_day=options['logs_per_day'],
+                requests=options['requests'],
+                warmup=options['warmup'],
+                stdout=self.stdout,
+            )
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+        self.print_table(report, baseline)
+
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as f:
+                json.dump(report, f, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Wrote results to {options['output']}"))
+
+    def print_table(self, report, baseline=None):
+        previous = (baseline or {}).get('results', {})
+        self.stdout.write('')
+        self.stdout.write(f"{'view':<20}" + ''.join(f'{column:>16}' for column in COLUMNS))
+        for name, metrics in report['results'].items():
+            cells = []
+            for column in COLUMNS:
+                cell = f'{metrics.get(column, 0)}'
+                old = previous.get(name, {}).get(column)
+                if old:
+                    cell += f' ({(metrics.get(column, 0) - old) / old:+.0%})'
+                cells.append(f'{cell:>16}')
+            self.stdout.write(f'{name:<20}' + ''.join(cells))
@@ -0,0 +1,62 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from tracker.stub_server import LATENCY_DISTRIBUTIONS, FaultProfile, make_stub_server
+
+
+class Command(BaseCommand):
+    help = (
+        'Run a local stand-in for the CalorieNinjas /v1/nutrition endpoint with '
+        'optional latency and error injection. Point CALORIENINJAS_BASE_URL at '
+        'http://HOST:PORT/v1/nutrition to use it.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1')
+        parser.add_argument('--port', type=int, default=8001)
+        parser.add_argument('--latency-ms', type=float, default=0,
+                            help='Mean (or median, for lognormal) response delay')
+        parser.add_argument('--jitter-ms', type=float, default=0,
+                            help='Spread of the delay for uniform and lognormal')
+        parser.add_argument('--distribution', choices=LATENCY_DISTRIBUTIONS, default='fixed')
+        parser.add_argument('--rate-429', type=float, default=0.0,
+                            help='Fraction of requests answered with 429')
+        parser.add_argument('--rate-5xx', type=float, default=0.0,
+                            help='Fraction of requests answered with 503')
+        parser.add_argument('--rate-timeout', type=float, default=0.0,
+                            help='Fraction of requests that hang and are then dropped')
+        parser.add_argument('--timeout-seconds', type=float, default=30,
+                            help='How long a hanging request is held open')
+        parser.add_argument('--api-key',
+                            help='Require this X-Api-Key header')
+        parser.add_argument('--seed', type=int,
+                            help='Random seed for reproducible fault sequences')
+
+    def handle(self, *args, **options):
+        try:
+            profile = FaultProfile(
+                latency_ms=options['latency_ms'],
+                jitter_ms=options['jitter_ms'],
+                distribution=options['distribution'],
+                rate_429=options['rate_429'],
+                rate_5xx=options['rate_5xx'],
+                rate_timeout=options['rate_timeout'],
+                timeout_seconds=options['timeout_seconds'],
+                seed=options['seed'],
+            )
+            server = make_stub_server(
+                options['host'], options['port'], profile, api_key=options['api_key']
+            )
+        except (ValueError, OSError) as e:
+            raise CommandError(str(e))
+
+        host, port = server.server_address[:2]
+        self.stdout.write(self.style.SUCCESS(
+            f'CalorieNinjas stub listening on http://{host}:{port}/v1/nutrition'
+        ))
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            self.stdout.write('Stopped.')
+        finally:
+            server.server_close()
+            self.stdout.write(f'Responses: {server.stats.snapshot()}')
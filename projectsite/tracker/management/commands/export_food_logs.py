@@ -0,0 +1,63 @@
+import sys
+from datetime import datetime
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from tracker.exports import FORMATS, iter_export
+
+
+def _date(value):
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    except ValueError:
+        raise CommandError(f"Invalid date {value!r}, expected YYYY-MM-DD")
+
+
+class Command(BaseCommand):
+    help = 'Stream food logs to a CSV or JSON lines file, e.g. for nightly warehouse loads'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user-id', type=int,
+                            help='Only export this user (default: every user)')
+        parser.add_argument('--format', choices=sorted(FORMATS), default='csv')
+        parser.add_argument('--gzip', action='store_true',
+                            help='gzip the output')
+        parser.add_argument('--start', type=_date,
+                            help='First date to export (YYYY-MM-DD)')
+        parser.add_argument('--end', type=_date,
+                            help='Last date to export (YYYY-MM-DD)')
+        parser.add_argument('--output', default='-',
+                            help='File to write, or - for stdout')
+
+    def handle(self, *args, **options):
+        user = None
+        if options['user_id']:
+            try:
+                user = User.objects.get(pk=options['user_id'])
+            except User.DoesNotExist:
+                raise CommandError(f"User {options['user_id']} does not exist")
+
+        chunks = iter_export(
+            user=user,
+            fmt=options['format'],
+            start_date=options['start'],
+            end_date=options['end'],
+            compress=options['gzip'],
+        )
+
+        to_stdout = options['output'] == '-'
+        out = sys.stdout.buffer if to_stdout else open(options['output'], 'wb')
+        written = 0
+        try:
+            for chunk in chunks:
+                out.write(chunk)
+                written += len(chunk)
+        finally:
+            if to_stdout:
+                out.flush()
+            else:
+                out.close()
+
+        if not to_stdout:
+            self.stdout.write(self.style.SUCCESS(f"Wrote {written} bytes to {options['output']}"))
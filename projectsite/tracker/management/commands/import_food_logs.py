@@ -0,0 +1,83 @@
+import csv
+import os
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from tracker.imports import check_header, run_import, run_import_worker
+from tracker.models import ImportJob
+
+
+class Command(BaseCommand):
+    help = 'Import meal history from a CSV file, resume an import, or run queued uploads'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', nargs='?',
+                            help='CSV file to import (needs --user-id)')
+        parser.add_argument('--user-id', type=int,
+                            help='Owner of the imported logs')
+        parser.add_argument('--resume', type=int, metavar='JOB_ID',
+                            help='Continue an interrupted import from its last committed batch')
+        parser.add_argument('--worker', action='store_true',
+                            help='Process imports uploaded through the site')
+        parser.add_argument('--once', action='store_true',
+                            help='With --worker, exit when the queue is empty')
+        parser.add_argument('--poll-interval', type=float, default=5.0,
+                            help='Seconds to sleep when the queue is empty')
+
+    def handle(self, *args, **options):
+        if options['worker']:
+            try:
+                processed = run_import_worker(
+                    poll_interval=options['poll_interval'],
+                    once=options['once'],
+                    stdout=self.stdout,
+                )
+            except KeyboardInterrupt:
+                self.stdout.write('Stopped.')
+                return
+            self.stdout.write(self.style.SUCCESS(f'Ran {processed} imports'))
+            return
+
+        if options['resume']:
+            try:
+                job = ImportJob.objects.select_related('user').get(pk=options['resume'])
+            except ImportJob.DoesNotExist:
+                raise CommandError(f"Import job {options['resume']} does not exist")
+            if job.status == ImportJob.STATUS_DONE:
+                raise CommandError(f"Import job {job.pk} already finished")
+        else:
+            job = self._create_job(options)
+
+        job = run_import(job, stdout=self.stdout)
+        summary = (f"Import #{job.pk} {job.get_status_display().lower()}: {job.rows_imported} imported "
+                   f"({job.rows_enriched} looked up), {job.rows_rejected} rejected")
+        if job.status == ImportJob.STATUS_DONE:
+            self.stdout.write(self.style.SUCCESS(summary))
+        else:
+            raise CommandError(summary)
+
+    def _create_job(self, options):
+        if not options['path'] or not options['user_id']:
+            raise CommandError('Give a CSV path and --user-id, --resume JOB_ID, or --worker')
+        path = os.path.abspath(options['path'])
+        try:
+            user = User.objects.get(pk=options['user_id'])
+        except User.DoesNotExist:
+            raise CommandError(f"User {options['user_id']} does not exist")
+
+        try:
+            with open(path, newline='', encoding='utf-8-sig') as f:
+                header = next(csv.reader(f), [])
+        except (OSError, UnicodeDecodeError) as e:
+            raise CommandError(f"Cannot read {path}: {e}")
+        try:
+            check_header(header)
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        return ImportJob.objects.create(
+            user=user,
+            source_path=path,
+            original_filename=os.path.basename(path),
+        )
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from tracker.local_foods import DATASET_PATH, load_local_foods
+
+
+class Command(BaseCommand):
+    help = 'Load the bundled nutrient dataset into the LocalFood table (safe to re-run)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--path', default=str(DATASET_PATH),
+                            help='Dataset JSON to load (default: the bundled one)')
+
+    def handle(self, *args, **options):
+        try:
+            counts = load_local_foods(options['path'])
+        except (OSError, ValueError, KeyError) as e:
+            raise CommandError(f"Cannot load {options['path']}: {e}")
+        self.stdout.write(self.style.SUCCESS(
+            f"Local foods: {counts['created']} created, {counts['updated']} updated, "
+            f"{counts['deleted']} removed"
+        ))
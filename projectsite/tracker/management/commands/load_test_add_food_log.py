@@ -0,0 +1,78 @@
+import json
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from tracker.loadtest import mint_sessions, run_load_test
+
+
+class Command(BaseCommand):
+    help = (
+        'Send concurrent add_food_log requests to a running site (e.g. gunicorn '
+        'against `manage.py calorieninjas_stub`) and report throughput and tail latency'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--target', default='http://127.0.0.1:8000',
+                            help='Base URL of the running site')
+        parser.add_argument('--username', default='loadtest',
+                            help='User to log in as; the site must share this database')
+        parser.add_argument('--create-user', action='store_true',
+                            help='Create the user if it does not exist')
+        parser.add_argument('--concurrency', type=int, default=8)
+        parser.add_argument('--requests', type=int, default=200)
+        parser.add_argument('--distinct-queries', type=int, default=100,
+                            help='Size of the query pool; smaller means more cache hits')
+        parser.add_argument('--stub-url', help='Stub base URL, to report its response counters')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--output', help='Write the report as JSON to this path')
+
+    def handle(self, *args, **options):
+        if options['concurrency'] < 1 or options['requests'] < 1:
+            raise CommandError('--concurrency and --requests must be at least 1')
+
+        username = options['username']
+        if options['create_user']:
+            user, created = User.objects.get_or_create(
+                username=username,
+                defaults={'email': f'{username}@example.com'},
+            )
+            if created:
+                user.set_unusable_password()
+                user.save()
+                self.stdout.write(f'Created user {username}')
+        else:
+            try:
+                user = User.objects.get(username=username)
+            except User.DoesNotExist:
+                raise CommandError(f"User {username} does not exist (use --create-user)")
+
+        try:
+            report = run_load_test(
+                options['target'],
+                mint_sessions(user, options['concurrency']),
+                total_requests=options['requests'],
+                distinct_queries=options['distinct_queries'],
+                stub_url=options['stub_url'],
+                seed=options['seed'],
+                stdout=self.stdout,
+            )
+        except RuntimeError as e:
+            raise CommandError(str(e))
+
+        latency = report['latency']
+        self.stdout.write(self.style.SUCCESS(
+            f"{report['throughput_rps']} req/s over {report['elapsed_seconds']}s"
+        ))
+        self.stdout.write(
+            f"latency ms: p50 {latency['p50_ms']}  p95 {latency['p95_ms']}  "
+            f"p99 {latency['p99_ms']}  max {latency['max_ms']}"
+        )
+        self.stdout.write(f"status codes: {report['status_codes']}")
+        if 'stub_responses' in report:
+            self.stdout.write(f"stub responses: {report['stub_responses']}")
+
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as f:
+                json.dump(report, f, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Wrote results to {options['output']}"))
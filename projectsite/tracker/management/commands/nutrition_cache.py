@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Count, Sum
+from django.utils import timezone
+
+from tracker.cache import nutrition_cache
+from tracker.models import NutritionLookupCache
+
+
+class Command(BaseCommand):
+    help = 'Inspect and maintain the CalorieNinjas lookup cache'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--purge-expired', action='store_true',
+                            help='Delete expired cache rows')
+        parser.add_argument('--evict', action='store_true',
+                            help='Purge expired rows and trim the table to DB_MAX_ENTRIES')
+        parser.add_argument('--clear', action='store_true',
+                            help='Delete every cache row')
+
+    def handle(self, *args, **options):
+        if options['clear']:
+            count = NutritionLookupCache.objects.count()
+            nutrition_cache.clear()
+            self.stdout.write(self.style.SUCCESS(f'Cleared {count} cache entries'))
+        elif options['evict']:
+            removed = nutrition_cache.evict()
+            self.stdout.write(self.style.SUCCESS(f'Evicted {removed} cache entries'))
+        elif options['purge_expired']:
+            removed = nutrition_cache.purge_expired()
+            self.stdout.write(self.style.SUCCESS(f'Purged {removed} expired cache entries'))
+
+        now = timezone.now()
+        totals = NutritionLookupCache.objects.aggregate(
+            entries=Count('id'),
+            hits=Sum('hit_count'),
+        )
+        expired = NutritionLookupCache.objects.filter(expires_at__lte=now).count()
+
+        self.stdout.write(f"Entries:      {totals['entries']} / {nutrition_cache.config['DB_MAX_ENTRIES']}")
+        self.stdout.write(f"Expired:      {expired}")
+        self.stdout.write(f"Total hits:   {totals['hits'] or 0}")
+        self.stdout.write('Most used queries:')
+        for entry in NutritionLookupCache.objects.order_by('-hit_count')[:10]:
+            self.stdout.write(f"  {entry.hit_count:>6}  {entry.normalized_query[:60]}")
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+
+from tracker.enrichment import run_worker
+
+
+class Command(BaseCommand):
+    help = 'Run the background worker that fills in nutrition for pending food logs'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=10,
+                            help='Jobs to claim per poll')
+        parser.add_argument('--poll-interval', type=float, default=2.0,
+                            help='Seconds to sleep when the queue is empty')
+        parser.add_argument('--once', action='store_true',
+                            help='Exit when the queue is empty instead of polling')
+
+    def handle(self, *args, **options):
+        self.stdout.write('Processing enrichment jobs...')
+        try:
+            processed = run_worker(
+                batch_size=options['batch_size'],
+                poll_interval=options['poll_interval'],
+                once=options['once'],
+                stdout=self.stdout,
+            )
+        except KeyboardInterrupt:
+            self.stdout.write('Stopped.')
+            return
+        self.stdout.write(self.style.SUCCESS(f'Processed {processed} jobs'))
@@ -0,0 +1,29 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from tracker.page_cache import bump_all_page_versions, bump_page_version
+from tracker.summaries import rebuild_daily_summaries
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the DailyNutritionSummary table from FoodLog rows'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user-id', type=int,
+                            help='Only rebuild summaries for this user')
+
+    def handle(self, *args, **options):
+        user = None
+        if options['user_id']:
+            try:
+                user = User.objects.get(pk=options['user_id'])
+            except User.DoesNotExist:
+                raise CommandError(f"User {options['user_id']} does not exist")
+
+        written = rebuild_daily_summaries(user=user)
+        # Cached pages were built from the old rows
+        if user is None:
+            bump_all_page_versions()
+        else:
+            bump_page_version(user.pk)
+        self.stdout.write(self.style.SUCCESS(f'Wrote {written} daily summaries'))
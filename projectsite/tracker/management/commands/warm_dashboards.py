@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from tracker.page_cache import get_page_cache_settings, recently_active_users, warm_user_pages
+
+
+class Command(BaseCommand):
+    help = "Pre-build the cached home page and dashboard of recently active users"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int,
+                            help='Users who logged within this many days (default TRACKER_PAGE_CACHE WARM_ACTIVE_DAYS)')
+
+    def handle(self, *args, **options):
+        if not get_page_cache_settings()['ENABLED']:
+            self.stdout.write('The page cache is disabled; nothing to warm.')
+            return
+
+        today = timezone.now().date()
+        warmed = 0
+        for user in recently_active_users(options['days']).iterator():
+            warm_user_pages(user, today)
+            warmed += 1
+        self.stdout.write(self.style.SUCCESS(f'Warmed pages for {warmed} users'))
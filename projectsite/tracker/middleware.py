@@ -0,0 +1,106 @@
+import json
+import logging
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+
+from .instrumentation import end_request, instrument_queries, instrument_templates, query_budget, start_request
+
+logger = logging.getLogger('tracker.timing')
+
+
+class RequestTimingMiddleware:
+    """
+    Opt-in per-request instrumentation.
+
+    Records SQL query count and time, time spent in outbound CalorieNinjas
+    calls, template render time and total view time. The numbers go out as
+    a Server-Timing header and a JSON log line on the `tracker.timing`
+    logger. A warning is logged when a request runs more queries than
+    TRACKER_QUERY_BUDGET, or when that is unset, than its view's entry in
+    QUERY_BUDGETS.
+
+    Works for sync and async views; queries an async view runs through
+    sync_to_async are counted too.
+
+    Enable with TRACKER_REQUEST_TIMING=True.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.static_url = settings.STATIC_URL or '/static/'
+        instrument_templates()
+        instrument_queries()
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if request.path.startswith(self.static_url):
+            return self.get_response(request)
+
+        metrics, token = start_request()
+        try:
+            response = self.get_response(request)
+        finally:
+            end_request(token)
+        return self.report(request, response, metrics)
+
+    async def __acall__(self, request):
+        if request.path.startswith(self.static_url):
+            return await self.get_response(request)
+
+        metrics, token = start_request()
+        try:
+            response = await self.get_response(request)
+        finally:
+            end_request(token)
+        return self.report(request, response, metrics)
+
+    def report(self, request, response, metrics):
+        """
+        Add the Server-Timing header and log the request's metrics
+        """
+        total_ms = metrics.elapsed() * 1000
+        db_ms = metrics.db_time * 1000
+        api_ms = metrics.api_time * 1000
+        template_ms = metrics.template_time * 1000
+
+        response['Server-Timing'] = ', '.join([
+            f'db;dur={db_ms:.1f};desc="{metrics.db_queries} queries"',
+            f'api;dur={api_ms:.1f};desc="{metrics.api_calls} CalorieNinjas calls"',
+            f'tpl;dur={template_ms:.1f};desc="Template render"',
+            f'total;dur={total_ms:.1f};desc="View total"',
+        ])
+
+        match = getattr(request, 'resolver_match', None)
+        view_name = match.view_name if match else None
+        logger.info(json.dumps({
+            'event': 'request_timing',
+            'method': request.method,
+            'path': request.path,
+            'view': view_name,
+            'status': response.status_code,
+            'db_queries': metrics.db_queries,
+            'db_ms': round(db_ms, 1),
+            'api_calls': metrics.api_calls,
+            'api_ms': round(api_ms, 1),
+            'template_ms': round(template_ms, 1),
+            'total_ms': round(total_ms, 1),
+        }))
+
+        budget = getattr(settings, 'TRACKER_QUERY_BUDGET', None)
+        if not budget:
+            url_name = match.url_name if match and match.namespace == 'tracker' else None
+            budget = query_budget(url_name, request.method)
+        if metrics.db_queries > budget:
+            logger.warning(
+                f"{view_name or request.path} ran {metrics.db_queries} queries "
+                f"(budget {budget})"
+            )
+
+        return response
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.7 on 2026-10-18 02:56
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tracker', '0003_alter_foodlog_options_foodlog_user'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NutritionLookupCache',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('query_hash', models.CharField(max_length=64, unique=True)),
+                ('normalized_query', models.TextField()),
+                ('response_data', models.JSONField()),
+                ('hit_count', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('last_accessed_at', models.DateTimeField(db_index=True, default=django.utils.timezone.now)),
+                ('expires_at', models.DateTimeField(db_index=True)),
+            ],
+            options={
+                'verbose_name': 'Nutrition Lookup Cache Entry',
+                'verbose_name_plural': 'Nutrition Lookup Cache',
+                'ordering': ['-last_accessed_at'],
+            },
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 5.2.7 on 2026-10-18 02:57
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tracker', '0004_nutritionlookupcache'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FoodItem',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=200)),
+                ('serving_size_g', models.FloatField()),
+                ('item_data', models.JSONField()),
+                ('hit_count', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Food Item',
+                'verbose_name_plural': 'Food Items',
+                'ordering': ['name', 'serving_size_g'],
+                'constraints': [models.UniqueConstraint(fields=('name', 'serving_size_g'), name='unique_food_item_serving')],
+            },
+        ),
+        migrations.CreateModel(
+            name='FoodItemAlias',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('phrase', models.CharField(max_length=255, unique=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('item', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='aliases', to='tracker.fooditem')),
+            ],
+            options={
+                'verbose_name': 'Food Item Alias',
+                'verbose_name_plural': 'Food Item Aliases',
+            },
+        ),
+    ]
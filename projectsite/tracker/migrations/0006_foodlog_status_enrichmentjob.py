@@ -0,0 +1,45 @@
+# Generated by Django 5.2.7 on 2026-10-18 02:59
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tracker', '0005_fooditem'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='foodlog',
+            name='natural_query',
+            field=models.TextField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='foodlog',
+            name='status',
+            field=models.CharField(choices=[('ready', 'Ready'), ('pending', 'Pending'), ('failed', 'Failed')], default='ready', max_length=10),
+        ),
+        migrations.CreateModel(
+            name='EnrichmentJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('queued', 'Queued'), ('running', 'Running'), ('done', 'Done'), ('failed', 'Failed')], default='queued', max_length=10)),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('last_error', models.TextField(blank=True, default='')),
+                ('run_after', models.DateTimeField(default=django.utils.timezone.now)),
+                ('locked_at', models.DateTimeField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('food_log', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='enrichment_job', to='tracker.foodlog')),
+            ],
+            options={
+                'verbose_name': 'Enrichment Job',
+                'verbose_name_plural': 'Enrichment Jobs',
+                'ordering': ['run_after'],
+                'indexes': [models.Index(fields=['status', 'run_after'], name='enrichment_status_run_after')],
+            },
+        ),
+    ]
@@ -0,0 +1,96 @@
+# Generated by Django 5.2.7 on 2026-10-18 03:00
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+NUTRIENT_SOURCES = {
+    'protein': ('protein_g',),
+    'carbs': ('carbohydrates_total_g', 'carbohydrates_g', 'carbs'),
+    'fat': ('fat_total_g',),
+    'fiber': ('fiber_g',),
+    'sugar': ('sugar_g',),
+    'sodium': ('sodium_mg',),
+    'potassium': ('potassium_mg',),
+    'cholesterol': ('cholesterol_mg',),
+    'saturated_fat': ('saturated_fat_g',),
+}
+
+
+def build_summaries(apps, schema_editor):
+    """Backfill summaries for logs that existed before the rollup table"""
+    FoodLog = apps.get_model('tracker', 'FoodLog')
+    DailyNutritionSummary = apps.get_model('tracker', 'DailyNutritionSummary')
+
+    totals_by_day = {}
+    logs = FoodLog.objects.filter(user__isnull=False).only(
+        'user_id', 'date', 'calories', 'meal_type', 'nutrition_data'
+    )
+    for log in logs.iterator(chunk_size=2000):
+        totals = totals_by_day.setdefault((log.user_id, log.date), {
+            'calories': 0, 'protein': 0, 'carbs': 0, 'fat': 0, 'fiber': 0, 'sugar': 0,
+            'sodium': 0, 'potassium': 0, 'cholesterol': 0, 'saturated_fat': 0,
+            'log_count': 0, 'breakfast_count': 0, 'lunch_count': 0,
+            'dinner_count': 0, 'snack_count': 0,
+        })
+        data = log.nutrition_data if isinstance(log.nutrition_data, dict) else None
+        if data:
+            for field, keys in NUTRIENT_SOURCES.items():
+                totals[field] += float(next((data[key] for key in keys if data.get(key)), 0) or 0)
+            totals['calories'] += float(data.get('calories', log.calories or 0) or 0)
+        else:
+            totals['calories'] += float(log.calories or 0)
+        totals['log_count'] += 1
+        if f"{log.meal_type}_count" in totals:
+            totals[f"{log.meal_type}_count"] += 1
+
+    DailyNutritionSummary.objects.bulk_create(
+        [
+            DailyNutritionSummary(user_id=user_id, date=day, **totals)
+            for (user_id, day), totals in totals_by_day.items()
+        ],
+        batch_size=2000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tracker', '0006_foodlog_status_enrichmentjob'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyNutritionSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('calories', models.FloatField(default=0)),
+                ('protein', models.FloatField(default=0)),
+                ('carbs', models.FloatField(default=0)),
+                ('fat', models.FloatField(default=0)),
+                ('fiber', models.FloatField(default=0)),
+                ('sugar', models.FloatField(default=0)),
+                ('sodium', models.FloatField(default=0)),
+                ('potassium', models.FloatField(default=0)),
+                ('cholesterol', models.FloatField(default=0)),
+                ('saturated_fat', models.FloatField(default=0)),
+                ('log_count', models.PositiveIntegerField(default=0)),
+                ('breakfast_count', models.PositiveIntegerField(default=0)),
+                ('lunch_count', models.PositiveIntegerField(default=0)),
+                ('dinner_count', models.PositiveIntegerField(default=0)),
+                ('snack_count', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_summaries', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Daily Nutrition Summary',
+                'verbose_name_plural': 'Daily Nutrition Summaries',
+                'ordering': ['-date'],
+                'constraints': [models.UniqueConstraint(fields=('user', 'date'), name='unique_daily_summary')],
+            },
+        ),
+        migrations.RunPython(build_summaries, migrations.RunPython.noop),
+    ]
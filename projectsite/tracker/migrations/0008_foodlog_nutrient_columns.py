@@ -0,0 +1,109 @@
+# Generated by Django 5.2.7 on 2026-10-18 03:02
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+NUTRIENT_KEYS = {
+    'protein_g': ('protein_g',),
+    'carbohydrates_total_g': ('carbohydrates_total_g', 'carbohydrates_g', 'carbs'),
+    'fat_total_g': ('fat_total_g',),
+    'fiber_g': ('fiber_g',),
+    'sugar_g': ('sugar_g',),
+    'sodium_mg': ('sodium_mg',),
+    'potassium_mg': ('potassium_mg',),
+    'cholesterol_mg': ('cholesterol_mg',),
+    'saturated_fat_g': ('saturated_fat_g', 'fat_saturated_g'),
+}
+
+
+def _as_float(value):
+    try:
+        return float(value or 0)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def backfill_nutrient_columns(apps, schema_editor):
+    """Copy nutrition_data values, including legacy key variants, into the new columns"""
+    FoodLog = apps.get_model('tracker', 'FoodLog')
+
+    batch = []
+    fields = list(NUTRIENT_KEYS) + ['calories']
+    for log in FoodLog.objects.exclude(nutrition_data=None).iterator(chunk_size=1000):
+        data = log.nutrition_data if isinstance(log.nutrition_data, dict) else {}
+        for column, keys in NUTRIENT_KEYS.items():
+            setattr(log, column, _as_float(next((data[key] for key in keys if data.get(key)), 0)))
+        if not log.calories and data.get('calories'):
+            log.calories = _as_float(data['calories'])
+        batch.append(log)
+        if len(batch) >= 1000:
+            FoodLog.objects.bulk_update(batch, fields)
+            batch = []
+    if batch:
+        FoodLog.objects.bulk_update(batch, fields)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tracker', '0007_dailynutritionsummary'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='foodlog',
+            name='carbohydrates_total_g',
+            field=models.FloatField(default=0),
+        ),
+        migrations.AddField(
+            model_name='foodlog',
+            name='cholesterol_mg',
+            field=models.FloatField(default=0),
+        ),
+        migrations.AddField(
+            model_name='foodlog',
+            name='fat_total_g',
+            field=models.FloatField(default=0),
+        ),
+        migrations.AddField(
+            model_name='foodlog',
+            name='fiber_g',
+            field=models.FloatField(default=0),
+        ),
+        migrations.AddField(
+            model_name='foodlog',
+            name='potassium_mg',
+            field=models.FloatField(default=0),
+        ),
+        migrations.AddField(
+            model_name='foodlog',
+            name='protein_g',
+            field=models.FloatField(default=0),
+        ),
+        migrations.AddField(
+            model_name='foodlog',
+            name='saturated_fat_g',
+            field=models.FloatField(default=0),
+        ),
+        migrations.AddField(
+            model_name='foodlog',
+            name='sodium_mg',
+            field=models.FloatField(default=0),
+        ),
+        migrations.AddField(
+            model_name='foodlog',
+            name='sugar_g',
+            field=models.FloatField(default=0),
+        ),
+        migrations.RunPython(backfill_nutrient_columns, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='foodlog',
+            index=models.Index(fields=['user', 'date'], name='foodlog_user_date'),
+        ),
+        migrations.AddIndex(
+            model_name='foodlog',
+            index=models.Index(fields=['user', 'date', 'meal_type'], name='foodlog_user_date_meal'),
+        ),
+    ]
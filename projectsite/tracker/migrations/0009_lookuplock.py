@@ -0,0 +1,27 @@
+# Generated by Django 5.2.7 on 2026-10-18 03:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tracker', '0008_foodlog_nutrient_columns'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LookupLock',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=64, unique=True)),
+                ('owner', models.CharField(max_length=32)),
+                ('expires_at', models.DateTimeField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Lookup Lock',
+                'verbose_name_plural': 'Lookup Locks',
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.7 on 2026-10-18 03:21
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tracker', '0009_lookuplock'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='foodlog',
+            index=models.Index(fields=['user', '-date', '-created_at', '-id'], name='foodlog_user_keyset'),
+        ),
+        migrations.AddIndex(
+            model_name='foodlog',
+            index=models.Index(fields=['user', 'updated_at'], name='foodlog_user_updated'),
+        ),
+    ]
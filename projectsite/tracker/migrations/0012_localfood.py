@@ -0,0 +1,31 @@
+# Generated by Django 5.2.7 on 2026-10-18 03:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tracker', '0011_importjob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LocalFood',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True)),
+                ('aliases', models.JSONField(blank=True, default=list)),
+                ('nutrients', models.JSONField(default=dict)),
+                ('serving_size_g', models.FloatField(default=100)),
+                ('unit_weights', models.JSONField(blank=True, default=dict)),
+                ('bundled', models.BooleanField(default=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Local Food',
+                'verbose_name_plural': 'Local Foods',
+                'ordering': ['name'],
+            },
+        ),
+    ]
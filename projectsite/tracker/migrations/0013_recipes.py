@@ -0,0 +1,57 @@
+# Generated by Django 5.2.7 on 2026-10-18 03:38
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tracker', '0012_localfood'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Recipe',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100)),
+                ('lookup_name', models.CharField(editable=False, max_length=100)),
+                ('servings', models.FloatField(default=1)),
+                ('total_nutrition', models.JSONField(blank=True, default=dict)),
+                ('serving_nutrition', models.JSONField(blank=True, default=dict)),
+                ('total_weight_g', models.FloatField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='recipes', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Recipe',
+                'verbose_name_plural': 'Recipes',
+                'ordering': ['name'],
+            },
+        ),
+        migrations.CreateModel(
+            name='RecipeIngredient',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('text', models.CharField(max_length=255)),
+                ('items', models.JSONField(blank=True, default=list)),
+                ('nutrition', models.JSONField(blank=True, default=dict)),
+                ('weight_g', models.FloatField(default=0)),
+                ('position', models.PositiveIntegerField(default=0)),
+                ('recipe', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ingredients', to='tracker.recipe')),
+            ],
+            options={
+                'verbose_name': 'Recipe Ingredient',
+                'verbose_name_plural': 'Recipe Ingredients',
+                'ordering': ['position', 'id'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='recipe',
+            constraint=models.UniqueConstraint(fields=('user', 'lookup_name'), name='unique_recipe_name_per_user'),
+        ),
+    ]
@@ -0,0 +1,66 @@
+# Generated by Django 5.2.7 on 2026-10-18 03:42
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+from tracker.cache import normalize_query
+
+
+def build_frequent_foods(apps, schema_editor):
+    """Backfill the log-again lists from logs that existed before the table"""
+    FoodLog = apps.get_model('tracker', 'FoodLog')
+    FrequentFood = apps.get_model('tracker', 'FrequentFood')
+
+    foods = {}
+    logs = FoodLog.objects.filter(user__isnull=False, status='ready').order_by('created_at', 'id')
+    for log in logs.iterator(chunk_size=2000):
+        key = normalize_query(log.natural_query or log.food_name)[:255]
+        if not key:
+            continue
+        food = foods.setdefault((log.user_id, key), FrequentFood(user_id=log.user_id, lookup_key=key, log_count=0))
+        food.natural_query = log.natural_query
+        food.food_name = log.food_name
+        food.description = log.description
+        food.calories = log.calories
+        food.nutrition_data = log.nutrition_data
+        food.meal_type = log.meal_type
+        food.log_count += 1
+        food.last_logged_at = log.created_at
+
+    FrequentFood.objects.bulk_create(foods.values(), batch_size=2000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tracker', '0013_recipes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FrequentFood',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('lookup_key', models.CharField(max_length=255)),
+                ('natural_query', models.TextField(blank=True, null=True)),
+                ('food_name', models.CharField(max_length=200)),
+                ('description', models.TextField(blank=True, null=True)),
+                ('calories', models.FloatField(default=0)),
+                ('nutrition_data', models.JSONField(blank=True, null=True)),
+                ('meal_type', models.CharField(choices=[('breakfast', 'Breakfast'), ('lunch', 'Lunch'), ('dinner', 'Dinner'), ('snack', 'Snack')], default='snack', max_length=20)),
+                ('log_count', models.PositiveIntegerField(default=0)),
+                ('last_logged_at', models.DateTimeField()),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='frequent_foods', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Frequent Food',
+                'verbose_name_plural': 'Frequent Foods',
+                'ordering': ['-last_logged_at'],
+                'indexes': [models.Index(fields=['user', '-last_logged_at'], name='frequentfood_recent'), models.Index(fields=['user', '-log_count'], name='frequentfood_count')],
+                'constraints': [models.UniqueConstraint(fields=('user', 'lookup_key'), name='unique_frequent_food')],
+            },
+        ),
+        migrations.RunPython(build_frequent_foods, migrations.RunPython.noop),
+    ]
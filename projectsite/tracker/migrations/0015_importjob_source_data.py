@@ -0,0 +1,23 @@
+# Generated by Django 5.2.7 on 2026-10-18 04:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tracker', '0014_frequentfood'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='importjob',
+            name='source_data',
+            field=models.BinaryField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='importjob',
+            name='source_path',
+            field=models.CharField(blank=True, default='', max_length=500),
+        ),
+    ]
@@ -0,0 +1,60 @@
+# Generated by Django 5.2.7 on 2026-10-18 05:10
+
+from django.db import migrations
+from django.db.models import Count, Q, Sum, Value
+from django.db.models.functions import Coalesce
+
+
+# Frozen copy of FoodLog.SUMMARY_COLUMNS and FoodLog.summary_aggregates()
+SUMMARY_COLUMNS = {
+    'calories': 'calories',
+    'protein': 'protein_g',
+    'carbs': 'carbohydrates_total_g',
+    'fat': 'fat_total_g',
+    'fiber': 'fiber_g',
+    'sugar': 'sugar_g',
+    'sodium': 'sodium_mg',
+    'potassium': 'potassium_mg',
+    'cholesterol': 'cholesterol_mg',
+    'saturated_fat': 'saturated_fat_g',
+}
+MEAL_TYPES = ['breakfast', 'lunch', 'dinner']
+
+
+def rebuild_summaries(apps, schema_editor):
+    """
+    Rebuild every summary from the nutrient columns, as refresh_daily_summary
+    computes them. 0007 read calories and nutrients from nutrition_data, and
+    0008 then backfilled the columns without touching the summaries.
+    """
+    FoodLog = apps.get_model('tracker', 'FoodLog')
+    DailyNutritionSummary = apps.get_model('tracker', 'DailyNutritionSummary')
+
+    aggregates = {
+        field: Coalesce(Sum(column), Value(0.0))
+        for field, column in SUMMARY_COLUMNS.items()
+    }
+    aggregates['log_count'] = Count('id')
+    for meal_type in MEAL_TYPES:
+        aggregates[f"{meal_type}_count"] = Count('id', filter=Q(meal_type=meal_type))
+    # Unknown meal types (legacy rows) count as snacks
+    aggregates['snack_count'] = Count('id', filter=~Q(meal_type__in=MEAL_TYPES))
+
+    grouped = FoodLog.objects.filter(user__isnull=False).order_by().values('user_id', 'date').annotate(
+        **aggregates
+    )
+    rows = [DailyNutritionSummary(**totals) for totals in grouped.iterator(chunk_size=2000)]
+
+    DailyNutritionSummary.objects.all().delete()
+    DailyNutritionSummary.objects.bulk_create(rows, batch_size=2000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tracker', '0015_importjob_source_data'),
+    ]
+
+    operations = [
+        migrations.RunPython(rebuild_summaries, migrations.RunPython.noop),
+    ]
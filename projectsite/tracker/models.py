@@ -1,7 +1,28 @@
 from django.db import models
+from django.db.models import Count, Q, Sum, Value
+from django.db.models.functions import Coalesce
 from django.utils import timezone
 from django.contrib.auth.models import User
 
+from .cache import normalize_query
+
+
+class FoodLogQuerySet(models.QuerySet):
+    """
+    Database-side aggregation over the denormalized nutrient columns
+    """
+    
+    def nutrition_totals(self):
+        """
+        Nutrient totals and meal counts for the queryset in one aggregate query
+        
+        Returns:
+            dict: Keys match DailyNutritionSummary fields (calories, protein, ...,
+                  log_count, breakfast_count, ...)
+        """
+        return self.order_by().aggregate(**FoodLog.summary_aggregates())
+
+
 class FoodLog(models.Model):
     """
     Model to track food consumption logs with nutrition details
@@ -14,6 +35,43 @@ class FoodLog(models.Model):
         ('snack', 'Snack'),
     ]
     
+    # Nutrient column -> nutrition_data key(s), first non-empty key wins.
+    # The extra keys cover legacy rows and the raw CalorieNinjas item shape.
+    NUTRIENT_KEYS = {
+        'protein_g': ('protein_g',),
+        'carbohydrates_total_g': ('carbohydrates_total_g', 'carbohydrates_g', 'carbs'),
+        'fat_total_g': ('fat_total_g',),
+        'fiber_g': ('fiber_g',),
+        'sugar_g': ('sugar_g',),
+        'sodium_mg': ('sodium_mg',),
+        'potassium_mg': ('potassium_mg',),
+        'cholesterol_mg': ('cholesterol_mg',),
+        'saturated_fat_g': ('saturated_fat_g', 'fat_saturated_g'),
+    }
+    
+    # DailyNutritionSummary field -> FoodLog column
+    SUMMARY_COLUMNS = {
+        'calories': 'calories',
+        'protein': 'protein_g',
+        'carbs': 'carbohydrates_total_g',
+        'fat': 'fat_total_g',
+        'fiber': 'fiber_g',
+        'sugar': 'sugar_g',
+        'sodium': 'sodium_mg',
+        'potassium': 'potassium_mg',
+        'cholesterol': 'cholesterol_mg',
+        'saturated_fat': 'saturated_fat_g',
+    }
+    
+    STATUS_READY = 'ready'
+    STATUS_PENDING = 'pending'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_READY, 'Ready'),
+        (STATUS_PENDING, 'Pending'),
+        (STATUS_FAILED, 'Failed'),
+    ]
+    
     user = models.ForeignKey(User, on_delete=models.CASCADE, null=True, blank=True)
     food_name = models.CharField(max_length=200)
     description = models.TextField(blank=True, null=True)
@@ -30,6 +88,25 @@ class FoodLog(models.Model):
     # Store detailed nutrition as JSON
     nutrition_data = models.JSONField(blank=True, null=True)
     
+    # Denormalized copies of nutrition_data, kept in sync on save for DB-side Sum()
+    protein_g = models.FloatField(default=0)
+    carbohydrates_total_g = models.FloatField(default=0)
+    fat_total_g = models.FloatField(default=0)
+    fiber_g = models.FloatField(default=0)
+    sugar_g = models.FloatField(default=0)
+    sodium_mg = models.FloatField(default=0)
+    potassium_mg = models.FloatField(default=0)
+    cholesterol_mg = models.FloatField(default=0)
+    saturated_fat_g = models.FloatField(default=0)
+    
+    # Raw user input, kept so nutrition can be looked up in the background
+    natural_query = models.TextField(blank=True, null=True)
+    status = models.CharField(
+        max_length=10,
+        choices=STATUS_CHOICES,
+        default=STATUS_READY
+    )
+    
     class Meta:
         ordering = ['-date', '-created_at']
         verbose_name = 'Food Log'
@@ -46,7 +123,423 @@ class FoodLog(models.Model):
             return self.nutrition_data.get(key, default)
         return default
     
+    @property
+    def is_pending(self):
+        return self.status == self.STATUS_PENDING
+    
+    def sync_nutrition_columns(self):
+        """
+        Copy nutrient values out of nutrition_data into the float columns
+        """
+        data = self.nutrition_data if isinstance(self.nutrition_data, dict) else {}
+        for column, keys in self.NUTRIENT_KEYS.items():
+            value = next((data[key] for key in keys if data.get(key)), 0)
+            try:
+                setattr(self, column, float(value or 0))
+            except (TypeError, ValueError):
+                setattr(self, column, 0)
+    
+    def save(self, *args, **kwargs):
+        self.sync_nutrition_columns()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'nutrition_data' in update_fields:
+            kwargs['update_fields'] = set(update_fields) | set(self.NUTRIENT_KEYS)
+        super().save(*args, **kwargs)
+    
+    @classmethod
+    def summary_aggregates(cls):
+        """
+        Aggregate expressions producing DailyNutritionSummary values
+        """
+        aggregates = {
+            field: Coalesce(Sum(column), Value(0.0))
+            for field, column in cls.SUMMARY_COLUMNS.items()
+        }
+        aggregates['log_count'] = Count('id')
+        meal_types = [meal_type for meal_type, _ in cls.MEAL_TYPE_CHOICES]
+        for meal_type in meal_types:
+            aggregates[f"{meal_type}_count"] = Count('id', filter=Q(meal_type=meal_type))
+        # Unknown meal types (legacy rows) count as snacks, as on the home page
+        aggregates['snack_count'] = Count('id', filter=~Q(meal_type__in=set(meal_types) - {'snack'}))
+        return aggregates
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember where the row lived so summaries can be fixed when an edit moves it
+        instance._loaded_summary_key = (instance.__dict__.get('user_id'), instance.__dict__.get('date'))
+        # Lets the frequent-foods signal notice a pending log becoming ready
+        instance._loaded_status = instance.__dict__.get('status')
+        return instance
+    
+    objects = FoodLogQuerySet.as_manager()
+    
     class Meta:
         ordering = ['-created_at']
         verbose_name = "Food Log"
-        verbose_name_plural = "Food Logs"
\ No newline at end of file
+        verbose_name_plural = "Food Logs"
+        indexes = [
+            models.Index(fields=['user', 'date'], name='foodlog_user_date'),
+            models.Index(fields=['user', 'date', 'meal_type'], name='foodlog_user_date_meal'),
+            # Keyset pagination in the JSON API and its ETag lookup
+            models.Index(fields=['user', '-date', '-created_at', '-id'], name='foodlog_user_keyset'),
+            models.Index(fields=['user', 'updated_at'], name='foodlog_user_updated'),
+        ]
+
+
+class DailyNutritionSummary(models.Model):
+    """
+    Per-user daily nutrition rollup, kept up to date by FoodLog save/delete
+    signals (see tracker/signals.py). Rebuild with `manage.py rebuild_daily_summaries`.
+    """
+    
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='daily_summaries')
+    date = models.DateField()
+    
+    calories = models.FloatField(default=0)
+    protein = models.FloatField(default=0)
+    carbs = models.FloatField(default=0)
+    fat = models.FloatField(default=0)
+    fiber = models.FloatField(default=0)
+    sugar = models.FloatField(default=0)
+    sodium = models.FloatField(default=0)
+    potassium = models.FloatField(default=0)
+    cholesterol = models.FloatField(default=0)
+    saturated_fat = models.FloatField(default=0)
+    
+    log_count = models.PositiveIntegerField(default=0)
+    breakfast_count = models.PositiveIntegerField(default=0)
+    lunch_count = models.PositiveIntegerField(default=0)
+    dinner_count = models.PositiveIntegerField(default=0)
+    snack_count = models.PositiveIntegerField(default=0)
+    
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    NUTRIENT_FIELDS = [
+        'calories', 'protein', 'carbs', 'fat', 'fiber', 'sugar',
+        'sodium', 'potassium', 'cholesterol', 'saturated_fat',
+    ]
+    
+    class Meta:
+        ordering = ['-date']
+        verbose_name = 'Daily Nutrition Summary'
+        verbose_name_plural = 'Daily Nutrition Summaries'
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'date'], name='unique_daily_summary'),
+        ]
+    
+    def __str__(self):
+        return f"{self.user} - {self.date} ({round(self.calories)} kcal)"
+    
+    def as_nutrition_dict(self):
+        """
+        Totals in the shape the home and dashboard templates expect
+        """
+        return {field: getattr(self, field) for field in self.NUTRIENT_FIELDS}
+    
+    def meal_counts(self):
+        return {
+            'breakfast': self.breakfast_count,
+            'lunch': self.lunch_count,
+            'dinner': self.dinner_count,
+            'snack': self.snack_count,
+        }
+
+
+class EnrichmentJob(models.Model):
+    """
+    Background job that fills in nutrition for a pending FoodLog.
+    Processed by `manage.py process_enrichment_jobs`.
+    """
+    
+    STATUS_QUEUED = 'queued'
+    STATUS_RUNNING = 'running'
+    STATUS_DONE = 'done'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_QUEUED, 'Queued'),
+        (STATUS_RUNNING, 'Running'),
+        (STATUS_DONE, 'Done'),
+        (STATUS_FAILED, 'Failed'),
+    ]
+    
+    food_log = models.OneToOneField(FoodLog, on_delete=models.CASCADE, related_name='enrichment_job')
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_QUEUED)
+    attempts = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True, default='')
+    run_after = models.DateTimeField(default=timezone.now)
+    locked_at = models.DateTimeField(blank=True, null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        ordering = ['run_after']
+        verbose_name = 'Enrichment Job'
+        verbose_name_plural = 'Enrichment Jobs'
+        indexes = [
+            models.Index(fields=['status', 'run_after'], name='enrichment_status_run_after'),
+        ]
+    
+    def __str__(self):
+        return f"Enrich #{self.food_log_id} ({self.status}, {self.attempts} attempts)"
+
+
+class ImportJob(models.Model):
+    """
+    CSV import of a user's meal history. Rows are committed in batches
+    together with rows_processed, so an interrupted import resumes after
+    the last committed batch. Processed by `manage.py import_food_logs`.
+    """
+    
+    STATUS_QUEUED = 'queued'
+    STATUS_RUNNING = 'running'
+    STATUS_DONE = 'done'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_QUEUED, 'Queued'),
+        (STATUS_RUNNING, 'Running'),
+        (STATUS_DONE, 'Done'),
+        (STATUS_FAILED, 'Failed'),
+    ]
+    
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='import_jobs')
+    # Uploads keep their contents here until the job finishes; command line
+    # imports read the file at source_path instead
+    source_data = models.BinaryField(blank=True, null=True)
+    source_path = models.CharField(max_length=500, blank=True, default='')
+    original_filename = models.CharField(max_length=255, blank=True, default='')
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_QUEUED)
+    
+    # Data rows read so far, committed together with the logs they produced
+    rows_processed = models.PositiveIntegerField(default=0)
+    rows_imported = models.PositiveIntegerField(default=0)
+    rows_enriched = models.PositiveIntegerField(default=0)
+    rows_rejected = models.PositiveIntegerField(default=0)
+    errors = models.JSONField(default=list, blank=True)
+    
+    locked_at = models.DateTimeField(blank=True, null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        ordering = ['-created_at']
+        verbose_name = 'Import Job'
+        verbose_name_plural = 'Import Jobs'
+    
+    def __str__(self):
+        return f"Import #{self.pk} for {self.user} ({self.status}, {self.rows_processed} rows)"
+
+
+class NutritionLookupCache(models.Model):
+    """
+    Persistent cache of CalorieNinjas responses keyed by normalized query
+    """
+    
+    query_hash = models.CharField(max_length=64, unique=True)
+    normalized_query = models.TextField()
+    response_data = models.JSONField()
+    hit_count = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    last_accessed_at = models.DateTimeField(default=timezone.now, db_index=True)
+    expires_at = models.DateTimeField(db_index=True)
+    
+    class Meta:
+        ordering = ['-last_accessed_at']
+        verbose_name = 'Nutrition Lookup Cache Entry'
+        verbose_name_plural = 'Nutrition Lookup Cache'
+    
+    def __str__(self):
+        return f"{self.normalized_query[:50]} ({self.hit_count} hits)"
+    
+    @property
+    def is_expired(self):
+        return self.expires_at <= timezone.now()
+
+
+class LookupLock(models.Model):
+    """
+    Short-lived claim on a CalorieNinjas lookup. The worker holding it makes
+    the API call; other workers wait for its answer in NutritionLookupCache.
+    """
+    
+    key = models.CharField(max_length=64, unique=True)
+    owner = models.CharField(max_length=32)
+    expires_at = models.DateTimeField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        verbose_name = 'Lookup Lock'
+        verbose_name_plural = 'Lookup Locks'
+    
+    def __str__(self):
+        return f"{self.key[:12]} (until {self.expires_at:%H:%M:%S})"
+
+
+class FoodItem(models.Model):
+    """
+    Nutrition for a single food item, keyed by canonical name and serving size.
+    Items are stored in the raw CalorieNinjas item shape so they can be fed
+    straight back into CalorieNinjasService.extract_food_items.
+    """
+    
+    name = models.CharField(max_length=200)
+    serving_size_g = models.FloatField()
+    item_data = models.JSONField()
+    hit_count = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        ordering = ['name', 'serving_size_g']
+        verbose_name = 'Food Item'
+        verbose_name_plural = 'Food Items'
+        constraints = [
+            models.UniqueConstraint(fields=['name', 'serving_size_g'], name='unique_food_item_serving'),
+        ]
+    
+    def __str__(self):
+        return f"{self.name} ({self.serving_size_g}g)"
+
+
+class FoodItemAlias(models.Model):
+    """
+    Maps a normalized query segment ("14 oz prime rib") to a known FoodItem
+    """
+    
+    phrase = models.CharField(max_length=255, unique=True)
+    item = models.ForeignKey(FoodItem, on_delete=models.CASCADE, related_name='aliases')
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        verbose_name = 'Food Item Alias'
+        verbose_name_plural = 'Food Item Aliases'
+    
+    def __str__(self):
+        return f"{self.phrase} -> {self.item.name}"
+
+
+class LocalFood(models.Model):
+    """
+    Generic food from the bundled nutrient dataset (tracker/data/local_foods.json).
+    Nutrients are per 100 g in the CalorieNinjas item keys; unit_weights maps
+    household units ("cup", "piece", "slice") to grams. Loaded with
+    `manage.py load_local_foods` and matched in-process by tracker.local_foods.
+    """
+    
+    name = models.CharField(max_length=100, unique=True)
+    aliases = models.JSONField(default=list, blank=True)
+    nutrients = models.JSONField(default=dict)
+    serving_size_g = models.FloatField(default=100)
+    unit_weights = models.JSONField(default=dict, blank=True)
+    bundled = models.BooleanField(default=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        ordering = ['name']
+        verbose_name = 'Local Food'
+        verbose_name_plural = 'Local Foods'
+    
+    def __str__(self):
+        return self.name
+
+
+class Recipe(models.Model):
+    """
+    A user's saved dish. Ingredients are looked up once; the recipe keeps
+    their summed nutrition (total_nutrition) and the per-serving share
+    (serving_nutrition), both in the CalorieNinjasService.aggregate_nutrition
+    shape, so logging servings of it is a local multiply. tracker.recipes
+    updates both incrementally as ingredients change.
+    """
+    
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='recipes')
+    name = models.CharField(max_length=100)
+    # normalize_query(name), matched against "1.5 servings of my <name>"
+    lookup_name = models.CharField(max_length=100, editable=False)
+    servings = models.FloatField(default=1)
+    total_nutrition = models.JSONField(default=dict, blank=True)
+    serving_nutrition = models.JSONField(default=dict, blank=True)
+    total_weight_g = models.FloatField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        ordering = ['name']
+        verbose_name = 'Recipe'
+        verbose_name_plural = 'Recipes'
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'lookup_name'], name='unique_recipe_name_per_user'),
+        ]
+    
+    def __str__(self):
+        return f"{self.name} ({self.user.username})"
+    
+    def save(self, *args, **kwargs):
+        self.lookup_name = normalize_query(self.name)[:100]
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'name' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'lookup_name'}
+        super().save(*args, **kwargs)
+    
+    @property
+    def serving_calories(self):
+        return round(self.serving_nutrition.get('calories', 0), 1)
+
+
+class RecipeIngredient(models.Model):
+    """
+    One ingredient line of a Recipe ("2 cups rice") with the items and
+    nutrition it resolved to
+    """
+    
+    recipe = models.ForeignKey(Recipe, on_delete=models.CASCADE, related_name='ingredients')
+    text = models.CharField(max_length=255)
+    items = models.JSONField(default=list, blank=True)  # From extract_food_items
+    nutrition = models.JSONField(default=dict, blank=True)  # aggregate_nutrition of items
+    weight_g = models.FloatField(default=0)
+    position = models.PositiveIntegerField(default=0)
+    
+    class Meta:
+        ordering = ['position', 'id']
+        verbose_name = 'Recipe Ingredient'
+        verbose_name_plural = 'Recipe Ingredients'
+    
+    def __str__(self):
+        return self.text
+
+
+class FrequentFood(models.Model):
+    """
+    One distinct meal a user has logged, with how often and when they last
+    logged it and a copy of its latest nutrition. Kept up to date by the
+    FoodLog save/delete signals (see tracker/signals.py) so the "log again"
+    lists on the home page are a short indexed read, not a FoodLog scan.
+    Rebuild with `manage.py rebuild_frequent_foods`.
+    """
+    
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='frequent_foods')
+    # normalize_query(natural_query or food_name) of the logs counted here
+    lookup_key = models.CharField(max_length=255)
+    natural_query = models.TextField(blank=True, null=True)
+    food_name = models.CharField(max_length=200)
+    description = models.TextField(blank=True, null=True)
+    calories = models.FloatField(default=0)
+    nutrition_data = models.JSONField(blank=True, null=True)
+    meal_type = models.CharField(max_length=20, choices=FoodLog.MEAL_TYPE_CHOICES, default='snack')
+    log_count = models.PositiveIntegerField(default=0)
+    last_logged_at = models.DateTimeField()
+    
+    class Meta:
+        ordering = ['-last_logged_at']
+        verbose_name = 'Frequent Food'
+        verbose_name_plural = 'Frequent Foods'
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'lookup_key'], name='unique_frequent_food'),
+        ]
+        indexes = [
+            models.Index(fields=['user', '-last_logged_at'], name='frequentfood_recent'),
+            models.Index(fields=['user', '-log_count'], name='frequentfood_count'),
+        ]
+    
+    def __str__(self):
+        return f"{self.food_name} x{self.log_count} ({self.user})"
@@ -0,0 +1,262 @@
+"""
+Per-user cache of the home, dashboard and trends page contexts.
+
+A user's data only changes when one of their logs is saved or deleted, so
+the computed context (today's logs, nutrition totals, meal counts, chart
+series) is kept in the Django cache, keyed by user, page and date. Every
+entry is stored with the user's version token. FoodLog writes replace the
+token, which makes all of that user's entries unreachable in one cache
+write; nothing is ever served for a version older than the data.
+
+Inside a transaction the token is replaced when the transaction commits,
+so a page built before then from the old data is stored under the old
+token. Outside one it is replaced right away.
+
+The version key, a global generation key (bumped by bulk rebuilds) and
+the page entry are read with one get_many, so a repeat visit costs one
+cache read and no aggregate queries.
+"""
+import hashlib
+import json
+import logging
+import uuid
+from datetime import timedelta
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.utils import timezone
+
+from .frequent import relog_choices
+from .models import FoodLog
+from .summaries import (
+    CHART_RANGES, build_nutrition_series, get_daily_summary, group_logs_by_meal, parse_chart_range,
+)
+from .trends import build_trends
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PAGE_CACHE_SETTINGS = {
+    'ENABLED': True,
+    'CACHE_ALIAS': 'default',
+    'TTL_SECONDS': 60 * 60 * 6,
+    'WARM_ACTIVE_DAYS': 7,  # warm_dashboards covers users who logged within this many days
+}
+
+GENERATION_KEY = 'tracker:pages:generation'
+
+# Daily calorie goal drawn on the dashboard chart
+CALORIE_GOAL = 2000
+
+
+def get_page_cache_settings():
+    """
+    Merge TRACKER_PAGE_CACHE from settings with the defaults
+    """
+    config = dict(DEFAULT_PAGE_CACHE_SETTINGS)
+    config.update(getattr(settings, 'TRACKER_PAGE_CACHE', {}) or {})
+    return config
+
+
+def _cache(config=None):
+    return caches[(config or get_page_cache_settings())['CACHE_ALIAS']]
+
+
+def _version_key(user_id):
+    return f'tracker:pages:version:{user_id}'
+
+
+def _page_key(user_id, page, params):
+    digest = hashlib.sha1(json.dumps(params, sort_keys=True, default=str).encode()).hexdigest()
+    return f'tracker:pages:{page}:{user_id}:{digest}'
+
+
+def _new_token():
+    return uuid.uuid4().hex
+
+
+def bump_page_version(user_id):
+    """
+    Invalidate every cached page of one user once the current transaction
+    commits, or right away outside one
+    """
+    if user_id is None or not get_page_cache_settings()['ENABLED']:
+        return
+
+    def bump():
+        try:
+            _cache().set(_version_key(user_id), _new_token(), None)
+        except Exception as e:
+            logger.error(f"Could not bump page cache version for user {user_id}: {str(e)}")
+
+    transaction.on_commit(bump)
+
+
+def bump_all_page_versions():
+    """
+    Invalidate every user's cached pages, after a bulk rebuild
+    """
+    if get_page_cache_settings()['ENABLED']:
+        _cache().set(GENERATION_KEY, _new_token(), None)
+
+
+def cached_context(user_id, page, params, build):
+    """
+    Return the cached context for (user, page, params), building and storing
+    it when missing or stored under an older version
+
+    Args:
+        user_id (int): Owner of the page
+        page (str): Page name
+        params (dict): Everything else the context depends on (dates, ranges)
+        build (callable): Builds the context; its result must be picklable
+
+    Returns:
+        dict: The page context
+    """
+    config = get_page_cache_settings()
+    if not config['ENABLED']:
+        return build()
+
+    cache = _cache(config)
+    version_key = _version_key(user_id)
+    page_key = _page_key(user_id, page, params)
+    try:
+        found = cache.get_many([GENERATION_KEY, version_key, page_key])
+    except Exception as e:
+        logger.error(f"Page cache read failed: {str(e)}")
+        return build()
+
+    # The version is read before building, so a write that lands while the
+    # page is built replaces it and the stored entry is never served
+    version = (found.get(GENERATION_KEY), found.get(version_key))
+    if version[1] is None:
+        token = _new_token()
+        version = (version[0], token if cache.add(version_key, token, None) else cache.get(version_key))
+
+    entry = found.get(page_key)
+    if entry is not None and entry[0] == version:
+        return entry[1]
+
+    context = build()
+    try:
+        cache.set(page_key, (version, context), config['TTL_SECONDS'])
+    except Exception as e:
+        logger.error(f"Page cache write failed: {str(e)}")
+    return context
+
+
+def build_home_context(user, today):
+    """
+    Today's logs grouped by meal, totals, meal counts and the log-again
+    lists; everything about today comes from one query
+    """
+    todays_logs = list(FoodLog.objects.filter(date=today, user=user))
+    grouped = group_logs_by_meal(todays_logs)
+    return {
+        'todays_logs': todays_logs,
+        'today': today,
+        'meals': grouped['meals'],
+        'total_logs_today': grouped['log_count'],
+        'meal_counts': grouped['meal_counts'],
+        'nutrition_totals': grouped['nutrition_totals'],
+        'relog': relog_choices(user),
+    }
+
+
+def home_context(user, today):
+    return cached_context(user.pk, 'home', {'today': today}, lambda: build_home_context(user, today))
+
+
+def build_dashboard_context(user, current_date, today, chart_start, chart_end, chart_range):
+    """
+    One day's logs and totals plus the chart series for a range
+    """
+    # Daily nutrition totals come from the daily rollup
+    summary = get_daily_summary(user, current_date)
+    daily_nutrition = summary.as_nutrition_dict()
+    series = build_nutrition_series(user, chart_start, chart_end)
+    points = series['points']
+
+    # Keep the chart range when navigating between days
+    range_params = {'range': chart_range}
+    if chart_range == 'custom':
+        range_params.update(start=chart_start.isoformat(), end=chart_end.isoformat())
+
+    return {
+        'current_date': current_date,
+        'prev_date': (current_date - timedelta(days=1)).strftime('%Y-%m-%d'),
+        'next_date': (current_date + timedelta(days=1)).strftime('%Y-%m-%d'),
+        'is_today': current_date == today,
+        'food_logs': list(FoodLog.objects.filter(date=current_date, user=user)),
+        'daily_meals_count': summary.log_count,
+        'daily_nutrition': daily_nutrition,
+        'calorie_goal': CALORIE_GOAL,
+        'calories_chart_json': json.dumps([
+            {'date': point['date'], 'calories': point['calories']} for point in points
+        ]),
+        'protein_chart_json': json.dumps([
+            {'date': point['date'], 'value': point['protein']} for point in points
+        ]),
+        'carbs_chart_json': json.dumps([
+            {'date': point['date'], 'value': point['carbs']} for point in points
+        ]),
+        'fat_chart_json': json.dumps([
+            {'date': point['date'], 'value': point['fat']} for point in points
+        ]),
+        'distribution_json': json.dumps({
+            'protein': round(daily_nutrition['protein'], 1),
+            'carbs': round(daily_nutrition['carbs'], 1),
+            'fat': round(daily_nutrition['fat'], 1),
+        }),
+        'chart_range': chart_range,
+        'chart_ranges': CHART_RANGES,
+        'chart_start': chart_start,
+        'chart_end': chart_end,
+        'chart_bucket': series['bucket'],
+        'range_query': urlencode(range_params),
+    }
+
+
+def dashboard_context(user, current_date, today, chart_start, chart_end, chart_range):
+    params = {
+        'date': current_date,
+        'today': today,
+        'start': chart_start,
+        'end': chart_end,
+        'range': chart_range,
+    }
+    return cached_context(
+        user.pk, 'dashboard', params,
+        lambda: build_dashboard_context(user, current_date, today, chart_start, chart_end, chart_range),
+    )
+
+
+def trends_context(user, today, days):
+    """
+    Rolling averages and streaks for the `days` days ending today
+    """
+    return cached_context(user.pk, 'trends', {'today': today, 'days': days},
+                          lambda: build_trends(user, today, days))
+
+
+def warm_user_pages(user, today=None):
+    """
+    Build and cache a user's home page and default dashboard for today
+    """
+    today = today or timezone.now().date()
+    home_context(user, today)
+    dashboard_context(user, today, today, *parse_chart_range({}, today))
+
+
+def recently_active_users(days=None):
+    """
+    Users who added or changed a log in the last `days` days
+    """
+    from django.contrib.auth.models import User
+
+    days = days or get_page_cache_settings()['WARM_ACTIVE_DAYS']
+    since = timezone.now() - timedelta(days=days)
+    active_ids = FoodLog.objects.filter(updated_at__gte=since, user__isnull=False).values('user_id')
+    return User.objects.filter(pk__in=active_ids, is_active=True).order_by('pk')
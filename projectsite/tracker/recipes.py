@@ -0,0 +1,252 @@
+"""
+Saved recipes (composite meals).
+
+Each ingredient line is looked up once through CalorieNinjasService and
+stored with its extract_food_items output and aggregate_nutrition totals.
+The recipe keeps the sum over its ingredients and the per-serving share,
+updated by adding or subtracting only the ingredient that changed.
+
+Logging "1.5 servings of my adobo" then multiplies the stored per-serving
+totals; no lookup is made.
+"""
+from django.db import transaction
+from django.db.models import Max
+
+from .cache import normalize_query, strip_leading_filler
+from .local_foods import UNIT_GRAMS, parse_quantity
+from .models import FoodLog, Recipe, RecipeIngredient
+from .services import CalorieNinjasService
+
+# Keys of CalorieNinjasService.aggregate_nutrition
+NUTRITION_KEYS = [*FoodLog.NUTRIENT_KEYS, 'calories']
+
+# Units that mean "a serving of the recipe"
+SERVING_UNITS = (None, 'serving', 'bowl', 'plate')
+
+
+class IngredientLookupError(Exception):
+    """
+    An ingredient line could not be looked up
+    """
+
+
+def resolve_ingredient(text, service=None):
+    """
+    Look up one ingredient line
+
+    Returns:
+        tuple: (items from extract_food_items, their aggregate_nutrition, weight in grams)
+
+    Raises:
+        IngredientLookupError: The lookup failed or found nothing
+    """
+    service = service or CalorieNinjasService()
+    api_response = service.parse_food_query(text)
+    if not api_response.get('success'):
+        raise IngredientLookupError(api_response.get('message', 'Unknown error'))
+    items = service.extract_food_items(api_response)
+    if not items:
+        raise IngredientLookupError(f"No nutrition found for '{text}'")
+    weight = sum(float(item.get('serving_size_g') or 0) for item in items)
+    return items, service.aggregate_nutrition(items), weight
+
+
+def _combine(total, delta, sign=1):
+    # Rounded so repeated adds and removes do not accumulate float noise
+    return {
+        key: round(total.get(key, 0) + sign * delta.get(key, 0), 3)
+        for key in NUTRITION_KEYS
+    }
+
+
+def _per_serving(total, servings):
+    servings = servings if servings and servings > 0 else 1
+    return {key: round(value / servings, 3) for key, value in total.items()}
+
+
+def _apply_change(recipe, nutrition, weight, sign):
+    """
+    Add (sign=1) or subtract (sign=-1) one ingredient's nutrition from the
+    recipe totals, under a row lock so concurrent edits do not lose updates
+    """
+    locked = Recipe.objects.select_for_update().get(pk=recipe.pk)
+    locked.total_nutrition = _combine(locked.total_nutrition, nutrition, sign)
+    locked.total_weight_g = max(0.0, round(locked.total_weight_g + sign * weight, 3))
+    locked.serving_nutrition = _per_serving(locked.total_nutrition, locked.servings)
+    locked.save(update_fields=['total_nutrition', 'total_weight_g', 'serving_nutrition', 'updated_at'])
+
+    recipe.total_nutrition = locked.total_nutrition
+    recipe.total_weight_g = locked.total_weight_g
+    recipe.serving_nutrition = locked.serving_nutrition
+    recipe.servings = locked.servings
+    return recipe
+
+
+def create_recipe(user, name, servings, ingredient_lines, service=None):
+    """
+    Look up every ingredient line and save the recipe with its totals
+
+    Raises:
+        IngredientLookupError: An ingredient could not be looked up (nothing is saved)
+    """
+    service = service or CalorieNinjasService()
+    resolved = []
+    for text in ingredient_lines:
+        try:
+            resolved.append((text, *resolve_ingredient(text, service)))
+        except IngredientLookupError as e:
+            raise IngredientLookupError(f"{text}: {e}")
+
+    total = _combine({}, {})
+    weight = 0.0
+    for _, _, nutrition, item_weight in resolved:
+        total = _combine(total, nutrition)
+        weight += item_weight
+
+    with transaction.atomic():
+        recipe = Recipe.objects.create(
+            user=user,
+            name=name,
+            servings=servings,
+            total_nutrition=total,
+            serving_nutrition=_per_serving(total, servings),
+            total_weight_g=round(weight, 3),
+        )
+        RecipeIngredient.objects.bulk_create([
+            RecipeIngredient(recipe=recipe, text=text, items=items, nutrition=nutrition,
+                             weight_g=item_weight, position=position)
+            for position, (text, items, nutrition, item_weight) in enumerate(resolved)
+        ])
+    return recipe
+
+
+def add_ingredient(recipe, text, service=None):
+    """
+    Look up and add one ingredient, updating the totals by its nutrition only
+
+    Returns:
+        RecipeIngredient: The new ingredient
+    """
+    items, nutrition, weight = resolve_ingredient(text, service)
+    with transaction.atomic():
+        position = (recipe.ingredients.aggregate(last=Max('position'))['last'] or 0) + 1
+        ingredient = RecipeIngredient.objects.create(
+            recipe=recipe, text=text, items=items, nutrition=nutrition, weight_g=weight, position=position,
+        )
+        _apply_change(recipe, nutrition, weight, 1)
+    return ingredient
+
+
+def update_ingredient(ingredient, text, service=None):
+    """
+    Replace an ingredient line, updating the totals by the difference
+    """
+    items, nutrition, weight = resolve_ingredient(text, service)
+    with transaction.atomic():
+        difference = _combine(nutrition, ingredient.nutrition, -1)
+        _apply_change(ingredient.recipe, difference, weight - ingredient.weight_g, 1)
+        ingredient.text = text
+        ingredient.items = items
+        ingredient.nutrition = nutrition
+        ingredient.weight_g = weight
+        ingredient.save(update_fields=['text', 'items', 'nutrition', 'weight_g'])
+    return ingredient
+
+
+def remove_ingredient(ingredient):
+    """
+    Delete an ingredient and subtract its nutrition from the totals
+    """
+    with transaction.atomic():
+        _apply_change(ingredient.recipe, ingredient.nutrition, ingredient.weight_g, -1)
+        ingredient.delete()
+
+
+def set_servings(recipe, servings):
+    """
+    Change how many servings the recipe makes; only the per-serving share changes
+    """
+    with transaction.atomic():
+        locked = Recipe.objects.select_for_update().get(pk=recipe.pk)
+        locked.servings = servings
+        locked.serving_nutrition = _per_serving(locked.total_nutrition, servings)
+        locked.save(update_fields=['servings', 'serving_nutrition', 'updated_at'])
+    recipe.servings = locked.servings
+    recipe.total_nutrition = locked.total_nutrition
+    recipe.serving_nutrition = locked.serving_nutrition
+    return recipe
+
+
+def rebuild_recipe(recipe):
+    """
+    Recompute the totals from the stored ingredients (no lookups)
+    """
+    total = _combine({}, {})
+    weight = 0.0
+    for nutrition, item_weight in recipe.ingredients.values_list('nutrition', 'weight_g'):
+        total = _combine(total, nutrition)
+        weight += item_weight
+    recipe.total_nutrition = total
+    recipe.total_weight_g = round(weight, 3)
+    recipe.serving_nutrition = _per_serving(total, recipe.servings)
+    recipe.save(update_fields=['total_nutrition', 'total_weight_g', 'serving_nutrition', 'updated_at'])
+    return recipe
+
+
+def match_recipe(user, natural_query):
+    """
+    Find the recipe and amount in "1.5 servings of my adobo" or "my adobo"
+
+    Only phrases that say "my <recipe>" or count servings are checked, so
+    ordinary meals do not pay for a recipe query.
+
+    Returns:
+        tuple or None: (Recipe, servings)
+    """
+    text = strip_leading_filler(normalize_query(natural_query))
+    quantity, unit, phrase = parse_quantity(text)
+    if phrase.startswith('my '):
+        phrase = phrase[3:]
+    elif unit != 'serving':
+        return None
+    if unit not in SERVING_UNITS and unit not in UNIT_GRAMS:
+        return None
+
+    recipe = Recipe.objects.filter(user=user, lookup_name=phrase[:100]).first()
+    if recipe is None:
+        return None
+
+    quantity = 1.0 if quantity is None else quantity
+    if unit in UNIT_GRAMS:
+        if not recipe.total_weight_g:
+            return None
+        serving_weight = recipe.total_weight_g / (recipe.servings or 1)
+        return recipe, quantity * UNIT_GRAMS[unit] / serving_weight
+    return recipe, quantity
+
+
+def recipe_log_data(recipe, servings):
+    """
+    Nutrition for servings of a recipe, in the format_for_food_log shape
+    """
+    nutrition = {key: round(value * servings, 1) for key, value in recipe.serving_nutrition.items()}
+    return {
+        'food_name': recipe.name[:200],
+        'description': f"{servings:g} serving{'s' if servings != 1 else ''} of {recipe.name} "
+                       f"({recipe.serving_calories} cal per serving)",
+        'calories': nutrition.get('calories', 0),
+        'nutrition': nutrition,
+    }
+
+
+def recipe_nutrition(user, natural_query):
+    """
+    Food log data when the query logs servings of one of the user's recipes
+
+    Returns:
+        dict or None: Data in the format_for_food_log shape
+    """
+    match = match_recipe(user, natural_query)
+    if match is None:
+        return None
+    return recipe_log_data(*match)
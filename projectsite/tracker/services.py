@@ -1,6 +1,17 @@
+import asyncio
+import httpx
 import requests
+from asgiref.sync import sync_to_async
 from django.conf import settings
 import logging
+from .cache import food_item_store, get_cache_settings, nutrition_cache, split_conjunctions, split_food_query
+from .http_client import (
+    RETRY_STATUS_CODES, get_async_client, get_breaker, get_http_settings, get_session,
+    get_timeout, retry_delay,
+)
+from .instrumentation import track_api_call
+from .local_foods import local_food_index
+from .singleflight import async_inflight_lookups, inflight_lookups, lookup_key, lookup_locks
 
 logger = logging.getLogger(__name__)
 
@@ -14,41 +25,224 @@ class CalorieNinjasService:
     
     def __init__(self):
         self.api_key = settings.CALORIENINJAS_API_KEY
+        self.base_url = getattr(settings, 'CALORIENINJAS_BASE_URL', None) or self.BASE_URL
         self.headers = {'X-Api-Key': self.api_key}
+        # Shared across instances: one keep-alive pool and breaker per process
+        self.session = get_session()
+        self.breaker = get_breaker()
     
-    def parse_food_query(self, query):
+    def parse_food_query(self, query, use_cache=True):
         """
         Parse natural language food query using CalorieNinjas API
         
+        The query is first split into per-food segments and matched against
+        the bundled local food table; when every segment matches, the answer
+        comes from memory with no database or network access. Otherwise
+        successful responses are cached on the normalized query, so repeated
+        phrases skip the network entirely. On a miss, segments matched
+        locally or already in the food item store are answered locally and
+        only the remainder is sent to the API. Concurrent misses for the same normalized query are
+        coalesced: one caller (per process, and per key across workers via
+        LookupLock) does the lookup and the rest get its result, marked
+        'coalesced'.
+        
         Args:
             query (str): Natural language query like "Last night we ordered a 14oz prime rib and mashed potatoes"
+            use_cache (bool): Read from and write to the lookup cache
         
         Returns:
             dict: Parsed nutrition information or error
         """
+        if not use_cache:
+            return self._request_nutrition(query)
+        
+        local = self._local_response(query)
+        if local is not None:
+            return local
+        
+        cached = self._cached_response(query)
+        if cached is not None:
+            return cached
+        
+        key = lookup_key(query)
+        if not key:
+            return self._lookup(query)
+        
+        # Concurrent misses for the same query share one lookup
+        result, shared = inflight_lookups.run(
+            key,
+            lambda: self._lookup_across_workers(query, key),
+            timeout=get_cache_settings()['LOCK_TTL_SECONDS'],
+        )
+        return dict(result, coalesced=True) if shared else result
+    
+    def _lookup(self, query):
+        """
+        Answer a cache miss from the food item store and the API
+        """
+        segments, known, remainder, remainder_query = self._plan_lookup(query)
+        api_items = []
+        if remainder_query is not None:
+            result = self._request_nutrition(remainder_query)
+            if not result.get('success'):
+                return result
+            api_items = result['items']
+        return self._finish_lookup(query, segments, known, remainder, api_items)
+    
+    def _lookup_across_workers(self, query, key):
+        """
+        Look up a query unless another worker already is, in which case
+        wait for it and read its result from the cache
+        """
+        owner = lookup_locks.acquire(key)
+        if owner is None:
+            lookup_locks.wait(key)
+            cached = self._cached_response(query)
+            if cached is not None:
+                return dict(cached, coalesced=True)
+            # The other worker failed or gave up; look it up ourselves
+        try:
+            return self._lookup(query)
+        finally:
+            if owner is not None:
+                lookup_locks.release(key, owner)
+    
+    def _local_response(self, query):
+        """
+        Answer from the local food table when it matches every segment,
+        or None
+        """
+        segments = split_food_query(query)
+        resolved = self._resolve_locally(segments)
+        if not segments or any(segment not in resolved for segment in segments):
+            return None
+        items = [item for segment in segments for item in resolved[segment]]
+        return {
+            'success': True,
+            'items': items,
+            'raw_response': {'items': items},
+            'local': True,
+        }
+    
+    @staticmethod
+    def _resolve_locally(segments):
+        """
+        Segments the local food table answers, as segment -> items
+        
+        A segment joined by and/with is answered piece by piece only when
+        every piece is a local food; otherwise it goes out whole, so a dish
+        like "mac and cheese" is never half answered.
+        """
+        resolved = {segment: [item] for segment, item in local_food_index.resolve_segments(segments).items()}
+        for segment in segments:
+            pieces = split_conjunctions(segment)
+            if segment in resolved or len(pieces) < 2:
+                continue
+            found = local_food_index.resolve_segments(pieces)
+            if all(piece in found for piece in pieces):
+                resolved[segment] = [found[piece] for piece in pieces]
+        return resolved
+    
+    def _cached_response(self, query):
+        """
+        Cached result for the whole query, or None on a miss
+        """
+        data = nutrition_cache.get(query)
+        if data is None:
+            return None
+        return {
+            'success': True,
+            'items': data.get('items', []),
+            'raw_response': data,
+            'cached': True,
+        }
+    
+    def _plan_lookup(self, query):
+        """
+        Split a query into segments and answer the known ones locally,
+        from the local food table first and then the food item store
+        
+        Returns:
+            tuple: (segments, known items (a list) by segment, unknown
+                    segments, query to send to the API or None if nothing
+                    is left)
+        """
+        segments = split_food_query(query)
+        known = self._resolve_locally(segments)
+        stored = food_item_store.lookup([segment for segment in segments if segment not in known])
+        known.update({segment: [item] for segment, item in stored.items()})
+        remainder = [segment for segment in segments if segment not in known]
+        
+        remainder_query = None
+        if remainder or not segments:
+            # Send the original wording when nothing is known so the API keeps its context
+            remainder_query = ', '.join(remainder) if known else query
+        return segments, known, remainder, remainder_query
+    
+    def _finish_lookup(self, query, segments, known, remainder, api_items):
+        """
+        Remember new API items, assemble the full answer and cache it
+        """
+        if api_items:
+            food_item_store.remember(remainder, api_items)
+        
+        # Assemble items in query order, known foods in place of their segment
+        # and the API's items where the first unknown segment was
+        items = []
+        placed = False
+        for segment in segments:
+            if segment in known:
+                items.extend(known[segment])
+            elif not placed:
+                items.extend(api_items)
+                placed = True
+        if not segments:
+            items = api_items
+        
+        data = {'items': items}
+        nutrition_cache.set(query, data)
+        return {
+            'success': True,
+            'items': items,
+            'raw_response': data,
+            'known_items': sum(len(known[segment]) for segment in segments if segment in known),
+        }
+    
+    @staticmethod
+    def cache_stats():
+        """
+        Hit, miss and eviction counters for the lookup caches in this process
+        """
+        stats = nutrition_cache.stats()
+        stats['food_items'] = food_item_store.stats()
+        stats['local_foods'] = local_food_index.stats()
+        stats['inflight'] = inflight_lookups.stats()
+        stats['async_inflight'] = async_inflight_lookups.stats()
+        return stats
+    
+    def _request_nutrition(self, query):
+        """
+        Call the CalorieNinjas nutrition endpoint without touching the cache
+        
+        Retries with jittered backoff on 429/5xx happen inside the pooled
+        session. While the circuit breaker is open the call fails fast.
+        """
+        if not self.breaker.allow_request():
+            return self._breaker_open_response()
+        
+        recorded = False
         try:
             params = {'query': query}
-            response = requests.get(
-                self.BASE_URL,
-                headers=self.headers,
-                params=params,
-                timeout=10
-            )
-            
-            if response.status_code == 200:
-                data = response.json()
-                return {
-                    'success': True,
-                    'items': data.get('items', []),
-                    'raw_response': data
-                }
-            else:
-                logger.error(f"CalorieNinjas API error: {response.status_code}")
-                return {
-                    'success': False,
-                    'error': f"API returned status code {response.status_code}",
-                    'message': response.text
-                }
+            with track_api_call():
+                response = self.session.get(
+                    self.base_url,
+                    headers=self.headers,
+                    params=params,
+                    timeout=get_timeout()
+                )
+            result = self._handle_response(response)
+            recorded = True
+            return result
                 
         except requests.exceptions.Timeout:
             logger.error("CalorieNinjas API timeout")
@@ -65,6 +259,58 @@ class CalorieNinjasService:
                 'error': 'API request failed',
                 'message': str(e)
             }
+        
+        except ValueError as e:
+            logger.error(f"CalorieNinjas API returned an invalid response: {str(e)}")
+            return {
+                'success': False,
+                'error': 'Invalid API response',
+                'message': 'The nutrition service returned an unexpected response.'
+            }
+        
+        finally:
+            # Every way out other than a handled response counts as a failure,
+            # including unexpected errors and cancellation, so a half-open
+            # trial never stays in flight
+            if not recorded:
+                self.breaker.record_failure()
+    
+    def _breaker_open_response(self):
+        logger.warning("CalorieNinjas circuit breaker open, skipping request")
+        return {
+            'success': False,
+            'error': 'API temporarily unavailable',
+            'message': 'Nutrition lookup is temporarily unavailable. Please try again in a moment.'
+        }
+    
+    def _handle_response(self, response):
+        """
+        Turn an HTTP response (requests or httpx) into a result dict and
+        update the circuit breaker. Invalid JSON, or JSON that is not an
+        object with a list of items, raises ValueError.
+        """
+        if response.status_code == 200:
+            data = response.json()
+            if not isinstance(data, dict) or not isinstance(data.get('items', []), list):
+                raise ValueError("expected a JSON object with a list of items")
+            self.breaker.record_success()
+            return {
+                'success': True,
+                'items': data.get('items', []),
+                'raw_response': data
+            }
+        
+        # Client errors (bad key, bad query) say nothing about upstream health
+        if response.status_code in RETRY_STATUS_CODES:
+            self.breaker.record_failure()
+        else:
+            self.breaker.record_success()
+        logger.error(f"CalorieNinjas API error: {response.status_code}")
+        return {
+            'success': False,
+            'error': f"API returned status code {response.status_code}",
+            'message': response.text
+        }
     
     def extract_food_items(self, api_response):
         """
@@ -174,4 +420,132 @@ class CalorieNinjasService:
             'calories': round(nutrition_totals['calories'], 1),
             'nutrition': nutrition_totals,  # Store aggregated nutrition
             'items': items  # Include for potential future use
-        }   
\ No newline at end of file
+        }   
+
+
+class AsyncCalorieNinjasService(CalorieNinjasService):
+    """
+    CalorieNinjasService for async views.
+    
+    The API call is awaited on the event loop's shared httpx client, so a
+    single ASGI worker can keep many lookups in flight. Cache and food item
+    store access still goes through the ORM and runs in sync_to_async.
+    Formatting helpers are inherited unchanged.
+    """
+    
+    def __init__(self):
+        self.api_key = settings.CALORIENINJAS_API_KEY
+        self.base_url = getattr(settings, 'CALORIENINJAS_BASE_URL', None) or self.BASE_URL
+        # httpx rejects None header values where requests silently drops them
+        self.headers = {'X-Api-Key': self.api_key} if self.api_key else {}
+        self.client = get_async_client()
+        self.breaker = get_breaker()
+    
+    async def parse_food_query(self, query, use_cache=True):
+        """
+        Async counterpart of CalorieNinjasService.parse_food_query
+        
+        Returns:
+            dict: Parsed nutrition information or error
+        """
+        if not use_cache:
+            return await self._request_nutrition(query)
+        
+        local = await sync_to_async(self._local_response)(query)
+        if local is not None:
+            return local
+        
+        cached = await sync_to_async(self._cached_response)(query)
+        if cached is not None:
+            return cached
+        
+        key = lookup_key(query)
+        if not key:
+            return await self._lookup(query)
+        
+        result, shared = await async_inflight_lookups.run(
+            key, lambda: self._lookup_across_workers(query, key)
+        )
+        return dict(result, coalesced=True) if shared else result
+    
+    async def _lookup(self, query):
+        segments, known, remainder, remainder_query = await sync_to_async(self._plan_lookup)(query)
+        api_items = []
+        if remainder_query is not None:
+            result = await self._request_nutrition(remainder_query)
+            if not result.get('success'):
+                return result
+            api_items = result['items']
+        return await sync_to_async(self._finish_lookup)(query, segments, known, remainder, api_items)
+    
+    async def _lookup_across_workers(self, query, key):
+        owner = await sync_to_async(lookup_locks.acquire)(key)
+        if owner is None:
+            await lookup_locks.async_wait(key)
+            cached = await sync_to_async(self._cached_response)(query)
+            if cached is not None:
+                return dict(cached, coalesced=True)
+        try:
+            return await self._lookup(query)
+        finally:
+            if owner is not None:
+                await sync_to_async(lookup_locks.release)(key, owner)
+    
+    async def _request_nutrition(self, query):
+        """
+        Call the CalorieNinjas nutrition endpoint without touching the cache
+        
+        429/5xx responses are retried with the same jittered backoff as the
+        sync session; the wait does not block the worker.
+        """
+        if not self.breaker.allow_request():
+            return self._breaker_open_response()
+        
+        config = get_http_settings()
+        recorded = False
+        try:
+            with track_api_call():
+                for retry_number in range(config['MAX_RETRIES'] + 1):
+                    if retry_number:
+                        await asyncio.sleep(retry_delay(retry_number, config))
+                    response = await self.client.get(
+                        self.base_url,
+                        headers=self.headers,
+                        params={'query': query},
+                    )
+                    if response.status_code not in RETRY_STATUS_CODES:
+                        break
+            result = self._handle_response(response)
+            recorded = True
+            return result
+        
+        except httpx.TimeoutException:
+            logger.error("CalorieNinjas API timeout")
+            return {
+                'success': False,
+                'error': 'API request timeout',
+                'message': 'The request took too long. Please try again.'
+            }
+        
+        except httpx.HTTPError as e:
+            logger.error(f"CalorieNinjas API request failed: {str(e)}")
+            return {
+                'success': False,
+                'error': 'API request failed',
+                'message': str(e)
+            }
+        
+        except ValueError as e:
+            logger.error(f"CalorieNinjas API returned an invalid response: {str(e)}")
+            return {
+                'success': False,
+                'error': 'Invalid API response',
+                'message': 'The nutrition service returned an unexpected response.'
+            }
+        
+        finally:
+            # Every way out other than a handled response counts as a failure,
+            # including unexpected errors and cancellation, so a half-open
+            # trial never stays in flight
+            if not recorded:
+                self.breaker.record_failure()
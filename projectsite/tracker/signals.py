@@ -0,0 +1,80 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .autocomplete import suggestion_index
+from .frequent import forget_log, record_log
+from .models import FoodLog
+from .page_cache import bump_page_version
+from .summaries import refresh_daily_summary
+
+
+@receiver(post_save, sender=FoodLog)
+def update_summary_on_save(sender, instance, raw=False, **kwargs):
+    """Keep DailyNutritionSummary in sync when a log is added or edited"""
+    if raw:
+        return
+
+    new_key = (instance.user_id, instance.date)
+    old_key = getattr(instance, '_loaded_summary_key', None)
+
+    refresh_daily_summary(*new_key)
+    # An edit moved the log to another day (or user): fix the day it left
+    if old_key and old_key != new_key:
+        refresh_daily_summary(*old_key)
+
+    instance._loaded_summary_key = new_key
+
+
+@receiver(post_save, sender=FoodLog)
+def update_suggestions_on_save(sender, instance, created=False, raw=False, **kwargs):
+    """Add new meals to the user's autocomplete index; rebuild it after edits"""
+    if raw:
+        return
+    if created:
+        suggestion_index.record(instance)
+    else:
+        suggestion_index.forget(instance.user_id)
+
+
+@receiver(post_save, sender=FoodLog)
+def update_frequent_foods_on_save(sender, instance, created=False, raw=False, **kwargs):
+    """Count a meal once its log is ready: when added, or when a pending lookup finishes"""
+    if raw or instance.status != FoodLog.STATUS_READY:
+        return
+    was_ready = not created and getattr(instance, '_loaded_status', None) == FoodLog.STATUS_READY
+    if not was_ready:
+        record_log(instance)
+    instance._loaded_status = instance.status
+
+
+@receiver(post_save, sender=FoodLog)
+def invalidate_pages_on_save(sender, instance, raw=False, **kwargs):
+    """Cached home and dashboard pages of the log's owner are out of date"""
+    if raw:
+        return
+    bump_page_version(instance.user_id)
+
+
+@receiver(post_delete, sender=FoodLog)
+def update_summary_on_delete(sender, instance, **kwargs):
+    """Keep DailyNutritionSummary in sync when a log is deleted"""
+    refresh_daily_summary(instance.user_id, instance.date)
+
+
+@receiver(post_delete, sender=FoodLog)
+def update_suggestions_on_delete(sender, instance, **kwargs):
+    """Deleted meals stop being suggested"""
+    suggestion_index.forget(instance.user_id)
+
+
+@receiver(post_delete, sender=FoodLog)
+def update_frequent_foods_on_delete(sender, instance, **kwargs):
+    """Deleted logs stop counting towards their meal"""
+    if instance.status == FoodLog.STATUS_READY:
+        forget_log(instance)
+
+
+@receiver(post_delete, sender=FoodLog)
+def invalidate_pages_on_delete(sender, instance, **kwargs):
+    """Deleted logs drop out of the owner's cached pages"""
+    bump_page_version(instance.user_id)
@@ -0,0 +1,251 @@
+import asyncio
+import logging
+import threading
+import time
+import uuid
+import weakref
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
+from django.db import DatabaseError, IntegrityError, transaction
+from django.utils import timezone
+
+from .cache import get_cache_settings, normalize_query, query_hash
+
+logger = logging.getLogger(__name__)
+
+
+def lookup_key(query):
+    """
+    Coalescing key for a query: the lookup cache key, so queries that share
+    a cache entry also share a lookup
+
+    Returns:
+        str: Hash of the normalized query, or '' if it normalizes to nothing
+    """
+    normalized = normalize_query(query)
+    return query_hash(normalized) if normalized else ''
+
+
+class _Call:
+    __slots__ = ('done', 'result', 'error')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Coalesce concurrent calls for the same key within one process.
+
+    The first caller for a key runs the function; callers arriving while it
+    runs block until it finishes and receive the same result (or exception).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self.leaders = 0
+        self.waiters = 0
+
+    def run(self, key, fn, timeout=None):
+        """
+        Run fn() once for all concurrent callers with the same key
+
+        Args:
+            key (str): Coalescing key
+            fn (callable): Work to do, called without arguments
+            timeout (float): Seconds a waiter blocks before running fn itself
+
+        Returns:
+            tuple: (fn's result, True if it came from another caller's call)
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            if call is None:
+                call = self._calls[key] = _Call()
+                self.leaders += 1
+                leader = True
+            else:
+                self.waiters += 1
+                leader = False
+
+        if not leader:
+            if not call.done.wait(timeout):
+                logger.warning(f"Gave up waiting for in-flight lookup {key[:12]}")
+                return fn(), False
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = fn()
+            return call.result, False
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
+
+    def stats(self):
+        with self._lock:
+            return {'leaders': self.leaders, 'waiters': self.waiters, 'in_flight': len(self._calls)}
+
+
+class AsyncSingleFlight:
+    """
+    SingleFlight for coroutines. Futures belong to one event loop, so each
+    loop (one per ASGI worker) coalesces its own calls.
+    """
+
+    def __init__(self):
+        self._calls = weakref.WeakKeyDictionary()
+        self.leaders = 0
+        self.waiters = 0
+
+    async def run(self, key, coro_fn):
+        """
+        Await coro_fn() once for all concurrent callers with the same key.
+        If the leader is cancelled, a waiter retries as the new leader.
+
+        Returns:
+            tuple: (result, True if it came from another caller's call)
+        """
+        loop = asyncio.get_running_loop()
+        calls = self._calls.setdefault(loop, {})
+        while key in calls:
+            future = calls[key]
+            self.waiters += 1
+            try:
+                # shield: a cancelled waiter must not cancel the leader's call
+                return await asyncio.shield(future), True
+            except asyncio.CancelledError:
+                if not future.cancelled():
+                    # This waiter was cancelled, not the leader
+                    raise
+
+        self.leaders += 1
+        future = calls[key] = loop.create_future()
+        try:
+            result = await coro_fn()
+        except Exception as e:
+            future.set_exception(e)
+            # Nobody may be waiting; don't log "exception was never retrieved"
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+            return result, False
+        finally:
+            if not future.done():
+                # Cancelled or interrupted: wake the waiters so one can lead
+                future.cancel()
+            if calls.get(key) is future:
+                del calls[key]
+
+    def stats(self):
+        return {'leaders': self.leaders, 'waiters': self.waiters}
+
+
+class LookupLockTable:
+    """
+    Cross-worker lookup claims stored in the LookupLock table.
+
+    A worker that wins acquire() makes the API call and must release() the
+    key afterwards. Locks expire after LOCK_TTL_SECONDS, so a crashed worker
+    only delays the others until the lock can be taken over.
+    """
+
+    def __init__(self, config=None):
+        self._config = config
+
+    @property
+    def config(self):
+        return self._config or get_cache_settings()
+
+    def acquire(self, key):
+        """
+        Try to claim a key
+
+        Returns:
+            str or None: Owner token to pass to release(), or None if another
+            worker holds the key
+        """
+        from .models import LookupLock
+
+        owner = uuid.uuid4().hex
+        try:
+            if self._create(key, owner):
+                return owner
+            # Take over a lock left behind by a dead worker
+            if LookupLock.objects.filter(key=key, expires_at__lte=timezone.now()).delete()[0]:
+                return owner if self._create(key, owner) else None
+        except DatabaseError as e:
+            # Without the table we simply don't coalesce across workers
+            logger.warning(f"Lookup lock acquire failed: {str(e)}")
+            return owner
+        return None
+
+    def _create(self, key, owner):
+        from .models import LookupLock
+
+        expires_at = timezone.now() + timedelta(seconds=self.config['LOCK_TTL_SECONDS'])
+        try:
+            with transaction.atomic():
+                LookupLock.objects.create(key=key, owner=owner, expires_at=expires_at)
+        except IntegrityError:
+            return False
+        return True
+
+    def release(self, key, owner):
+        from .models import LookupLock
+
+        try:
+            LookupLock.objects.filter(key=key, owner=owner).delete()
+        except DatabaseError as e:
+            logger.warning(f"Lookup lock release failed: {str(e)}")
+
+    def is_held(self, key):
+        from .models import LookupLock
+
+        try:
+            return LookupLock.objects.filter(key=key, expires_at__gt=timezone.now()).exists()
+        except DatabaseError:
+            return False
+
+    def wait(self, key):
+        """
+        Block until another worker releases a key or its lock expires
+
+        Returns:
+            bool: True if the key was released before the lock expired
+        """
+        config = self.config
+        deadline = time.monotonic() + config['LOCK_TTL_SECONDS']
+        while time.monotonic() < deadline:
+            time.sleep(config['LOCK_POLL_SECONDS'])
+            if not self.is_held(key):
+                return True
+        return False
+
+    async def async_wait(self, key):
+        """
+        wait() for async callers; polls without blocking the event loop
+        """
+        config = self.config
+        deadline = time.monotonic() + config['LOCK_TTL_SECONDS']
+        while time.monotonic() < deadline:
+            await asyncio.sleep(config['LOCK_POLL_SECONDS'])
+            if not await sync_to_async(self.is_held)(key):
+                return True
+        return False
+
+
+# Process-wide coalescing state shared by every CalorieNinjasService instance
+inflight_lookups = SingleFlight()
+async_inflight_lookups = AsyncSingleFlight()
+lookup_locks = LookupLockTable()
@@ -253,9 +253,12 @@ if (nutrientDistCtx && proteinDataEl && carbsDataEl && fatDataEl) {
     console.log('Fat Data:', fatData);
     
   
-    const todayProtein = proteinData.length > 0 ? proteinData[proteinData.length - 1].value : 0;
-    const todayCarbs = carbsData.length > 0 ? carbsData[carbsData.length - 1].value : 0;
-    const todayFat = fatData.length > 0 ? fatData[fatData.length - 1].value : 0;
+    // Prefer the selected day's totals; chart series may be weekly/monthly averages
+    const distributionEl = document.getElementById('distribution-data');
+    const distribution = distributionEl ? JSON.parse(distributionEl.textContent) : null;
+    const todayProtein = distribution ? distribution.protein : (proteinData.length > 0 ? proteinData[proteinData.length - 1].value : 0);
+    const todayCarbs = distribution ? distribution.carbs : (carbsData.length > 0 ? carbsData[carbsData.length - 1].value : 0);
+    const todayFat = distribution ? distribution.fat : (fatData.length > 0 ? fatData[fatData.length - 1].value : 0);
     
     console.log('Today Protein:', todayProtein);
     console.log('Today Carbs:', todayCarbs);
@@ -0,0 +1,89 @@
+// Trends page charts, drawn from the JSON the view embeds as #trends-data
+document.addEventListener('DOMContentLoaded', function() {
+
+const dataEl = document.getElementById('trends-data');
+if (!dataEl) {
+    return;
+}
+const trends = JSON.parse(dataEl.textContent);
+
+Chart.defaults.font.family = "'Inter', -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, sans-serif";
+
+const commonOptions = {
+    responsive: true,
+    maintainAspectRatio: true,
+    interaction: {
+        mode: 'index',
+        intersect: false,
+    },
+    // Long ranges have thousands of points; lines only
+    elements: {
+        point: {
+            radius: 0
+        }
+    },
+    spanGaps: true,
+    scales: {
+        x: {
+            ticks: {
+                maxTicksLimit: 12
+            }
+        },
+        y: {
+            beginAtZero: true
+        }
+    }
+};
+
+function line(label, data, color, extra) {
+    return Object.assign({
+        label: label,
+        data: data,
+        borderColor: color,
+        backgroundColor: 'transparent',
+        borderWidth: 2,
+        tension: 0.3,
+        fill: false
+    }, extra || {});
+}
+
+// 1. Calories: 7/30/90-day averages against the goal
+const caloriesCtx = document.getElementById('trendCaloriesChart');
+if (caloriesCtx) {
+    const calories = trends.series.calories;
+    new Chart(caloriesCtx, {
+        type: 'line',
+        data: {
+            labels: trends.dates,
+            datasets: [
+                line('7-day average', calories.avg_7, '#667eea'),
+                line('30-day average', calories.avg_30, '#f97316'),
+                line('90-day average', calories.avg_90, '#16a34a'),
+                line('Goal', new Array(trends.dates.length).fill(trends.goals.calories), '#f093fb', {
+                    borderDash: [10, 5],
+                    tension: 0
+                })
+            ]
+        },
+        options: commonOptions
+    });
+}
+
+// 2. Macros: 7-day averages
+const macrosCtx = document.getElementById('trendMacrosChart');
+if (macrosCtx) {
+    new Chart(macrosCtx, {
+        type: 'line',
+        data: {
+            labels: trends.dates,
+            datasets: [
+                line('Protein (g)', trends.series.protein.avg_7, '#16a34a'),
+                line('Carbs (g)', trends.series.carbs.avg_7, '#d97706'),
+                line('Fat (g)', trends.series.fat.avg_7, '#dc2626')
+            ]
+        },
+        options: commonOptions
+    });
+}
+
+});
@@ -0,0 +1,176 @@
+import json
+import logging
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from .testing import fake_nutrition_items
+
+logger = logging.getLogger(__name__)
+
+LATENCY_DISTRIBUTIONS = ('fixed', 'uniform', 'exponential', 'lognormal')
+
+
+class FaultProfile:
+    """
+    What the stub does to each request: how long it waits before answering
+    and how often it answers with a 429, a 5xx or not at all.
+
+    Latency distributions (all in milliseconds, never negative):
+        fixed:       always `latency_ms`
+        uniform:     between latency_ms - jitter_ms and latency_ms + jitter_ms
+        exponential: mean `latency_ms`
+        lognormal:   median `latency_ms`, spread `jitter_ms` (a long right tail)
+    """
+
+    def __init__(self, latency_ms=0, jitter_ms=0, distribution='fixed',
+                 rate_429=0.0, rate_5xx=0.0, rate_timeout=0.0,
+                 timeout_seconds=30, seed=None):
+        if distribution not in LATENCY_DISTRIBUTIONS:
+            raise ValueError(f"Unknown latency distribution: {distribution}")
+        if rate_429 + rate_5xx + rate_timeout > 1:
+            raise ValueError("Fault rates must add up to at most 1")
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.distribution = distribution
+        self.rate_429 = rate_429
+        self.rate_5xx = rate_5xx
+        self.rate_timeout = rate_timeout
+        self.timeout_seconds = timeout_seconds
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def latency(self):
+        """
+        Sampled response delay in seconds
+        """
+        with self._lock:
+            if self.distribution == 'uniform':
+                value = self._rng.uniform(self.latency_ms - self.jitter_ms, self.latency_ms + self.jitter_ms)
+            elif self.distribution == 'exponential':
+                value = self._rng.expovariate(1 / self.latency_ms) if self.latency_ms else 0
+            elif self.distribution == 'lognormal':
+                spread = self.jitter_ms / self.latency_ms if self.latency_ms else 0
+                value = self.latency_ms * self._rng.lognormvariate(0, spread)
+            else:
+                value = self.latency_ms
+        return max(value, 0) / 1000
+
+    def outcome(self):
+        """
+        'ok', '429', '5xx' or 'timeout' for the next request
+        """
+        with self._lock:
+            roll = self._rng.random()
+        if roll < self.rate_429:
+            return '429'
+        if roll < self.rate_429 + self.rate_5xx:
+            return '5xx'
+        if roll < self.rate_429 + self.rate_5xx + self.rate_timeout:
+            return 'timeout'
+        return 'ok'
+
+
+class StubStats:
+    """
+    Thread-safe response counters, served at /stats
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counts = {'ok': 0, '429': 0, '5xx': 0, 'timeout': 0, 'unauthorized': 0}
+
+    def record(self, outcome):
+        with self._lock:
+            self.counts[outcome] = self.counts.get(outcome, 0) + 1
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self.counts)
+
+    def reset(self):
+        with self._lock:
+            for key in self.counts:
+                self.counts[key] = 0
+
+
+class CalorieNinjasStubHandler(BaseHTTPRequestHandler):
+    """
+    Serves GET /v1/nutrition?query=... like CalorieNinjas, answering from
+    the fixture corpus in tracker/data. GET /stats returns the response
+    counters and DELETE /stats resets them.
+    """
+
+    server_version = 'CalorieNinjasStub/1.0'
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path == '/stats':
+            return self._send_json(200, self.server.stats.snapshot())
+        if url.path.rstrip('/') != '/v1/nutrition':
+            return self._send_json(404, {'error': 'Not found'})
+
+        if self.server.api_key and self.headers.get('X-Api-Key') != self.server.api_key:
+            self.server.stats.record('unauthorized')
+            return self._send_json(401, {'error': 'Invalid API Key.'})
+
+        profile = self.server.profile
+        outcome = profile.outcome()
+        time.sleep(profile.latency())
+        self.server.stats.record(outcome)
+
+        if outcome == 'timeout':
+            # Hold the connection open past any sane client read timeout, then drop it
+            time.sleep(profile.timeout_seconds)
+            self.close_connection = True
+            return None
+        if outcome == '429':
+            return self._send_json(429, {'error': 'Too many requests'}, {'Retry-After': '1'})
+        if outcome == '5xx':
+            return self._send_json(503, {'error': 'Service unavailable'})
+
+        query = parse_qs(url.query).get('query', [''])[0]
+        return self._send_json(200, {'items': fake_nutrition_items(query)})
+
+    def do_DELETE(self):
+        if urlparse(self.path).path == '/stats':
+            self.server.stats.reset()
+            return self._send_json(200, {'reset': True})
+        return self._send_json(404, {'error': 'Not found'})
+
+    def _send_json(self, status, payload, headers=None):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        logger.debug(f"{self.address_string()} {format % args}")
+
+
+def make_stub_server(host='127.0.0.1', port=8001, profile=None, api_key=None):
+    """
+    Build (but do not start) a threaded CalorieNinjas stub server
+
+    Args:
+        host (str): Interface to bind
+        port (int): Port to bind, 0 for any free port
+        profile (FaultProfile): Latency and fault injection, none by default
+        api_key (str): Require this X-Api-Key header when set
+
+    Returns:
+        ThreadingHTTPServer: Call serve_forever() to run it
+    """
+    server = ThreadingHTTPServer((host, port), CalorieNinjasStubHandler)
+    server.daemon_threads = True
+    server.profile = profile or FaultProfile()
+    server.stats = StubStats()
+    server.api_key = api_key
+    return server
@@ -0,0 +1,231 @@
+from datetime import date, datetime, timedelta
+
+from django.db import transaction
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncMonth, TruncWeek
+
+from .models import DailyNutritionSummary, FoodLog
+
+CHART_FIELDS = ['calories', 'protein', 'carbs', 'fat']
+
+# Preset dashboard ranges in days
+CHART_RANGES = [7, 30, 90, 365]
+MAX_CHART_DAYS = 366 * 5
+
+BUCKET_TRUNC = {
+    'week': TruncWeek,
+    'month': TruncMonth,
+}
+
+# Home page meal sections, in display order: meal_type -> (title, icon, badge class)
+MEAL_SECTIONS = {
+    'breakfast': ('Breakfast', '🌅', 'bg-warning'),
+    'lunch': ('Lunch', '☀️', 'bg-info'),
+    'dinner': ('Dinner', '🌙', 'bg-success'),
+    'snack': ('Snacks', '🍎', 'bg-secondary'),
+}
+
+
+def refresh_daily_summary(user_id, day):
+    """
+    Recompute the summary row for one user and day with a single aggregate
+    query. The row is removed when the day has no logs left.
+    """
+    if user_id is None or day is None:
+        return None
+
+    totals = FoodLog.objects.filter(user_id=user_id, date=day).nutrition_totals()
+
+    if not totals['log_count']:
+        DailyNutritionSummary.objects.filter(user_id=user_id, date=day).delete()
+        return None
+
+    summary, _ = DailyNutritionSummary.objects.update_or_create(
+        user_id=user_id,
+        date=day,
+        defaults=totals,
+    )
+    return summary
+
+
+def group_logs_by_meal(logs):
+    """
+    Bucket one day's logs by meal and total them in a single pass, so the
+    home page needs only the query that fetched the logs
+
+    Returns:
+        dict: meals (sections in MEAL_SECTIONS order, each with its logs and
+              count), meal_counts, nutrition_totals (keyed like
+              DailyNutritionSummary.as_nutrition_dict) and log_count
+    """
+    meals = {
+        meal_type: {'meal_type': meal_type, 'title': title, 'icon': icon, 'badge': badge, 'logs': []}
+        for meal_type, (title, icon, badge) in MEAL_SECTIONS.items()
+    }
+    totals = dict.fromkeys(FoodLog.SUMMARY_COLUMNS, 0.0)
+
+    for log in logs:
+        # Unknown meal types (legacy rows) still show up, with the snacks,
+        # as FoodLog.summary_aggregates counts them
+        meals.get(log.meal_type, meals['snack'])['logs'].append(log)
+        for field, column in FoodLog.SUMMARY_COLUMNS.items():
+            totals[field] += getattr(log, column) or 0
+
+    for meal in meals.values():
+        meal['count'] = len(meal['logs'])
+
+    return {
+        'meals': [meal for meal in meals.values() if meal['logs']],
+        'meal_counts': {meal_type: meal['count'] for meal_type, meal in meals.items()},
+        'nutrition_totals': totals,
+        'log_count': sum(meal['count'] for meal in meals.values()),
+    }
+
+
+def rebuild_daily_summaries(user=None, batch_size=2000):
+    """
+    Rebuild summary rows from scratch, for one user or everyone, from one
+    GROUP BY (user, date) query
+
+    Returns:
+        int: Number of summary rows written
+    """
+    logs = FoodLog.objects.filter(user__isnull=False)
+    summaries = DailyNutritionSummary.objects.all()
+    if user is not None:
+        logs = logs.filter(user=user)
+        summaries = summaries.filter(user=user)
+
+    grouped = logs.order_by().values('user_id', 'date').annotate(
+        **FoodLog.summary_aggregates()
+    )
+    rows = [DailyNutritionSummary(**totals) for totals in grouped.iterator(chunk_size=batch_size)]
+
+    with transaction.atomic():
+        summaries.delete()
+        DailyNutritionSummary.objects.bulk_create(rows, batch_size=batch_size)
+    return len(rows)
+
+
+def get_daily_summary(user, day):
+    """
+    Summary for one day, or an unsaved all-zero summary if nothing was logged
+    """
+    summary = DailyNutritionSummary.objects.filter(user=user, date=day).first()
+    return summary or DailyNutritionSummary(user=user, date=day)
+
+
+def parse_chart_range(params, today):
+    """
+    Read the dashboard chart range from query parameters
+
+    ?range=7|30|90|365 charts that many days ending today;
+    ?range=custom&start=YYYY-MM-DD&end=YYYY-MM-DD charts an explicit span.
+
+    Returns:
+        tuple: (start_date, end_date, range_value)
+    """
+    range_param = params.get('range', '7')
+    if range_param == 'custom':
+        try:
+            start = datetime.strptime(params.get('start', ''), '%Y-%m-%d').date()
+            end = datetime.strptime(params.get('end', ''), '%Y-%m-%d').date()
+        except ValueError:
+            start = end = None
+        if start and end:
+            end = min(end, today)
+            start = max(min(start, end), end - timedelta(days=MAX_CHART_DAYS - 1))
+            return start, end, 'custom'
+        range_param = '7'
+
+    days = int(range_param) if range_param.isdigit() and int(range_param) in CHART_RANGES else 7
+    return today - timedelta(days=days - 1), today, str(days)
+
+
+def choose_bucket(start_date, end_date):
+    """
+    Pick a bucket size that keeps a chart to roughly 60 points or fewer
+    """
+    days = (end_date - start_date).days + 1
+    if days <= 31:
+        return 'day'
+    if days <= 200:
+        return 'week'
+    return 'month'
+
+
+def _bucket_start(day, bucket):
+    if bucket == 'week':
+        return day - timedelta(days=day.weekday())
+    if bucket == 'month':
+        return day.replace(day=1)
+    return day
+
+
+def _next_bucket(start, bucket):
+    if bucket == 'week':
+        return start + timedelta(days=7)
+    if bucket == 'month':
+        return date(start.year + start.month // 12, start.month % 12 + 1, 1)
+    return start + timedelta(days=1)
+
+
+def _bucket_label(start, bucket):
+    if bucket == 'week':
+        return start.strftime('Wk %m/%d')
+    if bucket == 'month':
+        return start.strftime('%b %Y')
+    return start.strftime('%m/%d')
+
+
+def build_nutrition_series(user, start_date, end_date, bucket=None):
+    """
+    Gap-filled chart series for a date range from one query over the
+    daily rollup. Long ranges are downsampled into weekly or monthly
+    buckets holding the average per day, so values stay comparable to
+    the daily goal.
+
+    Args:
+        user: User whose data to chart
+        start_date (date): First day of the range (inclusive)
+        end_date (date): Last day of the range (inclusive)
+        bucket (str): 'day', 'week' or 'month'; picked from the span if None
+
+    Returns:
+        dict: {'bucket': str, 'points': [{'date', 'start', 'calories', 'protein', 'carbs', 'fat', 'days_logged'}]}
+    """
+    bucket = bucket or choose_bucket(start_date, end_date)
+    summaries = DailyNutritionSummary.objects.filter(
+        user=user, date__gte=start_date, date__lte=end_date
+    ).order_by()
+
+    if bucket == 'day':
+        rows = summaries.values('date', *CHART_FIELDS)
+        totals = {row['date']: dict(row, days_logged=1) for row in rows}
+    else:
+        rows = summaries.annotate(
+            bucket=BUCKET_TRUNC[bucket]('date')
+        ).values('bucket').annotate(
+            days_logged=Count('id'),
+            **{field: Sum(field) for field in CHART_FIELDS}
+        )
+        totals = {row['bucket']: row for row in rows}
+
+    points = []
+    start = _bucket_start(start_date, bucket)
+    while start <= end_date:
+        following = _next_bucket(start, bucket)
+        # Partial buckets at either end only average over days inside the range
+        days_in_range = (min(following, end_date + timedelta(days=1)) - max(start, start_date)).days
+        row = totals.get(start, {})
+        point = {
+            'date': _bucket_label(start, bucket),
+            'start': start.isoformat(),
+            'days_logged': row.get('days_logged', 0),
+        }
+        for field in CHART_FIELDS:
+            point[field] = round((row.get(field) or 0) / days_in_range, 1)
+        points.append(point)
+        start = following
+
+    return {'bucket': bucket, 'points': points}
@@ -0,0 +1,219 @@
+"""
+Helpers for exercising the tracker without the real CalorieNinjas API.
+
+Used by the test suite and by the benchmark and load-test tooling. Nothing
+here is imported by the running site.
+"""
+import json
+import random
+import re
+from datetime import timedelta
+from functools import lru_cache
+from pathlib import Path
+from unittest import mock
+
+from django.utils import timezone
+
+from .autocomplete import suggestion_index
+from .cache import food_item_store, nutrition_cache
+from .frequent import rebuild_frequent_foods
+from .local_foods import local_food_index
+from .models import FoodLog
+from .page_cache import bump_page_version
+from .services import AsyncCalorieNinjasService, CalorieNinjasService
+from .summaries import rebuild_daily_summaries
+
+CORPUS_PATH = Path(__file__).resolve().parent / 'data' / 'calorieninjas_corpus.json'
+
+_QUANTITY_RE = re.compile(r'(\d+(?:\.\d+)?)\s*(g|grams?|oz|ounces?)?\s*$')
+
+GRAMS_PER_OUNCE = 28.35
+
+
+@lru_cache(maxsize=1)
+def load_corpus():
+    """
+    Raw CalorieNinjas items, one per food, each for a 100g serving
+
+    Returns:
+        dict: Food name -> item
+    """
+    with open(CORPUS_PATH, encoding='utf-8') as f:
+        items = json.load(f)['items']
+    return {item['name']: item for item in items}
+
+
+def _scale_item(item, grams):
+    factor = grams / (item['serving_size_g'] or 100)
+    scaled = {'name': item['name'], 'serving_size_g': round(grams, 1)}
+    for key, value in item.items():
+        if key not in scaled:
+            scaled[key] = round(value * factor, 1)
+    return scaled
+
+
+def fake_nutrition_items(query):
+    """
+    Build the `items` CalorieNinjas would return for a query.
+
+    Every corpus food named in the query becomes one item, longest names
+    first so "fried rice" wins over "rice". A number right before the food
+    is a count of 100g servings, or a weight when followed by g or oz.
+    """
+    text = ' '.join((query or '').lower().split())
+    items = []
+    for name in sorted(load_corpus(), key=len, reverse=True):
+        match = re.search(r'\b' + re.escape(name) + r'(?:e?s)?\b', text)
+        if not match:
+            continue
+
+        grams = 100.0
+        quantity = _QUANTITY_RE.search(text[:match.start()])
+        if quantity:
+            amount = float(quantity.group(1))
+            unit = quantity.group(2) or ''
+            if unit.startswith('o'):
+                grams = amount * GRAMS_PER_OUNCE
+            elif unit.startswith('g'):
+                grams = amount
+            else:
+                grams = amount * 100
+
+        items.append((match.start(), _scale_item(load_corpus()[name], grams)))
+        # Blank the match out so "rice" does not match again inside "fried rice"
+        text = text[:match.start()] + ' ' * (match.end() - match.start()) + text[match.end():]
+
+    return [item for _, item in sorted(items, key=lambda pair: pair[0])]
+
+
+class FakeCalorieNinjas:
+    """
+    Stand-in for the CalorieNinjas HTTP call.
+
+    Patches CalorieNinjasService._request_nutrition (and its async
+    counterpart), so the lookup caches and food item store still run for
+    real. Every query that would have gone over the network is recorded in
+    `queries`.
+
+    Usage:
+        with FakeCalorieNinjas() as api:
+            client.post(...)
+        assert api.queries == [...]
+    """
+
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.queries = []
+
+        async def async_request(service, query):
+            return self._request(service, query)
+
+        self._patchers = [
+            mock.patch.object(
+                CalorieNinjasService, '_request_nutrition', autospec=True, side_effect=self._request
+            ),
+            mock.patch.object(AsyncCalorieNinjasService, '_request_nutrition', async_request),
+        ]
+
+    def _request(self, service, query):
+        self.queries.append(query)
+        if self.fail:
+            return {
+                'success': False,
+                'error': 'API returned status code 503',
+                'message': 'Service Unavailable',
+            }
+        data = {'items': fake_nutrition_items(query)}
+        return {'success': True, 'items': data['items'], 'raw_response': data}
+
+    @property
+    def calls(self):
+        return len(self.queries)
+
+    def start(self):
+        reset_lookup_caches()
+        for patcher in self._patchers:
+            patcher.start()
+        return self
+
+    def stop(self):
+        for patcher in self._patchers:
+            patcher.stop()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+def reset_lookup_caches():
+    """
+    Drop the in-process lookup cache, local food index and autocomplete
+    indexes so one test cannot warm the next
+    """
+    nutrition_cache.memory.clear()
+    local_food_index.clear()
+    suggestion_index.clear()
+    food_item_store.hits = 0
+    food_item_store.misses = 0
+
+
+# Typical meals, as users type them
+MEAL_QUERIES = {
+    'breakfast': ['2 eggs and toast', 'oatmeal with banana', 'yogurt and apple', 'bacon, eggs and coffee'],
+    'lunch': ['chicken adobo and rice', 'pancit', 'tuna sandwich', 'hamburger and french fries'],
+    'dinner': ['14oz prime rib and mashed potatoes', 'salmon and salad', 'sinigang with rice', 'pasta'],
+    'snack': ['apple', 'banana', 'yogurt', 'orange juice'],
+}
+
+
+def seed_food_history(user, days=90, logs_per_day=4, end_date=None, seed=0):
+    """
+    Bulk-create a realistic food log history for one user and rebuild
+    their daily summaries and frequent foods.
+
+    Args:
+        user: Owner of the logs
+        days (int): Number of days ending at end_date (today by default)
+        logs_per_day (int): Logs per day, cycling through the meal types
+        end_date (date): Last day of the history
+        seed (int): Random seed, so histories are reproducible
+
+    Returns:
+        int: Number of logs created
+    """
+    rng = random.Random(seed)
+    service = CalorieNinjasService()
+    end_date = end_date or timezone.now().date()
+    meal_types = [choice for choice, _ in FoodLog.MEAL_TYPE_CHOICES]
+
+    logs = []
+    for offset in range(days):
+        day = end_date - timedelta(days=offset)
+        for index in range(logs_per_day):
+            meal_type = meal_types[index % len(meal_types)]
+            query = rng.choice(MEAL_QUERIES[meal_type])
+            items = fake_nutrition_items(query)
+            formatted = service.format_for_food_log(
+                query, {'success': True, 'items': items, 'raw_response': {'items': items}}
+            )
+            log = FoodLog(
+                user=user,
+                food_name=formatted['food_name'],
+                description=formatted['description'],
+                calories=formatted['calories'],
+                nutrition_data=formatted.get('nutrition', {}),
+                natural_query=query,
+                meal_type=meal_type,
+                date=day,
+            )
+            # bulk_create skips save(), which normally fills these columns
+            log.sync_nutrition_columns()
+            logs.append(log)
+
+    FoodLog.objects.bulk_create(logs, batch_size=1000)
+    rebuild_daily_summaries(user)
+    rebuild_frequent_foods(user)
+    bump_page_version(user.pk)
+    return len(logs)
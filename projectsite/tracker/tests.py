@@ -1,3 +1,2080 @@
-from django.test import TestCase
+import asyncio
+import csv
+import difflib
+import gzip
+import io
+import json
+import re
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from datetime import date, timedelta
+from importlib import import_module
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+import requests
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.apps import apps as django_apps
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.contrib.messages.storage.fallback import FallbackStorage
+from django.contrib.sessions.backends.db import SessionStore
+from django.core.cache import caches
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.db.backends.utils import CursorWrapper
+from django.http import HttpResponse
+from django.test import AsyncRequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from . import urls as tracker_urls
+from . import views
+from .benchmark import build_scenarios, percentile, run_benchmark
+from .cache import (
+    DEFAULT_CACHE_SETTINGS, FoodItemStore, LRUCache, NutritionQueryCache, normalize_query, nutrition_cache,
+    split_conjunctions, split_food_query,
+)
+from .enrichment import DEFAULT_ENRICHMENT_SETTINGS, claim_jobs, enqueue, process_job, run_worker
+from .exports import iter_export
+from .imports import RateLimiter, enrich_logs, run_import, run_import_worker
+from .autocomplete import PrefixIndex, suggestion_index
+from .frequent import rebuild_frequent_foods, relog_choices
+from .local_foods import load_local_foods, local_food_index, parse_quantity
+from .middleware import RequestTimingMiddleware
+from .page_cache import build_home_context, bump_all_page_versions, bump_page_version
+from .recipes import (
+    IngredientLookupError, add_ingredient, create_recipe, match_recipe, rebuild_recipe, remove_ingredient,
+    set_servings, update_ingredient,
+)
+from .instrumentation import DEFAULT_QUERY_BUDGET, QUERY_BUDGETS, query_budget
+from .http_client import CircuitBreaker, build_session, get_breaker
+from .models import (
+    DailyNutritionSummary, EnrichmentJob, FoodItemAlias, FoodLog, FrequentFood, ImportJob, LocalFood,
+    LookupLock, NutritionLookupCache, Recipe, RecipeIngredient,
+)
+from .services import AsyncCalorieNinjasService, CalorieNinjasService
+from .singleflight import AsyncSingleFlight, SingleFlight, lookup_key
+from .stub_server import FaultProfile, make_stub_server
+from .testing import FakeCalorieNinjas, fake_nutrition_items, reset_lookup_caches, seed_food_history
+from .summaries import MAX_CHART_DAYS, build_nutrition_series, choose_bucket, parse_chart_range, rebuild_daily_summaries
+from .trends import build_trends, get_trend_goals
+from .utils import (
+    calculate_statistics, calculate_weekly_summary, get_meal_type_distribution, log_statistics, prepare_chart_data,
+)
+
+HISTORY_DAYS = 120
+LOGS_PER_DAY = 4
+
+
+@contextmanager
+def count_rows():
+    """
+    Count rows fetched from the database inside the block
+    """
+    counter = {'rows': 0}
+
+    def fetchone(self):
+        row = self.cursor.fetchone()
+        if row is not None:
+            counter['rows'] += 1
+        return row
+
+    def fetchmany(self, *args, **kwargs):
+        rows = self.cursor.fetchmany(*args, **kwargs)
+        counter['rows'] += len(rows)
+        return rows
+
+    def fetchall(self):
+        rows = self.cursor.fetchall()
+        counter['rows'] += len(rows)
+        return rows
+
+    with mock.patch.object(CursorWrapper, 'fetchone', fetchone, create=True), \
+            mock.patch.object(CursorWrapper, 'fetchmany', fetchmany, create=True), \
+            mock.patch.object(CursorWrapper, 'fetchall', fetchall, create=True):
+        yield counter
+
+
+def _normalize_sql(sql):
+    # Ids, dates and timestamps differ between users; the query shape should not
+    sql = re.sub(r"'[^']*'", "'?'", sql)
+    sql = re.sub(r'"s\d+_x\d+"', '"savepoint"', sql)
+    return re.sub(r'\b\d+(?:\.\d+)?(?:e[+-]?\d+)?\b', '?', sql)
+
+
+def _format_queries(queries):
+    return '\n'.join(f"  {i}. {query['sql']}" for i, query in enumerate(queries, 1))
+
+
+class LookupCacheTests(TestCase):
+    def test_lru_evicts_least_recently_used(self):
+        cache = LRUCache(max_entries=2, ttl_seconds=60)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        self.assertEqual(cache.get('a'), 1)
+        cache.set('c', 3)
+
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual((cache.get('a'), cache.get('c')), (1, 3))
+        self.assertEqual(cache.stats()['evictions'], 1)
+
+    def test_lru_entries_expire(self):
+        cache = LRUCache(max_entries=10, ttl_seconds=30)
+        with mock.patch('tracker.cache.time.monotonic', return_value=1000):
+            cache.set('a', 1)
+            cache.set('b', 2, ttl_seconds=120)
+        with mock.patch('tracker.cache.time.monotonic', return_value=1031):
+            self.assertIsNone(cache.get('a'))
+            self.assertEqual(cache.get('b'), 2)
+        self.assertEqual(cache.stats()['expirations'], 1)
+        self.assertEqual(len(cache), 1)
+
+    def test_normalized_phrasings_share_an_entry(self):
+        self.assertEqual(normalize_query('2 Eggs & Toast!'), '2 eggs and toast')
+        self.assertEqual(normalize_query('2.0 eggs  and toast'), '2 eggs and toast')
+        self.assertEqual(normalize_query('14oz steak'), '14 oz steak')
+        self.assertEqual(normalize_query('1/2 cup rice'), '0.5 cup rice')
+
+    def test_database_tier_survives_a_cold_process(self):
+        cache = NutritionQueryCache(dict(DEFAULT_CACHE_SETTINGS, MEMORY_MAX_ENTRIES=4))
+        data = {'items': [{'name': 'egg', 'calories': 78}]}
+        cache.set('2 Eggs', data)
+
+        cache.memory.clear()
+        with self.assertNumQueries(2):
+            self.assertEqual(cache.get('2 eggs!'), data)
+        # Refilled the memory tier
+        with self.assertNumQueries(0):
+            self.assertEqual(cache.get('2 eggs'), data)
+
+        entry = NutritionLookupCache.objects.get()
+        self.assertEqual((entry.normalized_query, entry.hit_count), ('2 eggs', 1))
+        self.assertEqual(cache.stats()['database']['hits'], 1)
+
+    def test_database_tier_expires_and_evicts(self):
+        cache = NutritionQueryCache(dict(DEFAULT_CACHE_SETTINGS, DB_MAX_ENTRIES=2, DB_EVICTION_INTERVAL=1000))
+        for query in ('apple', 'banana', 'milk'):
+            cache.set(query, {'items': [{'name': query}]})
+        NutritionLookupCache.objects.filter(normalized_query='milk').update(
+            expires_at=timezone.now() - timedelta(seconds=1)
+        )
+        NutritionLookupCache.objects.filter(normalized_query='apple').update(
+            last_accessed_at=timezone.now() - timedelta(days=1)
+        )
+
+        cache.memory.clear()
+        self.assertIsNone(cache.get('milk'))
+        self.assertEqual(cache.evict(), 1)
+        self.assertEqual(cache.evict(), 0)
+        cache.set('bread', {'items': [{'name': 'bread'}]})
+        self.assertEqual(cache.evict(), 1)
+        self.assertEqual(
+            set(NutritionLookupCache.objects.values_list('normalized_query', flat=True)),
+            {'banana', 'bread'},
+        )
+
+
+class FoodSegmentTests(TestCase):
+    def setUp(self):
+        self.api = FakeCalorieNinjas().start()
+        self.addCleanup(self.api.stop)
+        load_local_foods()
+
+    def test_split_food_query(self):
+        cases = {
+            'Last night we ordered a 14oz prime rib; mashed potatoes': ['a 14 oz prime rib', 'mashed potatoes'],
+            'breakfast burrito': ['breakfast burrito'],
+            'lunch meat sandwich': ['lunch meat sandwich'],
+            'for lunch I had 2 eggs': ['2 eggs'],
+            'mac and cheese': ['mac and cheese'],
+            '1,5 kg rice': ['1.5 kg rice'],
+            '1,000 g rice, coffee': ['1000 g rice', 'coffee'],
+            '1 banana, 1 banana': ['1 banana', '1 banana'],
+            'eggs + toast': ['eggs plus toast'],
+            'snack': ['snack'],
+        }
+        for query, segments in cases.items():
+            with self.subTest(query=query):
+                self.assertEqual(split_food_query(query), segments)
+        self.assertEqual(split_conjunctions('2 eggs and then a toast'), ['2 eggs', 'a toast'])
+
+    def test_items_are_attributed_to_whole_segments_or_api_split_pieces(self):
+        store = FoodItemStore()
+        egg, toast = {'name': 'egg'}, {'name': 'toast'}
+        self.assertEqual(store._attribute(['mac and cheese'], [{'name': 'mac and cheese'}]), {'mac and cheese': 0})
+        self.assertEqual(store._attribute(['2 eggs and toast'], [egg, toast]), {'2 eggs': 0, 'toast': 1})
+        self.assertEqual(store._attribute(['2 eggs', 'toast'], [egg, toast]), {'2 eggs': 0, 'toast': 1})
+        # One item for two segments: neither can be pinned down
+        self.assertEqual(store._attribute(['soup', 'bread'], [{'name': 'stew'}]), {})
+
+    def test_dishes_go_to_the_api_whole(self):
+        service = CalorieNinjasService()
+        service.parse_food_query('mac and cheese')
+        service.parse_food_query('14oz prime rib and mashed potatoes')
+        self.assertEqual(self.api.queries, ['mac and cheese', '14oz prime rib and mashed potatoes'])
+
+    def test_api_splits_are_remembered_per_food(self):
+        service = CalorieNinjasService()
+        result = service.parse_food_query('pasta and soup')
+        self.assertEqual([item['name'] for item in result['items']], ['pasta', 'soup'])
+
+        result = service.parse_food_query('soup, pasta')
+        self.assertEqual(self.api.queries, ['pasta and soup'])
+        self.assertEqual(result['known_items'], 2)
+        self.assertEqual(FoodItemAlias.objects.get(phrase='soup').item.name, 'soup')
+        self.assertFalse(FoodItemAlias.objects.filter(phrase='pasta and soup').exists())
+
+    def test_repeated_foods_are_counted_each_time(self):
+        result = CalorieNinjasService().parse_food_query('1 banana, 1 banana')
+        self.assertEqual([item['name'] for item in result['items']], ['banana', 'banana'])
+
+        result = CalorieNinjasService().parse_food_query('sandwich, banana, sandwich')
+        self.assertEqual(result['known_items'], 1)
+        self.assertEqual(self.api.queries, ['sandwich, sandwich'])
+
+
+class FoodItemStoreTests(TestCase):
+    def setUp(self):
+        nutrition_cache.clear()
+        self.queries = []
+        patcher = mock.patch.object(
+            CalorieNinjasService, '_request_nutrition', autospec=True, side_effect=self._request
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _request(self, service, query):
+        self.queries.append(query)
+        names = sorted((name for name in ('prime rib', 'sandwich', 'soup', 'stew') if name in query), key=query.index)
+        return {'success': True, 'items': [{'name': name, 'calories': 100.0} for name in names]}
+
+    def test_split_food_query(self):
+        cases = {
+            'Last night we ordered a 14oz prime rib; mashed potatoes': ['a 14 oz prime rib', 'mashed potatoes'],
+            'for lunch I had 2 eggs': ['2 eggs'],
+            'Soup, sandwich\nstew': ['soup', 'sandwich', 'stew'],
+        }
+        for query, segments in cases.items():
+            with self.subTest(query=query):
+                self.assertEqual(split_food_query(query), segments)
+
+    def test_items_are_attributed_by_name(self):
+        store = FoodItemStore()
+        self.assertEqual(store._attribute(['2 eggs'], [{'name': 'large egg'}]), {'2 eggs': 0})
+        self.assertEqual(
+            store._attribute(['2 eggs', 'toast'], [{'name': 'toast'}, {'name': 'egg'}]),
+            {'2 eggs': 1, 'toast': 0},
+        )
+        # One item for two segments: neither can be pinned down
+        self.assertEqual(store._attribute(['soup', 'bread'], [{'name': 'stew'}]), {})
+
+    def test_only_unknown_segments_go_to_the_api(self):
+        service = CalorieNinjasService()
+        result = service.parse_food_query('soup, sandwich')
+        self.assertEqual([item['name'] for item in result['items']], ['soup', 'sandwich'])
+        self.assertEqual(FoodItemAlias.objects.get(phrase='soup').item.name, 'soup')
+
+        result = service.parse_food_query('Sandwich; 14oz prime rib')
+        self.assertEqual(self.queries, ['soup, sandwich', '14 oz prime rib'])
+        self.assertEqual([item['name'] for item in result['items']], ['sandwich', 'prime rib'])
+        self.assertEqual(result['known_items'], 1)
+
+
+class CircuitBreakerTests(TestCase):
+    def setUp(self):
+        self.now = 1000.0
+        patcher = mock.patch('tracker.http_client.time.monotonic', side_effect=lambda: self.now)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.breaker = CircuitBreaker(failure_threshold=3, reset_seconds=30)
+
+    def test_opens_after_consecutive_failures(self):
+        self.breaker.record_failure()
+        self.breaker.record_failure()
+        self.breaker.record_success()
+        self.breaker.record_failure()
+        self.breaker.record_failure()
+        self.assertEqual(self.breaker.state, CircuitBreaker.CLOSED)
+        self.assertTrue(self.breaker.allow_request())
+
+        self.breaker.record_failure()
+        self.assertEqual(self.breaker.state, CircuitBreaker.OPEN)
+        self.assertFalse(self.breaker.allow_request())
+
+    def test_half_open_lets_one_trial_through(self):
+        for _ in range(3):
+            self.breaker.record_failure()
+        self.now += 29
+        self.assertFalse(self.breaker.allow_request())
+
+        self.now += 1
+        self.assertEqual(self.breaker.state, CircuitBreaker.HALF_OPEN)
+        self.assertTrue(self.breaker.allow_request())
+        self.assertFalse(self.breaker.allow_request())
+
+        self.breaker.record_success()
+        self.assertEqual(self.breaker.state, CircuitBreaker.CLOSED)
+        self.assertTrue(self.breaker.allow_request())
+        self.assertTrue(self.breaker.allow_request())
+
+    def test_failed_trial_reopens(self):
+        for _ in range(3):
+            self.breaker.record_failure()
+        self.now += 30
+        self.assertTrue(self.breaker.allow_request())
+        self.breaker.record_failure()
+        self.assertEqual(self.breaker.state, CircuitBreaker.OPEN)
+        self.assertFalse(self.breaker.allow_request())
+
+        # The reset period starts again from the failed trial
+        self.now += 29
+        self.assertFalse(self.breaker.allow_request())
+        self.now += 1
+        self.assertTrue(self.breaker.allow_request())
+
+    def test_service_fails_fast_while_open(self):
+        service = CalorieNinjasService()
+        service.breaker = self.breaker
+        service.session = mock.Mock()
+        service.session.get.side_effect = requests.exceptions.Timeout
+
+        for _ in range(3):
+            self.assertEqual(service.parse_food_query('apple', use_cache=False)['error'], 'API request timeout')
+        result = service.parse_food_query('apple', use_cache=False)
+        self.assertEqual(result['error'], 'API temporarily unavailable')
+        self.assertEqual(service.session.get.call_count, 3)
+
+    def test_stuck_trial_is_replaced_after_reset_seconds(self):
+        for _ in range(3):
+            self.breaker.record_failure()
+        self.now += 30
+        self.assertTrue(self.breaker.allow_request())
+
+        # The trial never reports back
+        self.now += 29
+        self.assertFalse(self.breaker.allow_request())
+        self.now += 1
+        self.assertTrue(self.breaker.allow_request())
+        self.assertFalse(self.breaker.allow_request())
+
+    def test_unexpected_errors_and_payloads_count_as_failures(self):
+        service = CalorieNinjasService()
+        service.breaker = self.breaker
+        service.session = mock.Mock()
+        service.session.get.return_value = mock.Mock(status_code=200, json=mock.Mock(return_value=[{'name': 'egg'}]))
+
+        self.assertEqual(service._request_nutrition('egg')['error'], 'Invalid API response')
+        service.session.get.return_value.json.return_value = {'items': 'egg'}
+        self.assertEqual(service._request_nutrition('egg')['error'], 'Invalid API response')
+        service.session.get.side_effect = RuntimeError('boom')
+        with self.assertRaises(RuntimeError):
+            service._request_nutrition('egg')
+        self.assertEqual(self.breaker.state, CircuitBreaker.OPEN)
+
+        # A trial that blows up re-opens the breaker instead of staying in flight
+        self.now += 30
+        with self.assertRaises(RuntimeError):
+            service._request_nutrition('egg')
+        self.assertEqual(self.breaker.state, CircuitBreaker.OPEN)
+
+    async def test_cancelled_async_trial_reopens(self):
+        for _ in range(3):
+            self.breaker.record_failure()
+        self.now += 30
+        service = AsyncCalorieNinjasService()
+        service.breaker = self.breaker
+        service.client = mock.Mock(get=mock.AsyncMock(side_effect=asyncio.CancelledError))
+
+        with self.assertRaises(asyncio.CancelledError):
+            await service._request_nutrition('egg')
+        self.assertEqual(self.breaker.state, CircuitBreaker.OPEN)
+        self.now += 30
+        self.assertTrue(self.breaker.allow_request())
+
+
+class EnrichmentQueueTests(TestCase):
+    def setUp(self):
+        self.api = FakeCalorieNinjas().start()
+        self.addCleanup(self.api.stop)
+        self.user = User.objects.create_user('enricher', password='pass')
+        self.log = FoodLog.objects.create(
+            user=self.user, food_name='2 eggs', natural_query='2 eggs', meal_type='breakfast',
+            status=FoodLog.STATUS_PENDING,
+        )
+        self.job = enqueue(self.log)
+
+    def test_claim_is_exclusive_and_respects_run_after(self):
+        later = FoodLog.objects.create(user=self.user, food_name='apple', status=FoodLog.STATUS_PENDING)
+        EnrichmentJob.objects.filter(pk=enqueue(later).pk).update(
+            run_after=timezone.now() + timedelta(minutes=5)
+        )
+
+        jobs = claim_jobs()
+        self.assertEqual([job.pk for job in jobs], [self.job.pk])
+        self.assertEqual((jobs[0].status, jobs[0].attempts), (EnrichmentJob.STATUS_RUNNING, 1))
+        self.assertEqual(claim_jobs(), [])
+
+    def test_success_keeps_concurrent_edits(self):
+        job = claim_jobs()[0]
+        FoodLog.objects.filter(pk=self.log.pk).update(meal_type='dinner', date=date(2024, 1, 2))
+
+        self.assertTrue(process_job(job))
+        self.log.refresh_from_db()
+        self.assertEqual(self.log.status, FoodLog.STATUS_READY)
+        self.assertGreater(self.log.calories, 0)
+        self.assertGreater(self.log.protein_g, 0)
+        self.assertEqual((self.log.meal_type, self.log.date), ('dinner', date(2024, 1, 2)))
+        self.assertEqual(EnrichmentJob.objects.get().status, EnrichmentJob.STATUS_DONE)
+        # Both the day the log was claimed on and the day it is on now are up to date
+        self.assertEqual(
+            list(DailyNutritionSummary.objects.filter(user=self.user).values_list('date', 'calories')),
+            [(date(2024, 1, 2), self.log.calories)],
+        )
+
+    def test_log_deleted_during_the_lookup_is_skipped(self):
+        job = claim_jobs()[0]
+        FoodLog.objects.filter(pk=self.log.pk).delete()
+
+        self.assertFalse(process_job(job))
+        self.assertFalse(EnrichmentJob.objects.exists())
+
+    def test_failure_backs_off_then_gives_up(self):
+        self.api.fail = True
+        job = claim_jobs()[0]
+        self.assertFalse(process_job(job))
+        job.refresh_from_db()
+        self.assertEqual(job.status, EnrichmentJob.STATUS_QUEUED)
+        self.assertEqual(job.last_error, 'Service Unavailable')
+        self.assertAlmostEqual(
+            (job.run_after - timezone.now()).total_seconds(),
+            DEFAULT_ENRICHMENT_SETTINGS['RETRY_BASE_SECONDS'], delta=5,
+        )
+
+        EnrichmentJob.objects.filter(pk=job.pk).update(
+            run_after=timezone.now(), attempts=DEFAULT_ENRICHMENT_SETTINGS['MAX_ATTEMPTS'] - 1
+        )
+        job = claim_jobs()[0]
+        with mock.patch('tracker.enrichment.bump_page_version') as bump:
+            self.assertFalse(process_job(job))
+        bump.assert_called_once_with(self.user.pk)
+        self.assertEqual(EnrichmentJob.objects.get().status, EnrichmentJob.STATUS_FAILED)
+        self.assertEqual(FoodLog.objects.get().status, FoodLog.STATUS_FAILED)
+
+    def test_crash_on_last_attempt_fails_the_log(self):
+        EnrichmentJob.objects.filter(pk=self.job.pk).update(
+            attempts=DEFAULT_ENRICHMENT_SETTINGS['MAX_ATTEMPTS'] - 1
+        )
+        with mock.patch('tracker.enrichment.process_job', side_effect=RuntimeError('boom')), \
+                mock.patch('tracker.enrichment.bump_page_version') as bump:
+            self.assertEqual(run_worker(once=True), 1)
+        bump.assert_called_once_with(self.user.pk)
+        job = EnrichmentJob.objects.get()
+        self.assertEqual((job.status, job.last_error), (EnrichmentJob.STATUS_FAILED, 'Worker crashed: boom'))
+        self.assertEqual(FoodLog.objects.get().status, FoodLog.STATUS_FAILED)
+
+    def test_crash_before_last_attempt_requeues(self):
+        with mock.patch('tracker.enrichment.process_job', side_effect=RuntimeError('boom')):
+            self.assertEqual(run_worker(once=True), 1)
+        self.assertEqual(EnrichmentJob.objects.get().status, EnrichmentJob.STATUS_QUEUED)
+        self.assertEqual(FoodLog.objects.get().status, FoodLog.STATUS_PENDING)
+
+
+class DailySummarySignalTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('summer', password='pass')
+        self.monday, self.tuesday = date(2024, 3, 4), date(2024, 3, 5)
+
+    def _log(self, day, calories):
+        return FoodLog.objects.create(user=self.user, food_name='toast', calories=calories, date=day)
+
+    def _calories(self, day):
+        summary = DailyNutritionSummary.objects.filter(user=self.user, date=day).first()
+        return summary.calories if summary else None
+
+    def test_moving_a_log_refreshes_both_days(self):
+        self._log(self.monday, 100)
+        moved = self._log(self.monday, 250)
+        self.assertEqual(self._calories(self.monday), 350)
+
+        moved.date = self.tuesday
+        moved.save()
+        self.assertEqual(self._calories(self.monday), 100)
+        self.assertEqual(self._calories(self.tuesday), 250)
+
+    def test_moving_a_loaded_log_removes_the_emptied_day(self):
+        log_id = self._log(self.monday, 300).pk
+        log = FoodLog.objects.get(pk=log_id)
+        log.date = self.tuesday
+        log.save()
+        self.assertIsNone(self._calories(self.monday))
+        self.assertEqual(self._calories(self.tuesday), 300)
+
+        # Saving again on the same day leaves the other day alone
+        log.calories = 320
+        log.save()
+        self.assertIsNone(self._calories(self.monday))
+        self.assertEqual(self._calories(self.tuesday), 320)
+
+
+class NutrientColumnBackfillTests(TestCase):
+    def test_backfill_reads_legacy_keys(self):
+        migration = import_module('tracker.migrations.0008_foodlog_nutrient_columns')
+        user = User.objects.create_user('legacy', password='pass')
+        legacy = FoodLog.objects.create(
+            user=user, food_name='rice', calories=0,
+            nutrition_data={'calories': '210', 'carbs': 45, 'fat_saturated_g': '0.1', 'protein_g': 'n/a'},
+        )
+        current = FoodLog.objects.create(
+            user=user, food_name='egg', calories=140,
+            nutrition_data={'calories': 150, 'protein_g': 12.6, 'fat_total_g': 9.5},
+        )
+        FoodLog.objects.create(user=user, food_name='water', nutrition_data=None)
+        # Rows as they were before the columns existed
+        FoodLog.objects.update(calories=0, protein_g=0, carbohydrates_total_g=0, fat_total_g=0, saturated_fat_g=0)
+        FoodLog.objects.filter(pk=current.pk).update(calories=140)
+
+        # One read and one bulk update for the batch
+        with self.assertNumQueries(2):
+            migration.backfill_nutrient_columns(django_apps, None)
+
+        legacy.refresh_from_db()
+        self.assertEqual(
+            (legacy.calories, legacy.carbohydrates_total_g, legacy.saturated_fat_g, legacy.protein_g),
+            (210.0, 45.0, 0.1, 0.0),
+        )
+        current.refresh_from_db()
+        # An existing calorie total is kept
+        self.assertEqual((current.calories, current.protein_g, current.fat_total_g), (140.0, 12.6, 9.5))
+
+    def test_rebuilt_summaries_match_the_runtime_totals(self):
+        migration = import_module('tracker.migrations.0016_rebuild_daily_summaries')
+        user = User.objects.create_user('legacy', password='pass')
+        day = date(2024, 3, 4)
+        FoodLog.objects.create(
+            user=user, food_name='egg', calories=140, date=day, meal_type='breakfast',
+            nutrition_data={'calories': 150, 'protein_g': 12.6, 'fat_saturated_g': 3.1},
+        )
+        FoodLog.objects.create(user=user, food_name='toast', calories=80, date=day, meal_type='brunch')
+        expected = FoodLog.objects.filter(user=user, date=day).nutrition_totals()
+        # Totals as 0007 computed them from nutrition_data
+        DailyNutritionSummary.objects.update(calories=230, saturated_fat=0, snack_count=0)
+
+        migration.rebuild_summaries(django_apps, None)
+
+        summary = DailyNutritionSummary.objects.get(user=user, date=day)
+        self.assertEqual({field: getattr(summary, field) for field in expected}, expected)
+        self.assertEqual((summary.calories, summary.saturated_fat, summary.snack_count), (220.0, 3.1, 1))
+
+
+class NutritionSeriesTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('charter', password='pass')
+
+    def _log(self, day, calories):
+        FoodLog.objects.create(user=self.user, food_name='toast', calories=calories, date=day)
+
+    def _series(self, start, end, bucket=None):
+        series = build_nutrition_series(self.user, start, end, bucket)
+        return series['bucket'], [(p['start'], p['calories'], p['days_logged']) for p in series['points']]
+
+    def test_empty_days_are_filled(self):
+        self._log(date(2024, 3, 4), 100)
+        self._log(date(2024, 3, 6), 200)
+        self._log(date(2024, 3, 6), 50)
+
+        self.assertEqual(self._series(date(2024, 3, 4), date(2024, 3, 7)), ('day', [
+            ('2024-03-04', 100.0, 1), ('2024-03-05', 0.0, 0), ('2024-03-06', 250.0, 1), ('2024-03-07', 0.0, 0),
+        ]))
+
+    def test_weeks_average_over_the_days_inside_the_range(self):
+        self._log(date(2024, 3, 4), 9999)  # Monday of the first week, before the range
+        self._log(date(2024, 3, 6), 500)
+        self._log(date(2024, 3, 8), 500)
+        self._log(date(2024, 3, 12), 700)
+        self._log(date(2024, 3, 19), 300)
+
+        # Wednesday to the Tuesday two weeks later: 5 days, 7 days, then 2 days
+        self.assertEqual(self._series(date(2024, 3, 6), date(2024, 3, 19), 'week'), ('week', [
+            ('2024-03-04', 200.0, 2), ('2024-03-11', 100.0, 1), ('2024-03-18', 150.0, 1),
+        ]))
+
+    def test_months_average_over_the_days_inside_the_range(self):
+        self._log(date(2024, 1, 25), 1200)
+        self._log(date(2024, 2, 10), 290)
+
+        self.assertEqual(self._series(date(2024, 1, 20), date(2024, 3, 10), 'month'), ('month', [
+            ('2024-01-01', 100.0, 1), ('2024-02-01', 10.0, 1), ('2024-03-01', 0.0, 0),
+        ]))
+        self.assertEqual(
+            [start for start, _, _ in self._series(date(2023, 12, 15), date(2024, 1, 5), 'month')[1]],
+            ['2023-12-01', '2024-01-01'],
+        )
+
+    def test_choose_bucket(self):
+        start = date(2024, 1, 1)
+        self.assertEqual(choose_bucket(start, start), 'day')
+        self.assertEqual(choose_bucket(start, start + timedelta(days=30)), 'day')
+        self.assertEqual(choose_bucket(start, start + timedelta(days=31)), 'week')
+        self.assertEqual(choose_bucket(start, start + timedelta(days=199)), 'week')
+        self.assertEqual(choose_bucket(start, start + timedelta(days=200)), 'month')
+
+    def test_parse_chart_range(self):
+        today = date(2024, 6, 15)
+        cases = [
+            ({}, (date(2024, 6, 9), today, '7')),
+            ({'range': '30'}, (date(2024, 5, 17), today, '30')),
+            ({'range': '45'}, (date(2024, 6, 9), today, '7')),
+            ({'range': 'custom', 'start': '2024-06-01', 'end': '2024-06-10'},
+             (date(2024, 6, 1), date(2024, 6, 10), 'custom')),
+            # The end is clamped to today
+            ({'range': 'custom', 'start': '2024-06-01', 'end': '2024-07-01'}, (date(2024, 6, 1), today, 'custom')),
+            # A start after the end collapses to a single day
+            ({'range': 'custom', 'start': '2024-06-10', 'end': '2024-06-05'},
+             (date(2024, 6, 5), date(2024, 6, 5), 'custom')),
+            ({'range': 'custom', 'start': '2000-01-01', 'end': '2024-06-15'},
+             (today - timedelta(days=MAX_CHART_DAYS - 1), today, 'custom')),
+            # Unparseable dates fall back to the last 7 days
+            ({'range': 'custom', 'start': 'junk', 'end': '2024-06-10'}, (date(2024, 6, 9), today, '7')),
+            ({'range': 'custom', 'start': '2024-02-30', 'end': '2024-06-10'}, (date(2024, 6, 9), today, '7')),
+        ]
+        for params, expected in cases:
+            with self.subTest(params=params):
+                self.assertEqual(parse_chart_range(params, today), expected)
+
+
+@override_settings(MIDDLEWARE=['tracker.middleware.RequestTimingMiddleware', *settings.MIDDLEWARE])
+class RequestTimingTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('timed', password='pass')
+
+    def test_header_and_log_line(self):
+        self.client.force_login(self.user)
+        with self.assertLogs('tracker.timing', 'INFO') as logs, CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('tracker:home'))
+
+        header = response['Server-Timing']
+        self.assertEqual([part.split(';')[0] for part in header.split(', ')], ['db', 'api', 'tpl', 'total'])
+        self.assertEqual(int(re.search(r'desc="(\d+) queries"', header).group(1)), len(queries))
+        line = json.loads(logs.records[0].getMessage())
+        self.assertEqual((line['view'], line['status'], line['db_queries']), ('tracker:home', 200, len(queries)))
+
+    @override_settings(TRACKER_QUERY_BUDGET=2)
+    def test_over_budget_requests_are_logged(self):
+        self.client.force_login(self.user)
+        with self.assertLogs('tracker.timing', 'WARNING') as logs:
+            self.client.get(reverse('tracker:home'))
+        self.assertIn('tracker:home ran', logs.output[0])
+        self.assertIn('(budget 2)', logs.output[0])
+
+
+def _select_one_in_new_connection():
+    from django.db import connection as thread_connection
+    try:
+        with thread_connection.cursor() as cursor:
+            cursor.execute('SELECT 1')
+    finally:
+        thread_connection.close()
+
+
+class RequestTimingTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('timed', password='pass')
+
+    def _timing_header(self, response):
+        header = response['Server-Timing']
+        self.assertEqual(
+            [part.split(';')[0] for part in header.split(', ')], ['db', 'api', 'tpl', 'total']
+        )
+        return int(re.search(r'desc="(\d+) queries"', header).group(1))
+
+    @override_settings(MIDDLEWARE=['tracker.middleware.RequestTimingMiddleware', *settings.MIDDLEWARE])
+    def test_header_log_line_and_view_budget(self):
+        self.client.force_login(self.user)
+        with self.assertLogs('tracker.timing', 'INFO') as logs, CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('tracker:home'))
+
+        self.assertEqual(self._timing_header(response), len(queries))
+        line = json.loads(logs.records[0].getMessage())
+        self.assertEqual((line['view'], line['status'], line['db_queries']), ('tracker:home', 200, len(queries)))
+
+        with mock.patch.dict(QUERY_BUDGETS, {'home': {'GET': (2, 0)}}):
+            with self.assertLogs('tracker.timing', 'WARNING') as logs:
+                self.client.get(reverse('tracker:home'))
+            self.assertIn('tracker:home ran', logs.output[0])
+            self.assertIn('(budget 2)', logs.output[0])
+
+            with override_settings(TRACKER_QUERY_BUDGET=1000), self.assertNoLogs('tracker.timing', 'WARNING'):
+                self.client.get(reverse('tracker:home'))
+
+    def test_default_budget_comes_from_the_table(self):
+        self.assertEqual(query_budget('add_food_log', 'POST'), QUERY_BUDGETS['add_food_log']['POST'][0])
+        self.assertEqual(query_budget(None, 'GET'), DEFAULT_QUERY_BUDGET)
+        self.assertGreaterEqual(DEFAULT_QUERY_BUDGET, QUERY_BUDGETS['add_food_log']['POST'][0])
+
+    async def test_async_views_count_sync_to_async_queries(self):
+        async def view(request):
+            await FoodLog.objects.filter(user=self.user).acount()
+            await sync_to_async(_select_one_in_new_connection, thread_sensitive=False)()
+            return HttpResponse()
+
+        # Loaded on the sync thread, like ASGIHandler does at startup
+        middleware = await sync_to_async(RequestTimingMiddleware)(view)
+        self.assertTrue(iscoroutinefunction(middleware))
+        with self.assertLogs('tracker.timing', 'INFO'):
+            response = await middleware(AsyncRequestFactory().get('/timed/'))
+        self.assertEqual(self._timing_header(response), 2)
+
+
+class QueryBudgetTests(TestCase):
+    """
+    Every tracker view runs within its query and row budget for a user
+    with a realistic history, and its query count does not grow with that
+    history.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.today = timezone.now().date()
+        cls.user = User.objects.create_user('budget', 'budget@example.com', 'pass')
+        cls.new_user = User.objects.create_user('newcomer', 'newcomer@example.com', 'pass')
+        other = User.objects.create_user('other', 'other@example.com', 'pass')
+
+        seed_food_history(cls.user, days=HISTORY_DAYS, logs_per_day=LOGS_PER_DAY)
+        seed_food_history(cls.new_user, days=2, logs_per_day=LOGS_PER_DAY, seed=1)
+        # Both have logged the meal add_food_log posts, so it bumps a FrequentFood row for each
+        FoodLog.objects.create(user=cls.new_user, food_name='Egg + Toast', calories=587,
+                               natural_query='2 eggs and toast', date=cls.today - timedelta(days=1))
+        # Someone else's history must not leak into the counts
+        seed_food_history(other, days=HISTORY_DAYS, logs_per_day=6, seed=2)
+        for user in (cls.user, cls.new_user):
+            recipe = Recipe.objects.create(user=user, name='Adobo', servings=4)
+            RecipeIngredient.objects.create(recipe=recipe, text='2 lb chicken thighs',
+                                            nutrition={'calories': 1600.0})
+
+    def setUp(self):
+        self.api = FakeCalorieNinjas().start()
+        self.addCleanup(self.api.stop)
+
+    def _request_args(self, name, method, user):
+        """
+        URL and POST data for one budget entry
+        """
+        log = FoodLog.objects.filter(user=user, date=self.today).order_by('pk').first()
+        if name in ('edit_food_log', 'delete_food_log', 'log_again'):
+            url = reverse(f'tracker:{name}', args=[log.pk])
+        elif name == 'log_frequent_food':
+            url = reverse(f'tracker:{name}', args=[FrequentFood.objects.filter(user=user).first().pk])
+        elif name in ('recipe_detail', 'delete_recipe'):
+            url = reverse(f'tracker:{name}', args=[Recipe.objects.filter(user=user).first().pk])
+        else:
+            url = reverse(f'tracker:{name}')
+
+        data = {}
+        if name == 'food_log_status':
+            ids = FoodLog.objects.filter(user=user, date=self.today).values_list('pk', flat=True)
+            url += '?ids=' + ','.join(str(pk) for pk in ids)
+        elif name == 'dashboard':
+            url += '?range=30'
+        elif name == 'suggest_foods':
+            url += '?q=eg'
+        elif name == 'export_food_logs':
+            url += f'?start={(self.today - timedelta(days=6)).isoformat()}'
+        elif name == 'add_food_log':
+            data = {
+                'natural_query': '2 eggs and toast',
+                'meal_type': 'breakfast',
+                'date': self.today.isoformat(),
+            }
+        elif name == 'recipes' and method == 'POST':
+            data = {'name': 'Weeknight stew', 'servings': 4, 'ingredients': '300g chicken breast\n2 cups rice'}
+        elif name == 'recipe_detail' and method == 'POST':
+            data = {'action': 'add', 'text': '1 tbsp butter'}
+        elif name == 'edit_food_log' and method == 'POST':
+            data = {'meal_type': 'snack', 'date': (self.today - timedelta(days=1)).isoformat()}
+        return url, data
+
+    def _measure(self, name, method, user):
+        """
+        Run one request from a cold lookup cache and roll back its writes,
+        so measurements do not depend on the order they run in
+        """
+        url, data = self._request_args(name, method, user)
+        self.client.force_login(user)
+        reset_lookup_caches()
+        with transaction.atomic():
+            with CaptureQueriesContext(connection) as captured, count_rows() as rows:
+                if method == 'POST':
+                    response = self.client.post(url, data)
+                else:
+                    response = self.client.get(url)
+                if response.streaming:
+                    b''.join(response.streaming_content)
+            transaction.set_rollback(True)
+        self.assertLess(response.status_code, 400, f"{method} {url} returned {response.status_code}")
+        return captured.captured_queries, rows['rows']
+
+    def test_every_url_has_a_budget(self):
+        names = {pattern.name for pattern in tracker_urls.urlpatterns}
+        self.assertEqual(
+            names, set(QUERY_BUDGETS),
+            "Add new tracker URLs to QUERY_BUDGETS (and drop removed ones)",
+        )
+
+    def test_views_stay_within_budget(self):
+        for name, methods in QUERY_BUDGETS.items():
+            for method, (max_queries, max_rows) in methods.items():
+                with self.subTest(view=name, method=method):
+                    queries, rows = self._measure(name, method, self.user)
+                    self.assertLessEqual(
+                        len(queries), max_queries,
+                        f"{method} {name} ran {len(queries)} queries "
+                        f"(budget {max_queries}):\n{_format_queries(queries)}",
+                    )
+                    self.assertLessEqual(
+                        rows, max_rows,
+                        f"{method} {name} fetched {rows} rows (budget {max_rows}):\n"
+                        f"{_format_queries(queries)}",
+                    )
+
+    def test_query_count_independent_of_history(self):
+        for name, methods in QUERY_BUDGETS.items():
+            for method in methods:
+                with self.subTest(view=name, method=method):
+                    small, _ = self._measure(name, method, self.new_user)
+                    large, _ = self._measure(name, method, self.user)
+                    if len(small) == len(large):
+                        continue
+                    diff = difflib.unified_diff(
+                        [_normalize_sql(q['sql']) for q in small],
+                        [_normalize_sql(q['sql']) for q in large],
+                        f'2 days of history ({len(small)} queries)',
+                        f'{HISTORY_DAYS} days of history ({len(large)} queries)',
+                        lineterm='',
+                    )
+                    self.fail(f"{method} {name} query count grows with history:\n" + '\n'.join(diff))
+
+    def test_dashboard_ranges_share_a_budget(self):
+        max_queries, _ = QUERY_BUDGETS['dashboard']['GET']
+        self.client.force_login(self.user)
+        for days in ('7', '30', '90', '365'):
+            with self.subTest(range=days):
+                with CaptureQueriesContext(connection) as captured:
+                    response = self.client.get(reverse('tracker:dashboard'), {'range': days})
+                self.assertEqual(response.status_code, 200)
+                self.assertLessEqual(
+                    len(captured), max_queries,
+                    f"dashboard range={days} ran {len(captured)} queries:\n"
+                    f"{_format_queries(captured.captured_queries)}",
+                )
+
+    @override_settings(FOOD_LOG_ASYNC_ENRICHMENT=True)
+    def test_async_add_stays_within_budget(self):
+        max_queries, _ = QUERY_BUDGETS['add_food_log']['POST']
+        queries, _ = self._measure('add_food_log', 'POST', self.user)
+        self.assertLessEqual(len(queries), max_queries, _format_queries(queries))
+        self.assertEqual(self.api.calls, 0, "Async add must not call the API in the request")
+
+    def test_repeated_add_uses_lookup_cache(self):
+        url, data = self._request_args('add_food_log', 'POST', self.user)
+        self.client.force_login(self.user)
+        self.client.post(url, data)
+        self.client.post(url, data)
+        self.assertEqual(self.api.queries, ['2 eggs and toast'])
+
+
+class JsonApiTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('api', 'api@example.com', 'pass')
+        seed_food_history(cls.user, days=10, logs_per_day=3)
+        seed_food_history(User.objects.create_user('other-api'), days=10, logs_per_day=2, seed=5)
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def test_logs_paginate_without_gaps_or_repeats(self):
+        url = reverse('tracker:api_food_logs')
+        seen, cursor = [], None
+        while True:
+            response = self.client.get(url, {'limit': 7, **({'cursor': cursor} if cursor else {})})
+            body = response.json()
+            seen.extend(log['id'] for log in body['results'])
+            cursor = body['next_cursor']
+            if cursor is None:
+                break
+
+        expected = FoodLog.objects.filter(user=self.user).order_by('-date', '-created_at', '-id')
+        self.assertEqual(seen, list(expected.values_list('id', flat=True)))
+
+    def test_unchanged_poll_returns_304_after_one_query(self):
+        url = reverse('tracker:api_daily_totals')
+        response = self.client.get(url)
+        self.assertEqual(len(response.json()['days']), 10)
+        etag = response['ETag']
+
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+        # Session and user lookups, then the ETag aggregate
+        self.assertEqual(len(captured.captured_queries), 3)
+
+    def test_etag_changes_with_edits_and_deletes(self):
+        url = reverse('tracker:api_meal_counts')
+        first = self.client.get(url)['ETag']
+
+        log = FoodLog.objects.filter(user=self.user).earliest('created_at')
+        log.meal_type = 'snack'
+        log.save()
+        second = self.client.get(url, HTTP_IF_NONE_MATCH=first)
+        self.assertEqual(second.status_code, 200)
+
+        FoodLog.objects.filter(user=self.user).exclude(pk=log.pk).first().delete()
+        third = self.client.get(url, HTTP_IF_NONE_MATCH=second['ETag'])
+        self.assertEqual(third.status_code, 200)
+        self.assertEqual(sum(third.json()['meal_counts'].values()), 29)
+
+    def test_bad_parameters_are_rejected(self):
+        self.assertEqual(self.client.get(reverse('tracker:api_food_logs'), {'cursor': 'nope'}).status_code, 400)
+        response = self.client.get(reverse('tracker:api_daily_totals'), {'start': '2024-02-30'})
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(response.json()['success'])
+
+
+class ExportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.today = timezone.now().date()
+        cls.user = User.objects.create_user('exporter', 'exporter@example.com', 'pass')
+        seed_food_history(cls.user, days=20, logs_per_day=3)
+        seed_food_history(User.objects.create_user('bystander'), days=5, logs_per_day=2, seed=4)
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def _download(self, **params):
+        response = self.client.get(reverse('tracker:export_food_logs'), params)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return response, b''.join(response.streaming_content)
+
+    def test_csv_export_has_every_log(self):
+        response, body = self._download(format='csv')
+        rows = list(csv.DictReader(io.StringIO(body.decode('utf-8'))))
+        self.assertIn('attachment; filename="food-logs.csv"', response['Content-Disposition'])
+        self.assertEqual(len(rows), 60)
+        self.assertEqual({row['user_id'] for row in rows}, {str(self.user.pk)})
+        log = FoodLog.objects.get(pk=rows[0]['id'])
+        self.assertEqual(float(rows[0]['protein_g']), log.nutrition_data['protein_g'])
+
+    def test_gzip_jsonl_with_date_range(self):
+        start = self.today - timedelta(days=4)
+        response, body = self._download(format='jsonl', gzip='1', start=start.isoformat())
+        self.assertEqual(response['Content-Type'], 'application/gzip')
+        lines = gzip.decompress(body).decode('utf-8').splitlines()
+        logs = [json.loads(line) for line in lines]
+        self.assertEqual(len(logs), 15)
+        self.assertEqual(min(log['date'] for log in logs), start.isoformat())
+
+    def test_output_is_streamed_in_chunks(self):
+        with mock.patch('tracker.exports.OUTPUT_CHUNK_BYTES', 1024):
+            chunks = list(iter_export(self.user, 'csv'))
+        self.assertGreater(len(chunks), 5)
+        self.assertTrue(all(len(chunk) < 1024 + 1000 for chunk in chunks))
+
+    def test_rejects_unknown_format(self):
+        response = self.client.get(reverse('tracker:export_food_logs'), {'format': 'xml'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_command_writes_file(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / 'logs.csv.gz'
+            call_command(
+                'export_food_logs', '--user-id', str(self.user.pk), '--gzip',
+                '--end', (self.today - timedelta(days=10)).isoformat(),
+                '--output', str(path), stdout=io.StringIO(),
+            )
+            rows = list(csv.DictReader(io.StringIO(gzip.decompress(path.read_bytes()).decode('utf-8'))))
+        self.assertEqual(len(rows), 10 * 3)
+        self.assertEqual(max(row['date'] for row in rows), (self.today - timedelta(days=10)).isoformat())
+
+
+IMPORT_CSV = """date,meal_type,food_name,calories,protein_g,description
+{day},breakfast,Leftover pizza,420,18,Two slices
+{day},lunch,chicken adobo and rice,,,
+{day},Dinner,salmon,,,
+{future},snack,apple,95,,
+{day},brunch,toast,80,,
+{day},snack,yogurt,lots,,
+{day},snack,mystery stew,,,
+"""
+
+
+# Lookups stay on the test thread and its transaction
+IMPORT_TEST_SETTINGS = {'ENRICH_WORKERS': 1, 'ENRICH_RATE_PER_SECOND': 0}
+
+
+@override_settings(FOOD_LOG_IMPORT=IMPORT_TEST_SETTINGS)
+class ImportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.today = timezone.now().date()
+        cls.user = User.objects.create_user('importer', 'importer@example.com', 'pass')
+
+    def setUp(self):
+        self.api = FakeCalorieNinjas().start()
+        self.addCleanup(self.api.stop)
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.path = Path(self.tmp.name) / 'history.csv'
+        self.path.write_text(IMPORT_CSV.format(
+            day=(self.today - timedelta(days=3)).isoformat(),
+            future=(self.today + timedelta(days=1)).isoformat(),
+        ))
+
+    def test_command_imports_validates_and_enriches(self):
+        call_command('import_food_logs', str(self.path), '--user-id', str(self.user.pk), stdout=io.StringIO())
+
+        job = ImportJob.objects.get()
+        self.assertEqual(job.status, ImportJob.STATUS_DONE)
+        self.assertEqual((job.rows_processed, job.rows_imported, job.rows_rejected), (7, 4, 3))
+        self.assertEqual({error['row'] for error in job.errors}, {4, 5, 6})
+
+        logs = {log.food_name: log for log in FoodLog.objects.filter(user=self.user)}
+        self.assertEqual(logs['Leftover pizza'].protein_g, 18)
+        self.assertEqual(logs['Leftover pizza'].description, 'Two slices')
+        self.assertEqual(logs['Salmon'].meal_type, 'dinner')
+        self.assertGreater(logs['Chicken Adobo + Rice'].calories, 0)
+        # Unknown to the API, same as when added by hand
+        self.assertEqual(logs['mystery stew'].description, 'Could not fetch nutrition data')
+        self.assertEqual(job.rows_enriched, 3)
+        self.assertEqual(self.api.queries, ['chicken adobo and rice', 'salmon', 'mystery stew'])
+
+        summary = DailyNutritionSummary.objects.get(user=self.user)
+        self.assertEqual(summary.log_count, 4)
+        self.assertEqual(summary.calories, sum(log.calories for log in logs.values()))
+
+    def test_import_reaches_a_loaded_suggestion_index(self):
+        self.assertEqual(suggestion_index.for_user(self.user.pk).search('salm', 5), [])
+        run_import(ImportJob.objects.create(user=self.user, source_path=str(self.path)))
+        self.assertEqual([entry['text'] for entry in suggestion_index.for_user(self.user.pk).search('salm', 5)], ['salmon'])
+
+    def test_failed_lookups_are_left_for_the_enrichment_worker(self):
+        self.api.fail = True
+        job = run_import(ImportJob.objects.create(user=self.user, source_path=str(self.path)))
+
+        self.assertEqual((job.rows_imported, job.rows_enriched), (4, 0))
+        pending = FoodLog.objects.filter(user=self.user, status=FoodLog.STATUS_PENDING)
+        self.assertEqual(pending.count(), 3)
+        self.assertEqual(EnrichmentJob.objects.filter(food_log__in=pending).count(), 3)
+
+    @override_settings(FOOD_LOG_IMPORT=dict(IMPORT_TEST_SETTINGS, BATCH_SIZE=2))
+    def test_resume_skips_committed_batches(self):
+        job = ImportJob.objects.create(user=self.user, source_path=str(self.path), rows_processed=2,
+                                       rows_imported=2, status=ImportJob.STATUS_RUNNING)
+        run_import(job)
+
+        job.refresh_from_db()
+        self.assertEqual((job.rows_processed, job.rows_imported), (7, 4))
+        self.assertEqual(
+            sorted(FoodLog.objects.filter(user=self.user).values_list('food_name', flat=True)),
+            ['Salmon', 'mystery stew'],
+        )
+
+    def test_upload_is_queued_for_the_worker(self):
+        self.client.force_login(self.user)
+        media = Path(self.tmp.name) / 'media'
+        with override_settings(MEDIA_ROOT=str(media)):
+            upload = SimpleUploadedFile('history.csv', self.path.read_bytes(), content_type='text/csv')
+            response = self.client.post(reverse('tracker:import_food_logs'), {'csv_file': upload})
+            self.assertRedirects(response, reverse('tracker:import_food_logs'))
+            job = ImportJob.objects.get()
+            self.assertEqual((job.status, bytes(job.source_data)), (ImportJob.STATUS_QUEUED, self.path.read_bytes()))
+            # Nothing is written where a worker on another machine could not read it
+            self.assertFalse(media.exists())
+
+            self.assertEqual(run_import_worker(once=True), 1)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.rows_imported, job.source_data), (ImportJob.STATUS_DONE, 4, None))
+
+    def test_finished_and_failed_jobs_drop_their_upload(self):
+        job = run_import(ImportJob.objects.create(user=self.user, source_data=b'\xff\xfe not text'))
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.source_data), (ImportJob.STATUS_FAILED, None))
+
+        # Uploads stored as files before the contents moved onto the job
+        with override_settings(MEDIA_ROOT=self.tmp.name):
+            stored = Path(self.tmp.name) / 'imports' / str(self.user.pk) / 'old.csv'
+            stored.parent.mkdir(parents=True)
+            stored.write_bytes(self.path.read_bytes())
+            job = run_import(ImportJob.objects.create(user=self.user, source_path=str(stored)))
+        self.assertEqual(job.status, ImportJob.STATUS_DONE)
+        self.assertFalse(stored.exists())
+        # A file imported from the command line is the user's own
+        self.assertTrue(self.path.exists())
+
+    def test_lookups_run_on_a_bounded_pool(self):
+        active, peak = [0], [0]
+        lock = threading.Lock()
+
+        class SlowService(CalorieNinjasService):
+            def parse_food_query(self, query, use_cache=True):
+                with lock:
+                    active[0] += 1
+                    peak[0] = max(peak[0], active[0])
+                threading.Event().wait(0.02)
+                with lock:
+                    active[0] -= 1
+                return {'success': True, 'items': fake_nutrition_items(query), 'raw_response': {}}
+
+        logs = [FoodLog(natural_query='banana', status=FoodLog.STATUS_PENDING) for _ in range(12)]
+        config = {'ENRICH_WORKERS': 3, 'ENRICH_RATE_PER_SECOND': 0}
+        self.assertEqual(enrich_logs(logs, config, SlowService()), 12)
+        self.assertEqual(peak[0], 3)
+        self.assertFalse(any(log.is_pending for log in logs))
+
+    def test_rate_limiter_spaces_calls(self):
+        limiter = RateLimiter(50)
+        started = time.monotonic()
+        for _ in range(5):
+            limiter.wait()
+        self.assertGreaterEqual(time.monotonic() - started, 0.079)
+
+
+class BenchmarkTests(TestCase):
+    def test_run_benchmark_reports_every_scenario(self):
+        report = run_benchmark(users=1, days=3, logs_per_day=2, requests=2, warmup=0)
+        self.assertEqual(
+            set(report['results']),
+            {name for name, *_ in build_scenarios()},
+        )
+        for name, metrics in report['results'].items():
+            with self.subTest(scenario=name):
+                self.assertEqual(metrics['count'], 2)
+                self.assertLessEqual(metrics['p50_ms'], metrics['p99_ms'])
+                self.assertTrue(all(code < 400 for code in metrics['status_codes']))
+
+    def test_percentile_nearest_rank(self):
+        values = list(range(1, 101))
+        self.assertEqual(percentile(values, 50), 50)
+        self.assertEqual(percentile(values, 99), 99)
+        self.assertEqual(percentile([7], 95), 7)
+        self.assertEqual(percentile([], 50), 0)
+
+
+class CalorieNinjasStubTests(TestCase):
+    def setUp(self):
+        self.server = make_stub_server(port=0, api_key='stub-key')
+        thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        thread.start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        self.addCleanup(get_breaker().reset)
+        host, port = self.server.server_address[:2]
+        self.base_url = f'http://{host}:{port}/v1/nutrition'
+        reset_lookup_caches()
+
+    def _service(self):
+        with override_settings(CALORIENINJAS_BASE_URL=self.base_url, CALORIENINJAS_API_KEY='stub-key'):
+            return CalorieNinjasService()
+
+    def test_service_talks_to_stub(self):
+        result = self._service().parse_food_query('2 eggs and toast', use_cache=False)
+        self.assertTrue(result['success'])
+        self.assertEqual([item['name'] for item in result['items']], ['egg', 'toast'])
+        self.assertEqual(result['items'][0]['serving_size_g'], 200.0)
+        self.assertEqual(self.server.stats.snapshot()['ok'], 1)
+
+    def test_injected_errors_surface_as_failures(self):
+        self.server.profile = FaultProfile(rate_5xx=1.0)
+        with override_settings(CALORIENINJAS_HTTP={'MAX_RETRIES': 0}):
+            service = self._service()
+            service.session = build_session()
+        result = service.parse_food_query('apple', use_cache=False)
+        self.assertFalse(result['success'])
+        self.assertEqual(result['error'], 'API returned status code 503')
+
+    def test_fault_profile_rates(self):
+        profile = FaultProfile(rate_429=0.2, rate_5xx=0.1, rate_timeout=0.1, seed=3)
+        outcomes = [profile.outcome() for _ in range(2000)]
+        self.assertAlmostEqual(outcomes.count('429') / 2000, 0.2, delta=0.03)
+        self.assertAlmostEqual(outcomes.count('ok') / 2000, 0.6, delta=0.03)
+        with self.assertRaises(ValueError):
+            FaultProfile(rate_429=0.6, rate_5xx=0.6)
+
+    async def test_async_service_talks_to_stub(self):
+        with override_settings(CALORIENINJAS_BASE_URL=self.base_url, CALORIENINJAS_API_KEY='stub-key'):
+            service = AsyncCalorieNinjasService()
+        try:
+            result = await service.parse_food_query('14oz prime rib', use_cache=False)
+            self.assertTrue(result['success'])
+            self.assertEqual(result['items'][0]['name'], 'prime rib')
+
+            # One retry on 503, then the failure is reported
+            self.server.profile = FaultProfile(rate_5xx=1.0)
+            with override_settings(CALORIENINJAS_HTTP={'MAX_RETRIES': 1, 'BACKOFF_FACTOR': 0}):
+                result = await service.parse_food_query('apple', use_cache=False)
+            self.assertEqual(result['error'], 'API returned status code 503')
+            self.assertEqual(self.server.stats.snapshot()['5xx'], 2)
+        finally:
+            await service.client.aclose()
+
+
+class SingleFlightTests(TestCase):
+    def setUp(self):
+        self.api = FakeCalorieNinjas().start()
+        self.addCleanup(self.api.stop)
+
+    def test_concurrent_callers_share_one_call(self):
+        flight = SingleFlight()
+        release = threading.Event()
+        calls = []
+
+        def work():
+            calls.append(1)
+            release.wait(5)
+            return {'items': ['egg']}
+
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(flight.run('eggs', work)))
+            for _ in range(5)
+        ]
+        for thread in threads:
+            thread.start()
+        while flight.stats()['waiters'] < 4:
+            threading.Event().wait(0.01)
+        release.set()
+        for thread in threads:
+            thread.join(5)
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(len(results), 5)
+        self.assertTrue(all(result == {'items': ['egg']} for result, _ in results))
+        self.assertEqual(sorted(shared for _, shared in results), [False] + [True] * 4)
+        self.assertEqual(flight.stats()['in_flight'], 0)
+
+    def test_waiter_blocked_on_other_worker_reads_its_result(self):
+        query = '2 eggs and toast'
+        key = lookup_key(query)
+        LookupLock.objects.create(key=key, owner='other', expires_at=timezone.now() + timedelta(seconds=30))
+        service = CalorieNinjasService()
+
+        def other_worker_finishes(seconds):
+            # The lock holder caches its answer and releases the key
+            service._finish_lookup(query, [], {}, [], [{'name': 'egg', 'calories': 1.0}])
+            reset_lookup_caches()
+            LookupLock.objects.filter(key=key).delete()
+
+        with mock.patch('tracker.singleflight.time.sleep', side_effect=other_worker_finishes):
+            result = service.parse_food_query('2 Eggs and toast')
+
+        self.assertTrue(result['coalesced'])
+        self.assertEqual(result['items'][0]['name'], 'egg')
+        self.assertEqual(self.api.calls, 0)
+
+    def test_expired_lock_is_taken_over(self):
+        key = lookup_key('apple')
+        LookupLock.objects.create(key=key, owner='dead', expires_at=timezone.now() - timedelta(seconds=1))
+
+        result = CalorieNinjasService().parse_food_query('apple')
+
+        self.assertTrue(result['success'])
+        self.assertNotIn('coalesced', result)
+        self.assertEqual(self.api.queries, ['apple'])
+        self.assertFalse(LookupLock.objects.filter(key=key).exists())
+
+    async def test_async_callers_share_one_call(self):
+        service = AsyncCalorieNinjasService()
+        results = await asyncio.gather(*[
+            service.parse_food_query('chicken adobo and rice') for _ in range(3)
+        ])
+
+        self.assertEqual(self.api.queries, ['chicken adobo and rice'])
+        self.assertEqual(sum(1 for result in results if result.get('coalesced')), 2)
+        self.assertTrue(all(result['items'] == results[0]['items'] for result in results))
+
+    async def test_async_waiter_takes_over_from_a_cancelled_leader(self):
+        flight = AsyncSingleFlight()
+        started = asyncio.Event()
+
+        async def stuck():
+            started.set()
+            await asyncio.Event().wait()
+
+        async def work():
+            return 'egg'
+
+        leader = asyncio.create_task(flight.run('eggs', stuck))
+        await started.wait()
+        waiter = asyncio.create_task(flight.run('eggs', work))
+        await asyncio.sleep(0)
+        leader.cancel()
+
+        self.assertEqual(await waiter, ('egg', False))
+        with self.assertRaises(asyncio.CancelledError):
+            await leader
+        self.assertEqual(flight.stats(), {'leaders': 2, 'waiters': 1})
+
+    async def test_async_errors_reach_waiters_and_cancelled_waiters_leave_the_leader(self):
+        flight = AsyncSingleFlight()
+        release = asyncio.Event()
+
+        async def fail():
+            await release.wait()
+            raise ValueError('bad payload')
+
+        leader = asyncio.create_task(flight.run('eggs', fail))
+        await asyncio.sleep(0)
+        waiters = [asyncio.create_task(flight.run('eggs', fail)) for _ in range(2)]
+        await asyncio.sleep(0)
+        waiters[0].cancel()
+        await asyncio.sleep(0)
+        release.set()
+
+        results = await asyncio.gather(leader, *waiters, return_exceptions=True)
+        self.assertIsInstance(results[0], ValueError)
+        self.assertIsInstance(results[1], asyncio.CancelledError)
+        self.assertIsInstance(results[2], ValueError)
+        self.assertEqual(flight.stats()['leaders'], 1)
+
+
+class LocalFoodTests(TestCase):
+    def setUp(self):
+        self.api = FakeCalorieNinjas().start()
+        self.addCleanup(self.api.stop)
+        load_local_foods()
+
+    def test_parse_quantity(self):
+        self.assertEqual(parse_quantity('2 cups rice'), (2.0, 'cup', 'rice'))
+        self.assertEqual(parse_quantity('a 14 oz steak'), (14.0, 'oz', 'steak'))
+        self.assertEqual(parse_quantity('half a cup of rice'), (0.5, 'cup', 'rice'))
+        self.assertEqual(parse_quantity('2 dozen eggs'), (24.0, None, 'eggs'))
+        self.assertEqual(parse_quantity('banana'), (None, None, 'banana'))
+
+    def test_scales_by_unit(self):
+        self.assertEqual(local_food_index.resolve('2 cups rice')['serving_size_g'], 316.0)
+        self.assertEqual(local_food_index.resolve('2 eggs')['calories'], 143.0)
+        self.assertEqual(local_food_index.resolve('3.5 oz chicken breast')['serving_size_g'], 99.2)
+        self.assertEqual(local_food_index.resolve('banana')['serving_size_g'], 118.0)
+        # No known weight for a bowl of tuna
+        self.assertIsNone(local_food_index.resolve('2 bowls of tuna'))
+
+    def test_fuzzy_and_prefix_matching(self):
+        self.assertEqual(local_food_index.resolve('banan')['name'], 'banana')
+        self.assertEqual(local_food_index.resolve('chiken adobo')['name'], 'chicken adobo')
+        self.assertEqual(local_food_index.resolve('pizz')['name'], 'pizza')
+        self.assertIsNone(local_food_index.resolve('chicken'))
+        self.assertIsNone(local_food_index.resolve('beef stew'))
+
+    def test_common_foods_skip_the_api_and_database(self):
+        service = CalorieNinjasService()
+        service.parse_food_query('banana')
+
+        with self.assertNumQueries(0):
+            result = service.parse_food_query('2 eggs, 1 cup rice and a banana')
+
+        self.assertTrue(result['local'])
+        self.assertEqual([item['name'] for item in result['items']], ['egg', 'rice', 'banana'])
+        self.assertEqual(self.api.calls, 0)
+
+    def test_only_unmatched_segments_go_remote(self):
+        result = CalorieNinjasService().parse_food_query('14oz prime rib, mashed potatoes')
+
+        self.assertEqual(self.api.queries, ['14 oz prime rib'])
+        self.assertEqual([item['name'] for item in result['items']], ['prime rib', 'mashed potatoes'])
+        self.assertEqual(result['known_items'], 1)
+
+    def test_works_when_the_api_is_down(self):
+        self.api.fail = True
+        result = CalorieNinjasService().parse_food_query('chicken adobo and rice')
+        self.assertTrue(result['success'])
+        self.assertEqual(self.api.calls, 0)
+
+    @override_settings(LOCAL_FOODS={'ENABLED': False})
+    def test_can_be_disabled(self):
+        CalorieNinjasService().parse_food_query('banana')
+        self.assertEqual(self.api.queries, ['banana'])
+
+    def test_reload_updates_changed_rows_only(self):
+        LocalFood.objects.filter(name='rice').update(serving_size_g=1)
+        LocalFood.objects.create(name='my shake', nutrients={'calories': 50.0}, bundled=False)
+
+        counts = load_local_foods()
+
+        self.assertEqual(counts, {'created': 0, 'updated': 1, 'deleted': 0})
+        self.assertEqual(LocalFood.objects.get(name='rice').serving_size_g, 158.0)
+        self.assertTrue(LocalFood.objects.filter(name='my shake').exists())
+
+    async def test_async_service_resolves_locally(self):
+        result = await AsyncCalorieNinjasService().parse_food_query('2 slices of pizza')
+        self.assertTrue(result['local'])
+        self.assertEqual(result['items'][0]['serving_size_g'], 214.0)
+        self.assertEqual(self.api.calls, 0)
+
+
+class AutocompleteTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.today = timezone.now().date()
+        cls.user = User.objects.create_user('typer', 'typer@example.com', 'pass')
+        cls.others = [
+            User.objects.create_user(f'other{i}', f'other{i}@example.com', 'pass') for i in range(3)
+        ]
+        for user in cls.others:
+            FoodLog.objects.create(user=user, food_name='Chicken Adobo', calories=380,
+                                   natural_query='chicken adobo and rice', date=cls.today)
+        FoodLog.objects.create(user=cls.others[0], food_name='Secret', calories=1,
+                               natural_query='chocolate at the office', date=cls.today)
+
+    def setUp(self):
+        self.api = FakeCalorieNinjas().start()
+        self.addCleanup(self.api.stop)
+        self.client.force_login(self.user)
+        self.log = FoodLog.objects.create(
+            user=self.user, food_name='Egg + Toast', calories=587, natural_query='2 eggs and toast',
+            nutrition_data={'calories': 587, 'protein_g': 34.3}, date=self.today,
+        )
+
+    def _suggest(self, query):
+        response = self.client.get(reverse('tracker:suggest_foods'), {'q': query})
+        self.assertEqual(response.status_code, 200)
+        return response.json()['suggestions']
+
+    def test_prefix_index_ranks_by_weight(self):
+        index = PrefixIndex()
+        index.add('rice', weight=1)
+        index.add('Rice and beans', weight=3)
+        index.add('Egg + Toast', ['2 eggs and toast'])
+        self.assertEqual([entry['text'] for entry in index.search('ri', 5)], ['Rice and beans', 'rice'])
+        self.assertEqual([entry['text'] for entry in index.search('2 egg', 5)], ['Egg + Toast'])
+        self.assertEqual(index.search('zz', 5), [])
+
+    def test_suggests_own_history_then_common_foods(self):
+        suggestions = self._suggest('2 Eg')
+        self.assertEqual(suggestions[0]['text'], '2 eggs and toast')
+        self.assertEqual(suggestions[0]['log_id'], self.log.pk)
+        # Also found by food name
+        self.assertEqual(self._suggest('egg')[0]['log_id'], self.log.pk)
+
+        common = self._suggest('chick')
+        self.assertEqual([s['text'] for s in common], ['chicken adobo and rice'])
+        self.assertEqual(common[0]['source'], 'common')
+        # Meals only one other person logged stay private
+        self.assertEqual(self._suggest('choc'), [])
+
+    def test_new_logs_are_indexed_without_a_rebuild(self):
+        self._suggest('eg')
+        FoodLog.objects.create(user=self.user, food_name='Banana', calories=105,
+                               natural_query='banana smoothie', date=self.today)
+
+        with self.assertNumQueries(2):
+            suggestions = self._suggest('banana s')
+        self.assertEqual([s['text'] for s in suggestions], ['banana smoothie'])
+
+    def test_deleted_logs_are_dropped(self):
+        self._suggest('eg')
+        self.log.delete()
+        self.assertEqual(self._suggest('2 eg'), [])
+
+    def test_picked_suggestion_reuses_nutrition(self):
+        self.client.post(reverse('tracker:add_food_log'), {
+            'natural_query': '2 eggs and toast',
+            'suggestion_id': self.log.pk,
+            'meal_type': 'breakfast',
+            'date': self.today.isoformat(),
+        })
+
+        self.assertEqual(self.api.calls, 0)
+        new_log = FoodLog.objects.filter(user=self.user).latest('created_at')
+        self.assertNotEqual(new_log.pk, self.log.pk)
+        self.assertEqual(new_log.calories, 587)
+        self.assertEqual(new_log.protein_g, 34.3)
+
+    def test_edited_text_or_foreign_log_is_looked_up(self):
+        other_log = FoodLog.objects.filter(user=self.others[0]).first()
+        for query, log_id in (('3 eggs and toast', self.log.pk), ('chicken adobo and rice', other_log.pk)):
+            self.client.post(reverse('tracker:add_food_log'), {
+                'natural_query': query,
+                'suggestion_id': log_id,
+                'meal_type': 'lunch',
+                'date': self.today.isoformat(),
+            })
+        self.assertEqual(self.api.queries, ['3 eggs and toast', 'chicken adobo and rice'])
+
+    def test_short_queries_return_nothing(self):
+        self.assertEqual(self._suggest('e'), [])
+        self.assertEqual(suggestion_index.stats()['users']['entries'], 0)
+
+
+class RecipeTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.today = timezone.now().date()
+        cls.user = User.objects.create_user('cook', 'cook@example.com', 'pass')
+
+    def setUp(self):
+        self.api = FakeCalorieNinjas().start()
+        self.addCleanup(self.api.stop)
+        self.client.force_login(self.user)
+        self.recipe = create_recipe(self.user, 'Chicken Adobo', 4, ['500g chicken adobo', '300g rice'])
+
+    def _totals(self, recipe):
+        recipe.refresh_from_db()
+        return recipe.total_nutrition, recipe.total_weight_g
+
+    def _add(self, query):
+        self.client.post(reverse('tracker:add_food_log'), {
+            'natural_query': query,
+            'meal_type': 'dinner',
+            'date': self.today.isoformat(),
+        })
+        return FoodLog.objects.filter(user=self.user).latest('created_at')
+
+    def test_create_stores_totals_and_serving_share(self):
+        self.assertEqual(self.api.queries, ['500g chicken adobo', '300g rice'])
+        self.assertEqual(self.recipe.ingredients.count(), 2)
+        self.assertEqual(self.recipe.total_weight_g, 800.0)
+        total = self.recipe.total_nutrition['calories']
+        self.assertAlmostEqual(self.recipe.serving_nutrition['calories'], total / 4, places=2)
+
+    def test_incremental_changes_match_a_rebuild(self):
+        butter = add_ingredient(self.recipe, '1 tbsp butter')
+        rice = self.recipe.ingredients.get(text='300g rice')
+        update_ingredient(rice, '200g fried rice')
+        remove_ingredient(butter)
+        set_servings(self.recipe, 5)
+
+        incremental = self._totals(self.recipe)
+        rebuilt = rebuild_recipe(self.recipe)
+        for key, value in rebuilt.total_nutrition.items():
+            self.assertAlmostEqual(incremental[0][key], value, places=2)
+        self.assertAlmostEqual(incremental[1], rebuilt.total_weight_g, places=2)
+        self.assertAlmostEqual(rebuilt.serving_nutrition['calories'],
+                               rebuilt.total_nutrition['calories'] / 5, places=2)
+
+    def test_failed_lookup_saves_nothing(self):
+        self.api.fail = True
+        with self.assertRaises(IngredientLookupError):
+            create_recipe(self.user, 'Toast', 1, ['2 toast'])
+        with self.assertRaises(IngredientLookupError):
+            add_ingredient(self.recipe, '1 tbsp butter')
+        self.assertFalse(Recipe.objects.filter(name='Toast').exists())
+        self.assertEqual(self.recipe.ingredients.count(), 2)
+
+    def test_logging_servings_uses_stored_nutrition(self):
+        calls = self.api.calls
+        log = self._add('1.5 servings of my chicken adobo')
+
+        self.assertEqual(self.api.calls, calls)
+        self.assertEqual(log.food_name, 'Chicken Adobo')
+        self.assertAlmostEqual(log.calories, self.recipe.serving_nutrition['calories'] * 1.5, places=0)
+
+        # 200g is one serving of an 800g recipe that makes 4
+        self.assertEqual(match_recipe(self.user, '200g of my chicken adobo')[1], 1.0)
+        self.assertEqual(match_recipe(self.user, 'my Chicken Adobo')[1], 1.0)
+
+    def test_ordinary_meals_are_looked_up(self):
+        self._add('chicken adobo')
+        self.assertEqual(self.api.queries[-1], 'chicken adobo')
+        self.assertIsNone(match_recipe(self.user, '2 servings of my pancit'))
+        other = User.objects.create_user('neighbour', 'n@example.com', 'pass')
+        self.assertIsNone(match_recipe(other, 'my chicken adobo'))
+
+    def test_views_create_and_edit(self):
+        response = self.client.post(reverse('tracker:recipes'), {
+            'name': 'Breakfast plate', 'servings': 2, 'ingredients': '2 eggs\n\n2 toast',
+        })
+        recipe = Recipe.objects.get(user=self.user, name='Breakfast plate')
+        self.assertRedirects(response, reverse('tracker:recipe_detail', args=[recipe.pk]))
+        self.assertEqual(recipe.ingredients.count(), 2)
+
+        # Names are unique per user, ignoring case
+        response = self.client.post(reverse('tracker:recipes'), {
+            'name': 'breakfast PLATE', 'servings': 1, 'ingredients': '1 apple',
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(Recipe.objects.filter(user=self.user).count(), 2)
+
+        url = reverse('tracker:recipe_detail', args=[recipe.pk])
+        self.client.post(url, {'action': 'add', 'text': '1 banana'})
+        self.client.post(url, {'action': 'servings', 'servings': '3'})
+        recipe.refresh_from_db()
+        self.assertEqual(recipe.ingredients.count(), 3)
+        self.assertEqual(recipe.servings, 3)
+
+        self.client.post(reverse('tracker:delete_recipe', args=[recipe.pk]))
+        self.assertFalse(Recipe.objects.filter(pk=recipe.pk).exists())
+
+
+class FrequentFoodTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.today = timezone.now().date()
+        cls.user = User.objects.create_user('regular', 'regular@example.com', 'pass')
+
+    def setUp(self):
+        self.api = FakeCalorieNinjas().start()
+        self.addCleanup(self.api.stop)
+        self.client.force_login(self.user)
+
+    def _log(self, query='2 eggs and toast', **fields):
+        fields.setdefault('date', self.today - timedelta(days=3))
+        return FoodLog.objects.create(
+            user=self.user, food_name='Egg + Toast', calories=587, natural_query=query,
+            nutrition_data={'calories': 587, 'protein_g': 34.3}, meal_type='breakfast', **fields,
+        )
+
+    def _counts(self):
+        return dict(FrequentFood.objects.filter(user=self.user).values_list('lookup_key', 'log_count'))
+
+    def test_counts_follow_saves_and_deletes(self):
+        first = self._log('2 Eggs and Toast!')
+        second = self._log()
+        self._log('oatmeal')
+        self.assertEqual(self._counts(), {'2 eggs and toast': 2, 'oatmeal': 1})
+
+        # Edits do not count a log again
+        second.meal_type = 'lunch'
+        second.save()
+        first.delete()
+        self.assertEqual(self._counts(), {'2 eggs and toast': 1, 'oatmeal': 1})
+        second.delete()
+        self.assertEqual(self._counts(), {'oatmeal': 1})
+
+    def test_deleting_the_latest_log_restores_the_one_before(self):
+        older = self._log('2 eggs & toast', description='older')
+        self._log('2 eggs and toast with jam')
+        latest = self._log('2 Eggs and Toast!', description='latest')
+        FoodLog.objects.filter(pk=older.pk).update(
+            calories=400, meal_type='lunch', created_at=latest.created_at - timedelta(days=1),
+        )
+        older.refresh_from_db()
+
+        latest.delete()
+        food = FrequentFood.objects.get(user=self.user, lookup_key='2 eggs and toast')
+        self.assertEqual((food.log_count, food.last_logged_at), (1, older.created_at))
+        self.assertEqual((food.calories, food.description, food.meal_type), (400, 'older', 'lunch'))
+
+    def test_pending_logs_count_once_ready(self):
+        pending = self._log('pancit', status=FoodLog.STATUS_PENDING)
+        self.assertEqual(self._counts(), {})
+
+        pending = FoodLog.objects.get(pk=pending.pk)
+        pending.status = FoodLog.STATUS_READY
+        pending.save()
+        pending.save()
+        self.assertEqual(self._counts(), {'pancit': 1})
+
+    def test_rebuild_matches_incremental_counts(self):
+        for query in ('2 eggs and toast', 'oatmeal', '2 eggs and toast', 'pizza'):
+            self._log(query)
+        self._log('pizza').delete()
+        incremental = self._counts()
+
+        FrequentFood.objects.all().delete()
+        self.assertEqual(rebuild_frequent_foods(self.user), 3)
+        self.assertEqual(self._counts(), incremental)
+
+    def test_relog_choices(self):
+        for query in ('oatmeal', 'oatmeal', 'oatmeal', 'pizza', 'salad'):
+            self._log(query)
+        with self.assertNumQueries(2):
+            choices = relog_choices(self.user, limit=2)
+        self.assertEqual([food.lookup_key for food in choices['recent']], ['salad', 'pizza'])
+        self.assertEqual([food.lookup_key for food in choices['frequent']], ['oatmeal'])
+
+        response = self.client.get(reverse('tracker:home'))
+        self.assertContains(response, reverse('tracker:log_frequent_food', args=[choices['frequent'][0].pk]))
+
+    def test_log_again_copies_nutrition(self):
+        source = self._log()
+        response = self.client.post(reverse('tracker:log_again', args=[source.pk]), {'meal_type': 'snack'})
+        self.assertRedirects(response, reverse('tracker:home'))
+
+        self.assertEqual(self.api.calls, 0)
+        copy = FoodLog.objects.filter(user=self.user).latest('created_at')
+        self.assertNotEqual(copy.pk, source.pk)
+        self.assertEqual((copy.date, copy.meal_type, copy.calories, copy.protein_g),
+                         (self.today, 'snack', 587, 34.3))
+        self.assertEqual(self._counts(), {'2 eggs and toast': 2})
+
+    def test_log_frequent_food_keeps_meal_and_returns(self):
+        self._log()
+        food = FrequentFood.objects.get(user=self.user)
+        dashboard = reverse('tracker:dashboard') + '?date=' + self.today.isoformat()
+        response = self.client.post(reverse('tracker:log_frequent_food', args=[food.pk]), {'next': dashboard})
+        self.assertRedirects(response, dashboard)
+        copy = FoodLog.objects.filter(user=self.user, date=self.today).get()
+        self.assertEqual((copy.meal_type, copy.food_name), ('breakfast', 'Egg + Toast'))
+
+        # Off-site redirects are ignored
+        response = self.client.post(reverse('tracker:log_frequent_food', args=[food.pk]),
+                                    {'next': 'https://example.com/'})
+        self.assertRedirects(response, reverse('tracker:home'))
+
+    def test_log_again_rejects_bad_input(self):
+        source = self._log()
+        other = User.objects.create_user('stranger', 'stranger@example.com', 'pass')
+        foreign = FoodLog.objects.create(user=other, food_name='Pizza', calories=266, date=self.today)
+
+        tomorrow = (self.today + timedelta(days=1)).isoformat()
+        self.client.post(reverse('tracker:log_again', args=[source.pk]), {'date': tomorrow})
+        response = self.client.post(reverse('tracker:log_again', args=[foreign.pk]))
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(FoodLog.objects.filter(user=self.user).count(), 1)
+
+
+@override_settings(TRACKER_PAGE_CACHE={'ENABLED': True})
+class PageCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.today = timezone.now().date()
+        cls.user = User.objects.create_user('visitor', 'visitor@example.com', 'pass')
+        cls.idle = User.objects.create_user('idle', 'idle@example.com', 'pass')
+        seed_food_history(cls.user, days=10, logs_per_day=3)
+
+    def setUp(self):
+        caches['default'].clear()
+        self.client.force_login(self.user)
+
+    def _get(self, name='home', **params):
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.get(reverse(f'tracker:{name}'), params)
+        self.assertEqual(response.status_code, 200)
+        return response, [query['sql'] for query in captured.captured_queries]
+
+    def _assert_cached(self, queries):
+        # Session, user and the ETag query; the page comes from the cache
+        self.assertEqual(len(queries), 3, '\n'.join(queries))
+        self.assertFalse([sql for sql in queries if 'SUM(' in sql or 'tracker_dailynutritionsummary' in sql])
+
+    def test_repeat_visits_skip_the_aggregates(self):
+        self._get('home')
+        self._assert_cached(self._get('home')[1])
+
+        self._get('dashboard', range='30')
+        self._assert_cached(self._get('dashboard', range='30')[1])
+        # Another day or range is another entry
+        _, queries = self._get('dashboard', range='90')
+        self.assertGreater(len(queries), 3)
+
+    def test_log_writes_invalidate_the_owner_only(self):
+        self.client.force_login(self.idle)
+        self._get('home')
+        self.client.force_login(self.user)
+        self._get('home')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            log = FoodLog.objects.create(user=self.user, food_name='Midnight Pizza', calories=800,
+                                         meal_type='snack', date=self.today)
+        response, _ = self._get('home')
+        self.assertContains(response, 'Midnight Pizza')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            log.delete()
+        response, _ = self._get('home')
+        self.assertNotContains(response, 'Midnight Pizza')
+
+        self.client.force_login(self.idle)
+        self._assert_cached(self._get('home')[1])
+
+    def test_bump_waits_for_commit(self):
+        self._get('home')
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            bump_page_version(self.user.pk)
+            bump_page_version(self.user.pk)
+            # Not committed yet: the page built from committed data still stands
+            self._assert_cached(self._get('home')[1])
+        self.assertEqual(len(callbacks), 2)
+        self.assertGreater(len(self._get('home')[1]), 3)
+
+        self._get('home')
+        bump_all_page_versions()
+        self.assertGreater(len(self._get('home')[1]), 3)
+
+    def test_warm_dashboards(self):
+        out = io.StringIO()
+        call_command('warm_dashboards', stdout=out)
+        self.assertIn('Warmed pages for 1 users', out.getvalue())
+
+        self._assert_cached(self._get('home')[1])
+        self._assert_cached(self._get('dashboard')[1])
+
+    def test_home_reads_today_with_one_query(self):
+        FoodLog.objects.create(user=self.user, food_name='Late Toast', calories=150, protein_g=5,
+                               meal_type='snack', date=self.today)
+        # Today's logs, then the two log-again lists
+        with self.assertNumQueries(3):
+            context = build_home_context(self.user, self.today)
+
+        self.assertEqual([meal['meal_type'] for meal in context['meals']],
+                         ['breakfast', 'lunch', 'dinner', 'snack'])
+        self.assertEqual([log.food_name for log in context['meals'][3]['logs']], ['Late Toast'])
+        summary = DailyNutritionSummary.objects.get(user=self.user, date=self.today)
+        self.assertEqual(context['meal_counts'], summary.meal_counts())
+        self.assertEqual(context['total_logs_today'], summary.log_count)
+        for field, value in summary.as_nutrition_dict().items():
+            self.assertAlmostEqual(context['nutrition_totals'][field], value, places=6)
+
+    def test_unknown_meal_types_count_as_snacks_everywhere(self):
+        FoodLog.objects.create(user=self.user, food_name='Brunch Waffles', calories=450,
+                               meal_type='brunch', date=self.today)
+        context = build_home_context(self.user, self.today)
+        summary = DailyNutritionSummary.objects.get(user=self.user, date=self.today)
+        self.assertEqual(context['meal_counts'], summary.meal_counts())
+        self.assertEqual(sum(summary.meal_counts().values()), summary.log_count)
+        self.assertIn('Brunch Waffles', [log.food_name for log in context['meals'][-1]['logs']])
+
+        rebuild_daily_summaries(self.user)
+        self.assertEqual(DailyNutritionSummary.objects.get(user=self.user, date=self.today).meal_counts(),
+                         context['meal_counts'])
+
+    @override_settings(TRACKER_PAGE_CACHE={'ENABLED': False})
+    def test_disabled_cache_builds_every_time(self):
+        self._get('home')
+        _, queries = self._get('home')
+        self.assertGreater(len(queries), 3)
+
+
+class ConditionalGetTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.today = timezone.now().date()
+        cls.user = User.objects.create_user('flipper', 'flipper@example.com', 'pass')
+        cls.other = User.objects.create_user('bystander', 'bystander@example.com', 'pass')
+        cls.log = FoodLog.objects.create(user=cls.user, food_name='Oatmeal', calories=150,
+                                         meal_type='breakfast', date=cls.today)
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def _etag(self, name='home', **params):
+        response = self.client.get(reverse(f'tracker:{name}'), params)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('private', response['Cache-Control'])
+        self.assertIn('no-cache', response['Cache-Control'])
+        return response['ETag']
+
+    def _revalidate(self, etag, name='home', **params):
+        return self.client.get(reverse(f'tracker:{name}'), params, HTTP_IF_NONE_MATCH=etag)
+
+    def test_unchanged_page_is_a_304_before_any_work(self):
+        etag = self._etag()
+        with CaptureQueriesContext(connection) as captured:
+            response = self._revalidate(etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+        # Session, user and the ETag query
+        self.assertEqual(len(captured), 3, _format_queries(captured.captured_queries))
+
+        dashboard = self._etag('dashboard', range='30')
+        self.assertEqual(self._revalidate(dashboard, 'dashboard', range='30').status_code, 304)
+        self.assertEqual(self._revalidate(dashboard, 'dashboard', range='90').status_code, 200)
+
+    def test_log_changes_move_the_etag(self):
+        etag = self._etag()
+        FoodLog.objects.create(user=self.other, food_name='Pizza', calories=266, date=self.today)
+        self.assertEqual(self._revalidate(etag).status_code, 304)
+
+        added = FoodLog.objects.create(user=self.user, food_name='Banana', calories=105, date=self.today)
+        self.assertEqual(self._revalidate(etag).status_code, 200)
+
+        etag = self._etag()
+        added.delete()
+        self.assertEqual(self._revalidate(etag).status_code, 200)
+
+        etag = self._etag()
+        self.log.meal_type = 'snack'
+        self.log.save()
+        self.assertEqual(self._revalidate(etag).status_code, 200)
+
+    def test_pending_messages_skip_revalidation(self):
+        etag = self._etag()
+        self.client.post(reverse('tracker:delete_food_log', args=[self.log.pk]))
+        response = self._revalidate(etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('ETag', response)
+        self.assertContains(response, 'Oatmeal has been deleted')
+
+
+class StatisticsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.end = date(2026, 3, 31)
+        cls.user = User.objects.create_user('counter', 'counter@example.com', 'pass')
+        cls.other = User.objects.create_user('bystander', 'bystander@example.com', 'pass')
+        seed_food_history(cls.user, days=60, logs_per_day=3, end_date=cls.end)
+        seed_food_history(cls.other, days=20, logs_per_day=4, end_date=cls.end)
+
+    def test_one_query_per_call(self):
+        with self.assertNumQueries(1):
+            stats = log_statistics(user=self.user, bucket='month')
+        self.assertEqual(stats['total_logs'], 180)
+        self.assertEqual(stats['date_range_start'], self.end - timedelta(days=59))
+        self.assertEqual(stats['date_range_end'], self.end)
+        self.assertEqual(stats['meal_counts'], {'breakfast': 60, 'lunch': 60, 'dinner': 60, 'snack': 0})
+        self.assertEqual([item['bucket'] for item in stats['buckets']],
+                         [date(2026, 1, 1), date(2026, 2, 1), date(2026, 3, 1)])
+        self.assertEqual(sum(item['count'] for item in stats['buckets']), 180)
+
+        with self.assertNumQueries(1):
+            weekly = calculate_weekly_summary(end_date=self.end, user=self.user)
+        self.assertEqual([day['count'] for day in weekly], [3] * 7)
+        self.assertEqual(weekly[-1]['date'], '03/31')
+
+        with self.assertNumQueries(1):
+            summary = calculate_statistics(user=self.user)
+        self.assertEqual(summary['avg_logs_per_day'], 3.0)
+        self.assertEqual(summary['most_frequent_meal']['count'], 60)
+
+    def test_scoped_to_user_and_range(self):
+        stats = log_statistics(user=self.other, start_date=self.end - timedelta(days=6),
+                               end_date=self.end, bucket='week')
+        self.assertEqual(stats['total_logs'], 28)
+        self.assertEqual(stats['meal_counts']['snack'], 7)
+        everyone = FoodLog.objects.all()
+        self.assertEqual(log_statistics(everyone, end_date=self.end)['total_logs'],
+                         everyone.filter(date__lte=self.end).count())
+        with self.assertRaises(ValueError):
+            log_statistics(end_date=self.end)
+
+        chart = prepare_chart_data(user=self.other, days=30, end_date=self.end)
+        self.assertEqual(len(chart['daily_counts']), 30)
+        self.assertEqual([day['count'] for day in chart['daily_counts'][:10]], [0] * 10)
+        self.assertEqual(chart['meal_distribution'][0]['count'], 20)
+
+        # The meal distribution covers all of the user's logs, not just the charted days
+        with self.assertNumQueries(2):
+            chart = prepare_chart_data(user=self.other, days=3, end_date=self.end)
+        self.assertEqual(sum(day['count'] for day in chart['daily_counts']), 12)
+        self.assertEqual({item['count'] for item in chart['meal_distribution']}, {20})
+        recent = FoodLog.objects.filter(date__gt=self.end - timedelta(days=3))
+        self.assertEqual(get_meal_type_distribution(recent, user=self.other)[0]['count'], 3)
+
+        self.assertEqual(calculate_statistics(user=User.objects.create_user('empty'))['total_logs'], 0)
+        with self.assertRaises(ValueError):
+            log_statistics(user=self.user, bucket='hour')
+
+
+class TrendTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.end = date(2026, 3, 31)
+        cls.user = User.objects.create_user('trender', 'trender@example.com', 'pass')
+        # Five years of rollups; every fifth day was never logged
+        cls.history = {}
+        for offset in range(1826):
+            if offset % 5 == 4:
+                continue
+            day = cls.end - timedelta(days=offset)
+            cls.history[day] = 1500 + (offset * 37) % 1000
+        DailyNutritionSummary.objects.bulk_create([
+            DailyNutritionSummary(user=cls.user, date=day, calories=calories, protein=calories / 20,
+                                  carbs=calories / 8, fat=calories / 30, log_count=1)
+            for day, calories in cls.history.items()
+        ])
+
+    def _average(self, end, window):
+        days = [end - timedelta(days=offset) for offset in range(window)]
+        values = [self.history[day] for day in days if day in self.history]
+        return sum(values) / len(values)
+
+    def test_rolling_windows_match_a_day_by_day_average(self):
+        with self.assertNumQueries(1):
+            trends = build_trends(self.user, self.end, days=1825)
+        self.assertEqual(len(trends['dates']), 1825)
+        self.assertEqual(trends['dates'][-1], '2026-03-31')
+        self.assertEqual(trends['days_logged'], 1460)
+
+        calories = trends['series']['calories']
+        for index in (100, 400, 1824):
+            day = self.end - timedelta(days=1824 - index)
+            for window in (7, 30, 90):
+                self.assertAlmostEqual(calories[f'avg_{window}'][index], self._average(day, window), places=1)
+            self.assertAlmostEqual(
+                calories['wow_delta'][index],
+                self._average(day, 7) - self._average(day - timedelta(days=7), 7),
+                places=0,
+            )
+        self.assertEqual(trends['latest']['calories']['avg_7'], calories['avg_7'][-1])
+
+    def test_streaks_count_days_on_goal(self):
+        streaker = User.objects.create_user('streaker')
+        goals = get_trend_goals()
+        on_goal = {'calories': goals['calories'], 'protein': goals['protein'],
+                   'carbs': goals['carbs'], 'fat': goals['fat']}
+        # Four days on goal, one day over on calories only, then two on goal;
+        # today has no logs yet and does not break the streak
+        days = {self.end - timedelta(days=offset): dict(on_goal) for offset in range(1, 8)}
+        days[self.end - timedelta(days=3)]['calories'] *= 1.5
+        DailyNutritionSummary.objects.bulk_create([
+            DailyNutritionSummary(user=streaker, date=day, log_count=1, **values)
+            for day, values in days.items()
+        ])
+
+        trends = build_trends(streaker, self.end, days=30)
+        self.assertEqual(trends['streaks']['calories'], {'current': 2, 'longest': 4})
+        self.assertEqual(trends['streaks']['protein'], {'current': 7, 'longest': 7})
+        self.assertIsNone(trends['series']['calories']['avg_7'][0])
+
+    def test_page_and_api(self):
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('tracker:trends'), {'days': '365'})
+        self.assertContains(response, '7-day avg')
+        self.assertEqual(response.context['days'], 365)
+
+        url = reverse('tracker:api_trends')
+        body = self.client.get(url, {'end': '2026-03-31', 'days': '30'}).json()
+        self.assertEqual((body['start'], body['end']), ('2026-03-02', '2026-03-31'))
+        self.assertEqual(set(body['streaks']), {'calories', 'protein', 'carbs', 'fat'})
+        self.assertEqual(self.client.get(url, {'days': '3'}).status_code, 400)
+        self.assertEqual(self.client.get(url, {'end': 'soon'}).status_code, 400)
+
+
+class AsyncAddFoodLogTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('async', 'async@example.com', 'pass')
+
+    def setUp(self):
+        self.api = FakeCalorieNinjas().start()
+        self.addCleanup(self.api.stop)
+
+    async def _post(self, data):
+        request = AsyncRequestFactory().post(reverse('tracker:add_food_log'), data)
+        request.user = self.user
+
+        async def auser():
+            return self.user
+
+        request.auser = auser
+        request.session = SessionStore()
+        request._messages = FallbackStorage(request)
+        return await views.add_food_log_async(request)
+
+    async def test_logs_food_with_nutrition(self):
+        today = timezone.now().date().isoformat()
+        response = await self._post({'natural_query': '2 eggs and toast', 'meal_type': 'breakfast', 'date': today})
+        self.assertEqual(response.status_code, 302)
+
+        log = await FoodLog.objects.aget(user=self.user)
+        self.assertEqual(log.natural_query, '2 eggs and toast')
+        self.assertEqual(log.calories, 587.0)
+        self.assertEqual(log.protein_g, 34.3)
+        summary = await DailyNutritionSummary.objects.aget(user=self.user)
+        self.assertEqual(summary.breakfast_count, 1)
+        self.assertEqual(self.api.queries, ['2 eggs and toast'])
+
+    async def test_invalid_form_rerenders_home(self):
+        response = await self._post({'natural_query': 'apple', 'meal_type': 'brunch', 'date': 'soon'})
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(await FoodLog.objects.filter(user=self.user).aexists())
+        self.assertEqual(self.api.calls, 0)
@@ -0,0 +1,209 @@
+"""
+Rolling nutrition trends over a user's daily history.
+
+The daily rollups (DailyNutritionSummary) for the requested span are read
+with one query into a contiguous float array. It has one row per calendar
+day and one column per nutrient, and days without logs are zero rows
+marked False in a `logged` mask. Every rolling window is the difference of
+two rows of the cumulative sum. So the 7/30/90-day averages, the
+week-over-week deltas and the goal streaks take a handful of array
+operations, even for a five-year history.
+
+Averages are taken over the days that have logs. A day the user forgot to
+log is skipped instead of counting as a fast.
+"""
+from datetime import timedelta
+
+import numpy as np
+from django.conf import settings
+
+from .models import DailyNutritionSummary
+from .summaries import MAX_CHART_DAYS
+
+TREND_FIELDS = ['calories', 'protein', 'carbs', 'fat']
+TREND_WINDOWS = (7, 30, 90)
+DEFAULT_TREND_DAYS = 90
+TREND_RANGES = [30, 90, 365, 1825]
+
+# A day is on goal when its total is within this fraction of the goal
+GOAL_TOLERANCE = 0.1
+
+# Trend field -> (label, unit, FOOD_TRACKER_SETTINGS goal key, fallback goal)
+FIELD_INFO = {
+    'calories': ('Calories', 'kcal', 'DEFAULT_CALORIE_GOAL', 2000),
+    'protein': ('Protein', 'g', 'DEFAULT_PROTEIN_GOAL', 150),
+    'carbs': ('Carbs', 'g', 'DEFAULT_CARBS_GOAL', 250),
+    'fat': ('Fat', 'g', 'DEFAULT_FATS_GOAL', 65),
+}
+
+
+def get_trend_goals():
+    """
+    Daily goal per trend field, from FOOD_TRACKER_SETTINGS
+    """
+    config = getattr(settings, 'FOOD_TRACKER_SETTINGS', {}) or {}
+    return {
+        field: float(config.get(setting, fallback))
+        for field, (_, _, setting, fallback) in FIELD_INFO.items()
+    }
+
+
+def parse_trend_days(value):
+    """
+    Number of days to show, from ?days=; falls back to DEFAULT_TREND_DAYS
+    """
+    try:
+        days = int(value)
+    except (TypeError, ValueError):
+        return DEFAULT_TREND_DAYS
+    return min(max(days, min(TREND_WINDOWS)), MAX_CHART_DAYS)
+
+
+def load_daily_series(user, start, end):
+    """
+    One user's daily totals from start to end as arrays
+
+    Returns:
+        tuple: (values, logged). values is a float array of shape
+               (days, len(TREND_FIELDS)) and logged is a bool array of
+               shape (days,). Row i is start + i days.
+    """
+    days = (end - start).days + 1
+    values = np.zeros((days, len(TREND_FIELDS)))
+    logged = np.zeros(days, dtype=bool)
+
+    rows = list(
+        DailyNutritionSummary.objects
+        .filter(user=user, date__range=(start, end))
+        .order_by()
+        .values_list('date', *TREND_FIELDS)
+    )
+    if rows:
+        offsets = np.fromiter((row[0].toordinal() for row in rows), dtype=np.int64, count=len(rows))
+        offsets -= start.toordinal()
+        values[offsets] = np.array([row[1:] for row in rows], dtype=float)
+        logged[offsets] = True
+    return values, logged
+
+
+def rolling_means(values, logged, window):
+    """
+    Mean over the logged days of the `window` days ending on each day; NaN
+    where none of them were logged
+    """
+    count = len(values)
+    sums = np.zeros((count + 1, values.shape[1]))
+    np.cumsum(values, axis=0, out=sums[1:])
+    logged_days = np.zeros(count + 1)
+    np.cumsum(logged, out=logged_days[1:])
+
+    ends = np.arange(1, count + 1)
+    starts = np.maximum(ends - window, 0)
+    window_days = logged_days[ends] - logged_days[starts]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        means = (sums[ends] - sums[starts]) / window_days[:, None]
+    means[window_days == 0] = np.nan
+    return means
+
+
+def run_lengths(flags):
+    """
+    Length of the run of True values ending on each row, per column
+    """
+    index = np.arange(len(flags))[:, None]
+    last_break = np.maximum.accumulate(np.where(flags, -1, index), axis=0)
+    return index - last_break
+
+
+def compute_trends(values, logged, goals, windows=TREND_WINDOWS, tolerance=GOAL_TOLERANCE):
+    """
+    Rolling averages, week-over-week deltas and goal adherence for a daily
+    series from load_daily_series
+
+    Returns:
+        dict: avg_<window> for each window and wow_delta (change of the
+              7-day average against seven days earlier), each of shape
+              (days, fields), and on_goal (bool, same shape)
+    """
+    result = {f'avg_{window}': rolling_means(values, logged, window) for window in windows}
+
+    weekly = result['avg_7'] if 7 in windows else rolling_means(values, logged, 7)
+    wow_delta = np.full_like(weekly, np.nan)
+    wow_delta[7:] = weekly[7:] - weekly[:-7]
+    result['wow_delta'] = wow_delta
+
+    targets = np.array([goals[field] for field in TREND_FIELDS])
+    result['on_goal'] = logged[:, None] & (np.abs(values - targets) <= tolerance * targets)
+    return result
+
+
+def _json_column(column):
+    """
+    Round to one decimal and turn NaN into None, for JSON
+    """
+    rounded = np.round(column, 1).astype(object)
+    rounded[np.isnan(column)] = None
+    return rounded.tolist()
+
+
+def build_trends(user, end, days=DEFAULT_TREND_DAYS):
+    """
+    Trends for the `days` days ending on `end`, ready for JSON
+
+    Enough history before the range is loaded that the first shown day
+    already has full windows. Streaks only count days inside the range. A
+    last day with no logs yet does not break the current streak.
+    """
+    lookback = max(TREND_WINDOWS) - 1
+    start = end - timedelta(days=days - 1)
+    values, logged = load_daily_series(user, start - timedelta(days=lookback), end)
+    goals = get_trend_goals()
+    trends = compute_trends(values, logged, goals)
+
+    shown = slice(lookback, None)
+    runs = run_lengths(trends['on_goal'][shown])
+    current = runs[-1] if logged[-1] or len(runs) < 2 else runs[-2]
+    metrics = [f'avg_{window}' for window in TREND_WINDOWS] + ['wow_delta']
+    dates = np.arange(np.datetime64(start), np.datetime64(end) + 1)
+
+    series = {}
+    latest = {}
+    streaks = {}
+    for column, field in enumerate(TREND_FIELDS):
+        series[field] = {metric: _json_column(trends[metric][shown, column]) for metric in metrics}
+        latest[field] = {metric: points[-1] for metric, points in series[field].items()}
+        streaks[field] = {'current': int(current[column]), 'longest': int(runs[:, column].max())}
+
+    return {
+        'start': start.isoformat(),
+        'end': end.isoformat(),
+        'days': days,
+        'days_logged': int(logged[shown].sum()),
+        'fields': TREND_FIELDS,
+        'windows': list(TREND_WINDOWS),
+        'goals': goals,
+        'goal_tolerance': GOAL_TOLERANCE,
+        'dates': dates.astype(str).tolist(),
+        'series': series,
+        'latest': latest,
+        'streaks': streaks,
+    }
+
+
+def trend_table(trends):
+    """
+    One row per field with its label, goal, latest averages and streaks,
+    for the trends page
+    """
+    rows = []
+    for field in trends['fields']:
+        label, unit, _, _ = FIELD_INFO[field]
+        rows.append({
+            'field': field,
+            'label': label,
+            'unit': unit,
+            'goal': trends['goals'][field],
+            **trends['latest'][field],
+            **trends['streaks'][field],
+        })
+    return rows
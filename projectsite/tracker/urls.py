@@ -1,18 +1,41 @@
+from django.conf import settings
 from django.urls import path
-from . import views
+from . import api, views
 
 app_name = 'tracker'
 
 urlpatterns = [
     path('', views.home, name='home'),
     path('dashboard/', views.dashboard, name='dashboard'),
+    path('trends/', views.trends, name='trends'),
     
     # Food log management
-    path('add/', views.add_food_log, name='add_food_log'),
+    path(
+        'add/',
+        views.add_food_log_async if settings.TRACKER_ASYNC_VIEWS else views.add_food_log,
+        name='add_food_log',
+    ),
     path('edit/<int:pk>/', views.edit_food_log, name='edit_food_log'),
     path('delete/<int:pk>/', views.delete_food_log, name='delete_food_log'),
+    path('again/<int:pk>/', views.log_again, name='log_again'),
+    path('again/frequent/<int:pk>/', views.log_frequent_food, name='log_frequent_food'),
+    path('logs/status/', views.food_log_status, name='food_log_status'),
+    path('suggest/', views.suggest_foods, name='suggest_foods'),
+    path('export/', views.export_food_logs, name='export_food_logs'),
+    path('import/', views.import_food_logs, name='import_food_logs'),
+    
+    # Recipes
+    path('recipes/', views.recipes, name='recipes'),
+    path('recipes/<int:pk>/', views.recipe_detail, name='recipe_detail'),
+    path('recipes/<int:pk>/delete/', views.delete_recipe, name='delete_recipe'),
     
     # User management
     path('profile/', views.profile, name='profile'),
     path('settings/', views.settings, name='settings'),
+    
+    # JSON API
+    path('api/v1/logs/', api.food_logs, name='api_food_logs'),
+    path('api/v1/summaries/daily/', api.daily_totals, name='api_daily_totals'),
+    path('api/v1/summaries/meals/', api.meal_counts, name='api_meal_counts'),
+    path('api/v1/trends/', api.trends, name='api_trends'),
 ]
\ No newline at end of file
@@ -1,9 +1,19 @@
-from django.db.models import Count, Q
+from django.db.models import Count, F, Max, Min
+from django.db.models.functions import TruncMonth, TruncWeek, TruncYear
 from datetime import timedelta, date
 from .models import FoodLog
 
 
-def get_date_range_logs(start_date=None, end_date=None, meal_type=None):
+# Statistics bucket -> expression mapping a log's date to the start of its bucket
+STAT_BUCKETS = {
+    'day': lambda: F('date'),
+    'week': lambda: TruncWeek('date'),
+    'month': lambda: TruncMonth('date'),
+    'year': lambda: TruncYear('date'),
+}
+
+
+def get_date_range_logs(start_date=None, end_date=None, meal_type=None, user=None):
     """
     Get food logs filtered by date range and meal type.
 
@@ -11,12 +21,15 @@ def get_date_range_logs(start_date=None, end_date=None, meal_type=None):
         start_date: Start date for filtering (optional)
         end_date: End date for filtering (optional)
         meal_type: Meal type to filter by (optional)
+        user: Only this user's logs (optional)
 
     Returns:
         QuerySet of filtered FoodLog objects
     """
     logs = FoodLog.objects.all()
 
+    if user is not None:
+        logs = logs.filter(user=user)
     if start_date:
         logs = logs.filter(date__gte=start_date)
     if end_date:
@@ -27,12 +40,97 @@ def get_date_range_logs(start_date=None, end_date=None, meal_type=None):
     return logs
 
 
-def calculate_weekly_summary(end_date=None):
+def log_statistics(queryset=None, user=None, start_date=None, end_date=None, bucket='day'):
+    """
+    Count, date span, per-meal distribution and per-bucket counts of food
+    logs from one GROUP BY (bucket, meal_type) query.
+
+    The result has one row per bucket and meal type, so it stays small for
+    long histories with coarse buckets; everything else is folded from it.
+    A user or a queryset is required, so the statistics are never taken over
+    every user's logs by accident.
+
+    Args:
+        queryset: FoodLog queryset to start from (optional with a user)
+        user: Only this user's logs (optional with a queryset)
+        start_date: First day to include (optional)
+        end_date: Last day to include (optional)
+        bucket: 'day', 'week', 'month' or 'year'
+
+    Returns:
+        Dictionary with total_logs, date_range_start, date_range_end,
+        meal_counts (every meal type, zero when unused) and buckets (a list of
+        {'bucket': date, 'count': int} in date order, empty buckets omitted)
+    """
+    if bucket not in STAT_BUCKETS:
+        raise ValueError(f"Unknown statistics bucket: {bucket}")
+    if user is None and queryset is None:
+        raise ValueError("log_statistics needs a user or a queryset")
+
+    logs = queryset if queryset is not None else FoodLog.objects.all()
+    if user is not None:
+        logs = logs.filter(user=user)
+    if start_date:
+        logs = logs.filter(date__gte=start_date)
+    if end_date:
+        logs = logs.filter(date__lte=end_date)
+
+    rows = logs.order_by().values(
+        'meal_type', period=STAT_BUCKETS[bucket]()
+    ).annotate(
+        count=Count('id'), first_date=Min('date'), last_date=Max('date')
+    ).order_by('period')
+
+    meal_counts = {meal_type: 0 for meal_type, _ in FoodLog.MEAL_TYPE_CHOICES}
+    bucket_counts = {}
+    first_date = last_date = None
+    for row in rows:
+        meal_counts[row['meal_type']] = meal_counts.get(row['meal_type'], 0) + row['count']
+        bucket_counts[row['period']] = bucket_counts.get(row['period'], 0) + row['count']
+        first_date = min(first_date or row['first_date'], row['first_date'])
+        last_date = max(last_date or row['last_date'], row['last_date'])
+
+    return {
+        'total_logs': sum(bucket_counts.values()),
+        'date_range_start': first_date,
+        'date_range_end': last_date,
+        'meal_counts': meal_counts,
+        'buckets': [{'bucket': period, 'count': count} for period, count in bucket_counts.items()],
+    }
+
+
+def _meal_distribution(meal_counts):
+    """
+    Non-zero meal counts as [{'meal_type', 'count'}], most frequent first
+    """
+    distribution = [
+        {'meal_type': meal_type, 'count': count}
+        for meal_type, count in meal_counts.items() if count
+    ]
+    return sorted(distribution, key=lambda item: -item['count'])
+
+
+def _daily_counts(stats, start_date, end_date):
+    """
+    One {'date': 'mm/dd', 'count'} entry per day, zero-filled
+    """
+    counts = {item['bucket']: item['count'] for item in stats['buckets']}
+    return [
+        {
+            'date': (start_date + timedelta(days=offset)).strftime('%m/%d'),
+            'count': counts.get(start_date + timedelta(days=offset), 0),
+        }
+        for offset in range((end_date - start_date).days + 1)
+    ]
+
+
+def calculate_weekly_summary(end_date=None, *, user):
     """
     Calculate summary of logs for the last 7 days.
 
     Args:
         end_date: End date for the week (defaults to today)
+        user: Whose logs to count (required)
 
     Returns:
         List of dictionaries with date and count
@@ -41,68 +139,57 @@ def calculate_weekly_summary(end_date=None):
         end_date = date.today()
 
     start_date = end_date - timedelta(days=6)
-    summary = []
-    current_date = start_date
-
-    while current_date <= end_date:
-        count = FoodLog.objects.filter(date=current_date).count()
-        summary.append({
-            'date': current_date.strftime('%m/%d'),
-            'count': count
-        })
-        current_date += timedelta(days=1)
+    stats = log_statistics(user=user, start_date=start_date, end_date=end_date)
+    return _daily_counts(stats, start_date, end_date)
 
-    return summary
 
-
-def get_meal_type_distribution(queryset=None):
+def get_meal_type_distribution(queryset, user=None):
     """
     Get distribution of meals by type.
 
     Args:
-        queryset: FoodLog queryset (defaults to all logs)
+        queryset: FoodLog queryset (required)
+        user: Only count this user's logs (optional)
 
     Returns:
         List of dictionaries with meal_type and count
     """
-    if queryset is None:
-        queryset = FoodLog.objects.all()
-
-    distribution = queryset.values('meal_type').annotate(
-        count=Count('id')
-    ).order_by('-count')
+    stats = log_statistics(queryset, user=user, bucket='year')
+    return _meal_distribution(stats['meal_counts'])
 
-    return list(distribution)
 
-
-def get_most_frequent_meal_type(queryset=None):
+def get_most_frequent_meal_type(queryset, user=None):
     """
     Find the most frequently logged meal type.
 
     Args:
-        queryset: FoodLog queryset (defaults to all logs)
+        queryset: FoodLog queryset (required)
+        user: Only count this user's logs (optional)
 
     Returns:
         Dictionary with meal_type and count, or None
     """
-    distribution = get_meal_type_distribution(queryset)
+    distribution = get_meal_type_distribution(queryset, user=user)
     return distribution[0] if distribution else None
 
 
-def calculate_statistics(queryset=None):
+def calculate_statistics(queryset=None, *, user, start_date=None, end_date=None):
     """
     Calculate comprehensive statistics for food logs.
 
     Args:
-        queryset: FoodLog queryset (defaults to all logs)
+        queryset: FoodLog queryset to narrow the user's logs (optional)
+        user: Whose logs to count (required)
+        start_date: First day to include (optional)
+        end_date: Last day to include (optional)
 
     Returns:
         Dictionary with various statistics
     """
-    if queryset is None:
-        queryset = FoodLog.objects.all()
+    # Yearly buckets keep the grouped result to a handful of rows
+    stats = log_statistics(queryset, user=user, start_date=start_date, end_date=end_date, bucket='year')
 
-    total_logs = queryset.count()
+    total_logs = stats['total_logs']
     if total_logs == 0:
         return {
             'total_logs': 0,
@@ -112,47 +199,47 @@ def calculate_statistics(queryset=None):
             'date_range_end': None,
         }
 
-    # Get date range
-    date_range_start = queryset.order_by('date').first().date
-    date_range_end = queryset.order_by('-date').first().date
+    date_range_start = stats['date_range_start']
+    date_range_end = stats['date_range_end']
     total_days = (date_range_end - date_range_start).days + 1
 
     # Calculate averages
     avg_logs_per_day = total_logs / total_days if total_days > 0 else 0
 
-    # Get most frequent meal
-    most_frequent_meal = get_most_frequent_meal_type(queryset)
+    distribution = _meal_distribution(stats['meal_counts'])
 
     return {
         'total_logs': total_logs,
         'avg_logs_per_day': round(avg_logs_per_day, 1),
-        'most_frequent_meal': most_frequent_meal,
+        'most_frequent_meal': distribution[0] if distribution else None,
         'date_range_start': date_range_start,
         'date_range_end': date_range_end,
     }
 
 
-def prepare_chart_data(queryset=None, days=7):
+def prepare_chart_data(queryset=None, days=7, *, user, end_date=None):
     """
     Prepare data for Chart.js visualization.
 
     Args:
-        queryset: FoodLog queryset (defaults to all logs)
+        queryset: FoodLog queryset to narrow the user's logs (optional)
         days: Number of days to include in daily chart
+        user: Whose logs to chart (required)
+        end_date: Last charted day (defaults to today)
 
     Returns:
-        Dictionary with chart data
+        Dictionary with chart data; the daily chart covers the last `days`
+        days and the meal distribution all of the user's logs
     """
-    if queryset is None:
-        queryset = FoodLog.objects.all()
-
-    # Daily data for line chart
-    daily_data = calculate_weekly_summary()
-
-    # Meal type distribution for pie chart
-    meal_distribution = get_meal_type_distribution(queryset)
+    end_date = end_date or date.today()
+    start_date = end_date - timedelta(days=days - 1)
+    stats = log_statistics(queryset, user=user, start_date=start_date, end_date=end_date)
 
     return {
-        'daily_counts': daily_data,
-        'meal_distribution': meal_distribution,
-    }
\ No newline at end of file
+        # Daily data for line chart
+        'daily_counts': _daily_counts(stats, start_date, end_date),
+        # Meal type distribution for pie chart
+        'meal_distribution': get_meal_type_distribution(
+            queryset if queryset is not None else FoodLog.objects.all(), user=user
+        ),
+    }
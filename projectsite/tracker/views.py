@@ -1,73 +1,124 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib import messages
 from django.utils import timezone
-from django.db.models import Count
+from django.db import transaction
+from django.db.models import Count, Max
+from django.http import HttpResponseBadRequest, JsonResponse, StreamingHttpResponse
+from asgiref.sync import sync_to_async
 from datetime import date, timedelta  
-from .models import FoodLog
+from .models import FoodLog, FrequentFood, ImportJob, Recipe, RecipeIngredient
 from .forms import FoodLogForm
-from .services import CalorieNinjasService
-from .utils import calculate_statistics, prepare_chart_data
-import json
+from .services import AsyncCalorieNinjasService, CalorieNinjasService
+from .exports import FORMATS, export_filename, iter_export
+from .imports import queue_upload
+from .autocomplete import reuse_suggestion, suggestion_index
+from .frequent import clone_food_log
+from .page_cache import dashboard_context, home_context, trends_context
+from .recipes import (
+    IngredientLookupError, add_ingredient, create_recipe, recipe_nutrition, remove_ingredient,
+    set_servings, update_ingredient,
+)
+from .enrichment import apply_nutrition, async_enrichment_enabled, enqueue, pending_status
+from .summaries import parse_chart_range
+from .trends import TREND_RANGES, parse_trend_days, trend_table
 from django.contrib.auth.decorators import login_required
-from .forms import UserProfileForm, UserSettingsForm
+from django.utils.http import url_has_allowed_host_and_scheme
+from django.middleware.csrf import get_token
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition
+import hashlib
+from .forms import (
+    FoodLogImportForm, LogAgainForm, RecipeForm, RecipeIngredientForm, UserProfileForm, UserSettingsForm,
+)
+
+def page_etag(request, *args, **kwargs):
+    """
+    ETag for a tracker page: changes whenever the user's logs do
+    
+    The latest updated_at moves on every insert and edit and the count
+    catches deletes; both come from one query on the (user, updated_at)
+    index. The query string picks the date and chart range, today's date
+    moves pages that default to today, and the CSRF cookie and email are
+    rendered into the page. No ETag (so no 304) while flash messages are
+    waiting to be shown.
+    """
+    storage = getattr(request, '_messages', None)
+    if storage is not None and len(storage):
+        return None
+    state = FoodLog.objects.filter(user=request.user).order_by().aggregate(
+        latest=Max('updated_at'),
+        count=Count('id'),
+    )
+    latest = state['latest'].timestamp() if state['latest'] else 0
+    # Creates the CSRF cookie on a first visit, so the next one can match
+    get_token(request)
+    key = '|'.join([
+        str(request.user.pk),
+        request.user.email,
+        f"{state['count']}-{latest:.6f}",
+        timezone.now().date().isoformat(),
+        request.GET.urlencode(),
+        request.META.get('CSRF_COOKIE', ''),
+    ])
+    return hashlib.sha1(key.encode()).hexdigest()
+
+
+def conditional_page(view):
+    """
+    Answer conditional GETs of an HTML page with a 304 before the view
+    builds anything; browsers revalidate on every visit
+    """
+    view = condition(etag_func=page_etag)(view)
+    return cache_control(private=True, no_cache=True)(view)
+
 
 @login_required
+@conditional_page
 def home(request):
     """Home page - requires login"""
     """Home page showing:   
      - Form to add new food log    
      - Today's food logs"""   
     today = timezone.now().date()
-    # Get today's food logs for current user
-    todays_logs = FoodLog.objects.filter(date=today, user=request.user)
-    # Initialize empty form    
-    form = FoodLogForm(initial={'date': today})
-    # Count logs by meal type for today    
-    meal_counts = {
-        'breakfast': todays_logs.filter(meal_type='breakfast').count(),
-        'lunch': todays_logs.filter(meal_type='lunch').count(),
-        'dinner': todays_logs.filter(meal_type='dinner').count(),
-        'snack': todays_logs.filter(meal_type='snack').count(),
-    }
-    
-    # Calculate today's nutrition totals for JavaScript
-    nutrition_totals = {
-        'protein': 0,
-        'carbs': 0,
-        'fat': 0,
-        'fiber': 0,
-        'sodium': 0,
-        'sugar': 0,
-        'potassium': 0,
-        'cholesterol': 0,
-        'saturated_fat': 0,
-        'calories': 0
-    }
-    
-    for log in todays_logs:
-        if log.nutrition_data:
-            nutrition_totals['protein'] += float(log.nutrition_data.get('protein_g', 0))
-            nutrition_totals['carbs'] += float(log.nutrition_data.get('carbohydrates_total_g', 0))
-            nutrition_totals['fat'] += float(log.nutrition_data.get('fat_total_g', 0))
-            nutrition_totals['fiber'] += float(log.nutrition_data.get('fiber_g', 0))
-            nutrition_totals['sodium'] += float(log.nutrition_data.get('sodium_mg', 0))
-            nutrition_totals['sugar'] += float(log.nutrition_data.get('sugar_g', 0))
-            nutrition_totals['potassium'] += float(log.nutrition_data.get('potassium_mg', 0))
-            nutrition_totals['cholesterol'] += float(log.nutrition_data.get('cholesterol_mg', 0))
-            nutrition_totals['saturated_fat'] += float(log.nutrition_data.get('saturated_fat_g', 0))
-            # Prefer nutrition_data calories over model field
-            nutrition_totals['calories'] += float(log.nutrition_data.get('calories', log.calories or 0))
-        else:
-            nutrition_totals['calories'] += float(log.calories or 0)
-    
-    context = {
-        'form': form,
-        'todays_logs': todays_logs,
-        'today': today,
-        'total_logs_today': todays_logs.count(),
-        'meal_counts': meal_counts,
-        'nutrition_totals': nutrition_totals,
-    }
+    # Today's logs, totals and meal counts come from the per-user page cache
+    context = dict(home_context(request.user, today))
+    context['form'] = FoodLogForm(initial={'date': today})
+    return render(request, 'tracker/home.html', context)
+
+
+def _save_pending_log(form, user, natural_query):
+    """
+    Save a food log in the pending state and queue it for the background worker
+    """
+    food_log = form.save(commit=False)
+    food_log.user = user
+    food_log.food_name = natural_query[:200]
+    food_log.natural_query = natural_query
+    food_log.status = FoodLog.STATUS_PENDING
+    with transaction.atomic():
+        food_log.save()
+        enqueue(food_log)
+    return food_log
+
+
+def _save_looked_up_log(form, user, natural_query, formatted_data):
+    """
+    Save a food log with nutrition from CalorieNinjasService.format_for_food_log
+    """
+    food_log = form.save(commit=False)
+    food_log.user = user  # Associate with current user
+    food_log.natural_query = natural_query
+    apply_nutrition(food_log, formatted_data)
+    food_log.save()
+    return food_log
+
+
+def _render_home_with_errors(request, form):
+    """
+    Re-display the home page with an invalid add form
+    """
+    context = dict(home_context(request.user, timezone.now().date()))
+    context['form'] = form
     return render(request, 'tracker/home.html', context)
 
 
@@ -86,6 +137,29 @@ def add_food_log(request):
             return redirect('tracker:home')
         
         if form.is_valid():
+            # A suggestion picked from the user's history, or servings of a
+            # saved recipe, bring their nutrition along
+            suggested = (
+                reuse_suggestion(request.user, natural_query, request.POST.get('suggestion_id'))
+                or recipe_nutrition(request.user, natural_query)
+            )
+            if suggested is not None:
+                food_log = _save_looked_up_log(form, request.user, natural_query, suggested)
+                messages.success(
+                    request,
+                    f"✅ {food_log.food_name} logged successfully!"
+                )
+                return redirect('tracker:home')
+            
+            if async_enrichment_enabled():
+                # Save right away and let the background worker fill in nutrition
+                food_log = _save_pending_log(form, request.user, natural_query)
+                messages.success(
+                    request,
+                    f"⏳ {food_log.food_name} saved! Looking up nutrition..."
+                )
+                return redirect('tracker:home')
+            
             # Use API to parse natural language
             api_service = CalorieNinjasService()
             api_response = api_service.parse_food_query(natural_query)
@@ -98,13 +172,7 @@ def add_food_log(request):
                 )
                 
                 # Create food log with API data including nutrition
-                food_log = form.save(commit=False)
-                food_log.user = request.user  # Associate with current user
-                food_log.food_name = formatted_data['food_name']
-                food_log.description = formatted_data['description']
-                food_log.calories = formatted_data['calories']
-                food_log.nutrition_data = formatted_data.get('nutrition', {})
-                food_log.save()
+                food_log = _save_looked_up_log(form, request.user, natural_query, formatted_data)
                 
                 messages.success(
                     request,
@@ -121,27 +189,93 @@ def add_food_log(request):
             # Show error message           
             messages.error(request, '❌ Please correct the errors below.')
             # Re-display the form with errors            
-            today = timezone.now().date()
-            todays_logs = FoodLog.objects.filter(date=today, user=request.user)
-            meal_counts = {
-                'breakfast': todays_logs.filter(meal_type='breakfast').count(),
-                'lunch': todays_logs.filter(meal_type='lunch').count(),
-                'dinner': todays_logs.filter(meal_type='dinner').count(),
-                'snack': todays_logs.filter(meal_type='snack').count(),
-            }
-            context = {
-                'form': form,
-                'todays_logs': todays_logs,
-                'today': today,
-                'total_logs_today': todays_logs.count(),
-                'meal_counts': meal_counts,
-            }
-            return render(request, 'tracker/home.html', context)
+            return _render_home_with_errors(request, form)
     
     # If not POST, redirect to home    
     return redirect('tracker:home')
 
 
+@login_required
+async def add_food_log_async(request):
+    """
+    Async add_food_log, routed instead of the sync view when
+    TRACKER_ASYNC_VIEWS is on.
+    
+    The CalorieNinjas call is awaited on a shared httpx client, so an ASGI
+    worker is not pinned while the API answers. ORM work runs in
+    sync_to_async.
+    """
+    if request.method != 'POST':
+        return redirect('tracker:home')
+    
+    form = FoodLogForm(request.POST)
+    natural_query = request.POST.get('natural_query', '').strip()
+    
+    if not natural_query:
+        messages.error(request, '❌ Please describe what you ate.')
+        return redirect('tracker:home')
+    
+    if not await sync_to_async(form.is_valid)():
+        messages.error(request, '❌ Please correct the errors below.')
+        return await sync_to_async(_render_home_with_errors)(request, form)
+    
+    user = await request.auser()
+    
+    suggested = (
+        await sync_to_async(reuse_suggestion)(user, natural_query, request.POST.get('suggestion_id'))
+        or await sync_to_async(recipe_nutrition)(user, natural_query)
+    )
+    if suggested is not None:
+        food_log = await sync_to_async(_save_looked_up_log)(form, user, natural_query, suggested)
+        messages.success(
+            request,
+            f"✅ {food_log.food_name} logged successfully!"
+        )
+        return redirect('tracker:home')
+    
+    if async_enrichment_enabled():
+        food_log = await sync_to_async(_save_pending_log)(form, user, natural_query)
+        messages.success(
+            request,
+            f"⏳ {food_log.food_name} saved! Looking up nutrition..."
+        )
+        return redirect('tracker:home')
+    
+    api_service = AsyncCalorieNinjasService()
+    api_response = await api_service.parse_food_query(natural_query)
+    
+    if not api_response.get('success'):
+        messages.error(
+            request,
+            f"❌ {api_response.get('message', 'Unknown error')}"
+        )
+        return redirect('tracker:home')
+    
+    formatted_data = api_service.format_for_food_log(natural_query, api_response)
+    food_log = await sync_to_async(_save_looked_up_log)(form, user, natural_query, formatted_data)
+    
+    messages.success(
+        request,
+        f"✅ {food_log.food_name} logged successfully!"
+    )
+    return redirect('tracker:home')
+
+
+@login_required
+def suggest_foods(request):
+    """Autocomplete suggestions for the add form, from memory"""
+    query = request.GET.get('q', '')[:100]
+    suggestions = suggestion_index.suggest(request.user, query) if len(query.strip()) >= 2 else []
+    return JsonResponse({'query': query, 'suggestions': suggestions})
+
+
+@login_required
+def food_log_status(request):
+    """Status of pending food logs, polled by home.html"""
+    ids = [int(pk) for pk in request.GET.get('ids', '').split(',') if pk.isdigit()][:50]
+    return JsonResponse({'logs': pending_status(request.user, ids)})
+
+
 @login_required
 def edit_food_log(request, pk):
     """Edit food log - requires login"""
@@ -198,7 +332,51 @@ def delete_food_log(request, pk):
     return render(request, 'tracker/delete_confirm.html', context)
 
 
+def _log_again(request, source):
+    """
+    Copy a FoodLog or FrequentFood onto the posted date (default today) and
+    meal (default the source's), then go back to the page that asked
+    """
+    form = LogAgainForm(request.POST)
+    if form.is_valid():
+        food_log = clone_food_log(
+            source,
+            request.user,
+            form.cleaned_data['date'] or timezone.now().date(),
+            form.cleaned_data['meal_type'],
+        )
+        messages.success(request, f'✅ {food_log.food_name} logged again!')
+    else:
+        messages.error(request, '❌ Please choose a valid date and meal.')
+    
+    next_url = request.POST.get('next')
+    if next_url and url_has_allowed_host_and_scheme(
+        next_url, allowed_hosts={request.get_host()}, require_https=request.is_secure(),
+    ):
+        return redirect(next_url)
+    return redirect('tracker:home')
+
+
+@login_required
+def log_again(request, pk):
+    """Log an earlier entry again with its stored nutrition; no lookup"""
+    if request.method != 'POST':
+        return redirect('tracker:home')
+    source = get_object_or_404(FoodLog, pk=pk, user=request.user, status=FoodLog.STATUS_READY)
+    return _log_again(request, source)
+
+
+@login_required
+def log_frequent_food(request, pk):
+    """Log a meal from the recent/frequent lists again; no lookup"""
+    if request.method != 'POST':
+        return redirect('tracker:home')
+    source = get_object_or_404(FrequentFood, pk=pk, user=request.user)
+    return _log_again(request, source)
+
+
 @login_required
+@conditional_page
 def dashboard(request):
     """Dashboard - requires login"""
     """
@@ -207,9 +385,6 @@ def dashboard(request):
     - Daily nutrient totals
     - Charts data
     """
-    # Filter by current user
-    food_logs = FoodLog.objects.filter(user=request.user)
-    
     # Get the current date from query parameter or default to today
     date_param = request.GET.get('date')
     today = timezone.now().date()
@@ -223,119 +398,177 @@ def dashboard(request):
     else:
         current_date = today
     
-    # Calculate previous and next dates
-    prev_date = current_date - timedelta(days=1)
-    next_date = current_date + timedelta(days=1)
-    is_today = current_date == today
-    
-    # Get food logs for the current date and user
-    food_logs = FoodLog.objects.filter(date=current_date, user=request.user)
-    daily_meals_count = food_logs.count()
-    
-    # Calculate daily nutrition totals
-    daily_nutrition = {
-        'calories': 0,
-        'protein': 0,
-        'carbs': 0,
-        'fat': 0,
-        'fiber': 0,
-        'sugar': 0,
-        'sodium': 0,
-        'potassium': 0,
-        'cholesterol': 0,
-        'saturated_fat': 0,
+    # Chart range: a preset number of days ending today, or a custom start/end
+    chart_start, chart_end, chart_range = parse_chart_range(request.GET, today)
+    
+    # Totals, logs and chart series come from the per-user page cache
+    context = dashboard_context(request.user, current_date, today, chart_start, chart_end, chart_range)
+    return render(request, 'tracker/dashboard.html', context)
+
+
+@login_required
+@conditional_page
+def trends(request):
+    """
+    Rolling 7/30/90-day averages, week-over-week changes and goal streaks
+    for calories and each macro. ?days= picks how many days are shown.
+    """
+    days = parse_trend_days(request.GET.get('days'))
+    data = trends_context(request.user, timezone.now().date(), days)
+    context = {
+        'trends': data,
+        'rows': trend_table(data),
+        'days': days,
+        'trend_ranges': TREND_RANGES,
     }
+    return render(request, 'tracker/trends.html', context)
+
+
+@login_required
+def export_food_logs(request):
+    """
+    Stream the user's food history as a download
     
-    for log in food_logs:
-        if log.nutrition_data:
-            daily_nutrition['protein'] += float(log.nutrition_data.get('protein_g', 0))
-            daily_nutrition['carbs'] += float(log.nutrition_data.get('carbohydrates_total_g', 0))
-            daily_nutrition['fat'] += float(log.nutrition_data.get('fat_total_g', 0))
-            daily_nutrition['fiber'] += float(log.nutrition_data.get('fiber_g', 0))
-            daily_nutrition['sodium'] += float(log.nutrition_data.get('sodium_mg', 0))
-            daily_nutrition['sugar'] += float(log.nutrition_data.get('sugar_g', 0))
-            daily_nutrition['potassium'] += float(log.nutrition_data.get('potassium_mg', 0))
-            daily_nutrition['cholesterol'] += float(log.nutrition_data.get('cholesterol_mg', 0))
-            daily_nutrition['saturated_fat'] += float(log.nutrition_data.get('saturated_fat_g', 0))
-            daily_nutrition['calories'] += float(log.nutrition_data.get('calories', log.calories or 0))
-        else:
-            daily_nutrition['calories'] += float(log.calories or 0)
+    ?format=csv|jsonl picks the format, ?gzip=1 compresses it, and
+    ?start=YYYY-MM-DD / ?end=YYYY-MM-DD limit the dates exported.
+    """
+    from datetime import datetime
     
-    # Prepare comprehensive chart data (last 7 days)
-    last_7_days = [today - timedelta(days=i) for i in range(6, -1, -1)]
+    fmt = request.GET.get('format', 'csv')
+    if fmt not in FORMATS:
+        return HttpResponseBadRequest('format must be csv or jsonl')
+    compress = request.GET.get('gzip') in ('1', 'true')
     
-    # Initialize chart data structures
-    calories_data = []
-    protein_data = []
-    carbs_data = []
-    fat_data = []
+    try:
+        start = datetime.strptime(request.GET['start'], '%Y-%m-%d').date() if request.GET.get('start') else None
+        end = datetime.strptime(request.GET['end'], '%Y-%m-%d').date() if request.GET.get('end') else None
+    except ValueError:
+        return HttpResponseBadRequest('start and end must be dates in YYYY-MM-DD format')
     
-    # Calorie goal (you can make this dynamic per user later)
-    calorie_goal = 2000
+    response = StreamingHttpResponse(
+        iter_export(request.user, fmt, start, end, compress),
+        content_type='application/gzip' if compress else f'{FORMATS[fmt]}; charset=utf-8',
+    )
+    filename = export_filename(fmt, start, end, compress)
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
+@login_required
+def import_food_logs(request):
+    """
+    Upload a CSV of past meals. The file is queued as an ImportJob and
+    processed by `manage.py import_food_logs --worker`.
+    """
+    if request.method == 'POST':
+        form = FoodLogImportForm(request.POST, request.FILES)
+        if form.is_valid():
+            upload = form.cleaned_data['csv_file']
+            queue_upload(request.user, upload)
+            messages.success(request, f'⏳ {upload.name} uploaded! Your meals will appear as they are imported.')
+            return redirect('tracker:import_food_logs')
+        messages.error(request, '❌ Please correct the errors below.')
+    else:
+        form = FoodLogImportForm()
     
-    for day in last_7_days:
-        day_logs = FoodLog.objects.filter(date=day, user=request.user)
-        
-        # Calculate daily totals
-        day_calories = 0
-        day_protein = 0
-        day_carbs = 0
-        day_fat = 0
-        
-        for log in day_logs:
-            if log.nutrition_data:
-                day_protein += float(log.nutrition_data.get('protein_g', 0))
-                carbs_value = (
-                    log.nutrition_data.get('carbohydrates_total_g') or
-                    log.nutrition_data.get('carbohydrates_g') or
-                    log.nutrition_data.get('carbs') or
-                    0
+    context = {
+        'form': form,
+        'import_jobs': ImportJob.objects.filter(user=request.user).defer('source_data')[:5],
+    }
+    return render(request, 'tracker/import_food_logs.html', context)
+
+
+@login_required
+def recipes(request):
+    """
+    List the user's recipes and save new ones. Ingredients are looked up
+    once here; logging servings later needs no lookup.
+    """
+    if request.method == 'POST':
+        form = RecipeForm(request.POST, user=request.user)
+        if form.is_valid():
+            try:
+                recipe = create_recipe(
+                    request.user,
+                    form.cleaned_data['name'],
+                    form.cleaned_data['servings'],
+                    form.cleaned_data['ingredients'],
                 )
-                day_carbs += float(carbs_value)
-                day_fat += float(log.nutrition_data.get('fat_total_g', 0))
-                day_calories += float(log.nutrition_data.get('calories', log.calories or 0))
+            except IngredientLookupError as e:
+                messages.error(request, f'❌ {e}')
             else:
-                day_calories += float(log.calories or 0)
-        
-        # Add to chart data
-        calories_data.append({
-            'date': day.strftime('%m/%d'),
-            'calories': round(day_calories, 1)
-        })
-        protein_data.append({
-            'date': day.strftime('%m/%d'),
-            'value': round(day_protein, 1)
-        })
-        carbs_data.append({
-            'date': day.strftime('%m/%d'),
-            'value': round(day_carbs, 1)
-        })
-        fat_data.append({
-            'date': day.strftime('%m/%d'),
-            'value': round(day_fat, 1)
-        })
-    
-    # Convert to JSON for JavaScript
-    calories_chart_json = json.dumps(calories_data)
-    protein_chart_json = json.dumps(protein_data)
-    carbs_chart_json = json.dumps(carbs_data)
-    fat_chart_json = json.dumps(fat_data)
+                messages.success(request, f'✅ {recipe.name} saved! Log it as "1 serving of my {recipe.lookup_name}".')
+                return redirect('tracker:recipe_detail', pk=recipe.pk)
+        else:
+            messages.error(request, '❌ Please correct the errors below.')
+    else:
+        form = RecipeForm(user=request.user, initial={'servings': 4})
     
     context = {
-        'current_date': current_date,
-        'prev_date': prev_date.strftime('%Y-%m-%d'),
-        'next_date': next_date.strftime('%Y-%m-%d'),
-        'is_today': is_today,
-        'food_logs': food_logs,
-        'daily_meals_count': daily_meals_count,
-        'daily_nutrition': daily_nutrition,
-        'calorie_goal': calorie_goal,
-        'calories_chart_json': calories_chart_json,
-        'protein_chart_json': protein_chart_json,
-        'carbs_chart_json': carbs_chart_json,
-        'fat_chart_json': fat_chart_json,
+        'form': form,
+        'recipes': Recipe.objects.filter(user=request.user),
     }
-    return render(request, 'tracker/dashboard.html', context)
+    return render(request, 'tracker/recipes.html', context)
+
+
+@login_required
+def recipe_detail(request, pk):
+    """
+    Show a recipe and change it. Adding, changing or removing an ingredient
+    looks up only that ingredient and adjusts the stored totals.
+    """
+    recipe = get_object_or_404(Recipe, pk=pk, user=request.user)
+    if request.method == 'POST':
+        action = request.POST.get('action')
+        try:
+            if action == 'servings':
+                try:
+                    servings = float(request.POST.get('servings', ''))
+                except ValueError:
+                    servings = 0
+                if servings > 0:
+                    set_servings(recipe, servings)
+                    messages.success(request, f'✅ {recipe.name} now makes {servings:g} servings.')
+                else:
+                    messages.error(request, '❌ Servings must be more than zero.')
+            elif action == 'remove':
+                ingredient = get_object_or_404(RecipeIngredient, pk=request.POST.get('ingredient_id'), recipe=recipe)
+                ingredient.recipe = recipe
+                remove_ingredient(ingredient)
+                messages.success(request, f'🗑️ {ingredient.text} removed.')
+            elif action in ('add', 'update'):
+                form = RecipeIngredientForm(request.POST)
+                if not form.is_valid():
+                    messages.error(request, '❌ Please describe the ingredient.')
+                elif action == 'add':
+                    add_ingredient(recipe, form.cleaned_data['text'])
+                    messages.success(request, f"✅ {form.cleaned_data['text']} added.")
+                else:
+                    ingredient = get_object_or_404(RecipeIngredient, pk=request.POST.get('ingredient_id'), recipe=recipe)
+                    ingredient.recipe = recipe
+                    update_ingredient(ingredient, form.cleaned_data['text'])
+                    messages.success(request, f"✅ {form.cleaned_data['text']} updated.")
+        except IngredientLookupError as e:
+            messages.error(request, f'❌ {e}')
+        return redirect('tracker:recipe_detail', pk=recipe.pk)
+    
+    context = {
+        'recipe': recipe,
+        'ingredients': recipe.ingredients.all(),
+        'ingredient_form': RecipeIngredientForm(),
+    }
+    return render(request, 'tracker/recipe_detail.html', context)
+
+
+@login_required
+def delete_recipe(request, pk):
+    """Delete a recipe (POST); logs already made from it are kept"""
+    recipe = get_object_or_404(Recipe, pk=pk, user=request.user)
+    if request.method == 'POST':
+        recipe.delete()
+        messages.success(request, f'🗑️ {recipe.name} has been deleted.')
+        return redirect('tracker:recipes')
+    return redirect('tracker:recipe_detail', pk=recipe.pk)
 
 
 @login_required